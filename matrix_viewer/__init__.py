@@ -3,21 +3,32 @@
 __author__ = """Matthias Rosenthal"""
 __version__ = '0.2.1'
 
-from ._window import pause, show, show_with_pyplot, view, viewer, Viewer
+from ._window import enable_ipython, pause, show, show_async, show_with_pyplot, view, viewer, Viewer
 from ._tab import ViewerTab
 from ._tab_numpy import ViewerTabNumpy
+from ._tab_dataframe import ViewerTabDataFrame
+from ._tab_sparse import ViewerTabSparse
 from ._tab_struct import ViewerTabStruct
 from ._tab_text import ViewerTabText
+from ._tab_loading import ViewerTabLoading
+from ._daemon import connect, serve
 
 __all__ = [
+    'enable_ipython',
     'pause',
     'show',
+    'show_async',
     'show_with_pyplot',
     'view',
     'viewer',
     'Viewer',
     'ViewerTab',
     'ViewerTabNumpy',
+    'ViewerTabDataFrame',
+    'ViewerTabSparse',
     'ViewerTabStruct',
     'ViewerTabText',
+    'ViewerTabLoading',
+    'connect',
+    'serve',
 ]
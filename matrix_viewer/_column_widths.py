@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class ColumnWidths:
+    """Pixel widths of the columns of a table, which are measured lazily when the columns come into view.
+
+    The left borders of all columns are kept as a cumulative sum, so that finding the column at a pixel position is a
+    binary search. Columns that were not measured yet have default_width.
+    """
+
+    def __init__(self, num_columns, measure, default_width):
+        """
+        :param measure: function(column_start, column_end) returning the widths of these columns in pixels.
+        :param default_width: width of the columns that were not measured yet.
+        """
+        self.measure = measure
+        self.default_width = default_width
+        self._widths = np.full(num_columns, default_width, dtype=np.int64)
+        self._measured = np.zeros(num_columns, dtype=bool)
+        self._offsets = np.zeros(num_columns + 1, dtype=np.int64)  # left border of each column, and the total width
+        np.cumsum(self._widths, out=self._offsets[1:])
+
+    def __len__(self):
+        return len(self._widths)
+
+    def reset(self, default_width):
+        """Forgets all measured widths, e. g. because the font changed."""
+        self.default_width = default_width
+        self._widths[:] = default_width
+        self._measured[:] = False
+        np.cumsum(self._widths, out=self._offsets[1:])
+
+    def offset(self, i_column):
+        """Returns the left border of column i_column relative to the left border of column 0. i_column may be the
+        number of columns, which gives the total width."""
+        return int(self._offsets[i_column])
+
+    def offsets(self, column_start, column_end):
+        """Returns the left borders of the columns column_start to column_end (inclusive) as an array."""
+        return self._offsets[column_start:column_end + 1]
+
+    def width(self, i_column):
+        return int(self._widths[i_column])
+
+    def index_at(self, offset):
+        """Returns the column containing the pixel offset (relative to the left border of column 0). Offsets left of
+        column 0 give -1, offsets right of the last column give the number of columns."""
+        if offset < 0:
+            return -1
+        return int(np.searchsorted(self._offsets, offset, side='right')) - 1
+
+    def last_start(self, available_width):
+        """Returns the first column from which all remaining columns fit into available_width pixels."""
+        return int(np.searchsorted(self._offsets, self._offsets[-1] - available_width, side='left'))
+
+    def set_widths(self, column_start, widths):
+        """Sets the widths of the columns starting at column_start and marks them as measured."""
+        column_end = column_start + len(widths)
+        self._widths[column_start:column_end] = widths
+        self._measured[column_start:column_end] = True
+        np.cumsum(self._widths[column_start:], out=self._offsets[column_start + 1:])
+        self._offsets[column_start + 1:] += self._offsets[column_start]
+
+    def widen(self, i_column, width):
+        """Makes column i_column at least width pixels wide, e. g. because a cell text is longer than estimated.
+        Returns whether the column got wider."""
+        if width <= self._widths[i_column]:
+            return False
+        self._offsets[i_column + 1:] += width - self._widths[i_column]
+        self._widths[i_column] = width
+        return True
+
+    def measure_visible(self, column_start, available_width):
+        """Measures the columns that are visible if column_start is the first column and available_width pixels are
+        available. Measuring can change the widths and therefore which columns are visible, so this repeats until all
+        visible columns are measured."""
+        while True:
+            column_end = min(self.index_at(self.offset(column_start) + available_width) + 1, len(self))
+            unmeasured = np.flatnonzero(~self._measured[column_start:column_end])
+            if len(unmeasured) == 0:
+                return
+            first = column_start + int(unmeasured[0])
+            last = column_start + int(unmeasured[-1]) + 1
+            widths = np.asarray(self.measure(first, last), dtype=np.int64)
+            # keep the widths of columns that were measured before, they may have been widened
+            widths = np.where(self._measured[first:last], self._widths[first:last], widths)
+            self.set_widths(first, widths)
@@ -0,0 +1,367 @@
+"""A viewer process that stays running, so that scripts and worker processes can show arrays without starting Tk.
+
+Arrays are transported through shared memory (Python 3.8 or newer), only their shape and dtype are sent over the
+connection. Start the daemon with ``python -m matrix_viewer._daemon`` or let connect() start it.
+"""
+
+import argparse
+import multiprocessing.connection
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+
+default_port = 6391
+authkey_path = os.path.join(os.path.expanduser('~'), '.matrix_viewer_authkey')
+poll_interval = 20  # in milliseconds, how often the daemon looks for new requests
+spawn_timeout = 30  # in seconds, how long connect waits for a daemon that it started
+
+
+def _get_authkey():
+    """Returns the key that authenticates clients, so that other users cannot send objects to the daemon. It is stored
+    in a file that only the current user can read and created on first use."""
+    try:
+        with open(authkey_path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        pass
+    authkey = os.urandom(32)
+    try:
+        descriptor = os.open(authkey_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:  # created by another process in the meantime
+        with open(authkey_path, 'rb') as file:
+            return file.read()
+    with os.fdopen(descriptor, 'wb') as file:
+        file.write(authkey)
+    return authkey
+
+
+def _untrack(shared_memory):
+    """Stops the resource tracker of this process from unlinking the segment when this process exits, because another
+    process owns it (see share_array). Python < 3.13 also tracks segments that were only attached."""
+    if os.name == 'posix':
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shared_memory._name, 'shared_memory')
+
+
+def _buffer_address(shared_memory):
+    return np.frombuffer(shared_memory.buf, dtype=np.uint8).ctypes.data
+
+
+def share_array(array, shared_memories=()):
+    """Makes an array available to another process.
+
+    :param shared_memories: SharedMemory objects of arrays created with DaemonClient.array. If array lies inside one of
+                            them, it is not copied.
+    :return: (descriptor, SharedMemory). The descriptor is a small tuple that attach_array turns back into an array. If
+             the array had to be copied into a new segment, the receiver owns the segment once it attached: the sender
+             should then call _untrack and close the returned SharedMemory, or unlink it if the receiver failed.
+    """
+    from multiprocessing import shared_memory
+
+    address = array.__array_interface__['data'][0]
+    for memory in shared_memories:
+        offset = address - _buffer_address(memory)
+        if 0 <= offset < memory.size:
+            return (memory.name, offset, array.shape, array.dtype.str, array.strides, False), memory
+
+    memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    copy = np.ndarray(array.shape, array.dtype, buffer=memory.buf)
+    copy[...] = array
+    del copy  # the buffer cannot be closed while arrays use it
+    return (memory.name, 0, array.shape, array.dtype.str, None, True), memory
+
+
+def attach_array(descriptor):
+    """Returns (array, SharedMemory, owned) for a descriptor created by share_array in another process. If owned, the
+    caller is responsible for unlinking the segment; otherwise it belongs to the sender and is never unlinked here."""
+    from multiprocessing import shared_memory
+
+    name, offset, shape, dtype, strides, owned = descriptor
+    memory = shared_memory.SharedMemory(name=name)
+    if not owned:
+        _untrack(memory)
+    array = np.ndarray(shape, np.dtype(dtype), buffer=memory.buf, offset=offset, strides=strides)
+    return array, memory, owned
+
+
+class ViewerDaemon:
+    """Receives requests from DaemonClient objects and shows the objects in its windows.
+
+    Connections are accepted and read on worker threads; the requests are executed on the GUI thread.
+    """
+
+    def __init__(self, address=('localhost', default_port), authkey=None):
+        self.listener = multiprocessing.connection.Listener(address, authkey=authkey or _get_authkey())
+        self._requests = queue.Queue()
+        self._tabs = {}  # tab id -> (tab, [(SharedMemory, owned)])
+        self._next_tab_id = 0
+        self._running = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError:  # the listener was closed
+                return
+            threading.Thread(target=self._receive, args=(connection,), daemon=True).start()
+
+    def _receive(self, connection):
+        while True:
+            try:
+                request = connection.recv()
+            except (EOFError, OSError):
+                return
+            self._requests.put((connection, request))
+
+    def run(self):
+        """Runs the event loop until a client calls shutdown."""
+        from ._manager import manager
+
+        self._running = True
+        root = manager.get_or_create_root()
+        root.after(poll_interval, self._poll)
+        try:
+            root.mainloop()  # not manager.show, which stops when the last window is closed
+        finally:
+            self.listener.close()
+            for i_tab in list(self._tabs):
+                self._release(i_tab)
+
+    def _poll(self):
+        from ._manager import manager
+
+        while True:
+            try:
+                connection, request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                reply = ('ok', self._handle(request))
+            except BaseException as e:
+                reply = ('error', f"{type(e).__name__}: {e}")
+            try:
+                connection.send(reply)
+            except OSError:
+                pass  # the client is gone
+
+        for i_tab, (tab, _) in list(self._tabs.items()):
+            if not _is_open(tab):
+                self._release(i_tab)
+
+        if self._running:
+            manager.get_or_create_root().after(poll_interval, self._poll)
+        else:
+            manager.get_or_create_root().quit()
+
+    def _handle(self, request):
+        from ._window import view
+
+        command = request[0]
+        if command == 'view':
+            _, payload, kwargs = request
+            object, memories = self._unpack(payload)
+            if (memories is not None) and (kwargs.get('snapshot', None) is None):
+                kwargs['snapshot'] = 'view'  # the shared array already is a snapshot, or it is meant to be watched
+            tab = view(object, **kwargs)
+            i_tab = self._next_tab_id
+            self._next_tab_id += 1
+            self._tabs[i_tab] = (tab, memories or [])
+            return i_tab
+        elif command == 'update':
+            _, i_tab, payload = request
+            tab, memories = self._tabs[i_tab]
+            object, new_memories = self._unpack(payload)
+            tab.update(object)
+            if new_memories is not None:
+                # the old values are not shown anymore, so do not keep them in memory while the tab is open
+                _release_memories(memories)
+                self._tabs[i_tab] = (tab, new_memories)
+        elif command in ['get_selection', 'get_focused_cell']:
+            _, i_tab = request
+            return getattr(self._tabs[i_tab][0], command)()
+        elif command == 'shutdown':
+            self._running = False
+        else:
+            raise ValueError(f"unknown command {command}")
+
+    def _unpack(self, payload):
+        """Returns (object, memories), where memories is None if the object was sent directly."""
+        kind, content = payload
+        if kind == 'shared_array':
+            array, memory, owned = attach_array(content)
+            return array, [(memory, owned)]
+        return content, None
+
+    def _release(self, i_tab):
+        _, memories = self._tabs.pop(i_tab)
+        _release_memories(memories)
+
+
+def _release_memories(memories):
+    """Unmaps shared memory that is not shown anymore and unlinks the segments that were copied for the daemon."""
+    for memory, owned in memories:
+        try:
+            memory.close()
+        except BufferError:
+            pass  # still referenced, e. g. by a pyramid that is being built; it is unmapped when the process exits
+        if owned:
+            try:
+                memory.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _is_open(tab):
+    """Whether a tab was not closed by the user. Tabs loaded in the background replace their placeholder."""
+    if tab.viewer._destroyed:
+        return False
+    tabs = [open_tab for open_tab, _ in tab.viewer.tabs]
+    return (tab in tabs) or (getattr(tab, 'tab', None) in tabs)
+
+
+class RemoteTab:
+    """A tab shown by the daemon. Offers the methods of ViewerTabNumpy that make sense in another process."""
+
+    def __init__(self, client, i_tab):
+        self.client = client
+        self.i_tab = i_tab
+
+    def update(self, matrix):
+        """See ViewerTabNumpy.update. Arrays created with DaemonClient.array are not copied, only their description is
+        sent."""
+        self.client._send_object(('update', self.i_tab), matrix)
+
+    def get_selection(self):
+        """See ViewerTabNumpy.get_selection."""
+        return self.client._request(('get_selection', self.i_tab))
+
+    def get_focused_cell(self):
+        """See ViewerTabNumpy.get_focused_cell."""
+        return self.client._request(('get_focused_cell', self.i_tab))
+
+
+class DaemonClient:
+    """Connection to a viewer daemon, see connect."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._shared_memories = []  # segments of the arrays created with array()
+        self._lock = threading.Lock()
+
+    def array(self, shape, dtype=np.float64):
+        """Returns a new zero-initialized array in shared memory. Viewing it (or a slice of it) does not copy anything.
+        The daemon reads it like view(..., snapshot='view'), but cells that are already shown keep their old values
+        until tab.update(array) is called, which only sends the description of the array again."""
+        from multiprocessing import shared_memory
+
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._shared_memories.append(memory)
+        return np.ndarray(shape, dtype, buffer=memory.buf)
+
+    def view(self, object, tab_title=None, font_size=None, formatter=None, snapshot=None, background=False):
+        """Shows the object in the daemon, see matrix_viewer.view. numpy arrays and pytorch tensors are sent through
+        shared memory; they are copied into it once unless they were created with array(). Other objects are pickled.
+
+        :return: a RemoteTab.
+        """
+        kwargs = {'tab_title': tab_title, 'font_size': font_size, 'formatter': formatter, 'snapshot': snapshot,
+            'background': background}
+        return RemoteTab(self, self._send_object(('view',), object, kwargs))
+
+    def shutdown(self):
+        """Closes the daemon and all its windows."""
+        self._request(('shutdown',))
+        self.close()
+
+    def close(self):
+        """Closes the connection. Tabs stay open in the daemon, also those of arrays created with array(), which the
+        daemon keeps mapped. Arrays created with array() cannot be viewed anymore afterwards."""
+        self.connection.close()
+        for memory in self._shared_memories:
+            memory.unlink()
+            try:
+                memory.close()
+            except BufferError:
+                pass  # still used by arrays of the caller; unmapped when they are deleted
+        self._shared_memories = []
+
+    def _send_object(self, request, object, *arguments):
+        """Sends request + (payload,) + arguments, where the payload describes the object."""
+        if type(object).__name__ == "Tensor":
+            object = object.detach().cpu().numpy()
+        if not (isinstance(object, np.ndarray) and (object.dtype.isbuiltin == 1)):
+            return self._request(request + (('object', object),) + arguments)
+
+        descriptor, memory = share_array(object, self._shared_memories)
+        copied = memory not in self._shared_memories
+        try:
+            result = self._request(request + (('shared_array', descriptor),) + arguments)
+        except BaseException:
+            if copied:
+                memory.close()
+                memory.unlink()  # the daemon did not take it over
+            raise
+        if copied:
+            _untrack(memory)  # the daemon owns it now
+            memory.close()
+        return result
+
+    def _request(self, request):
+        with self._lock:
+            self.connection.send(request)
+            status, result = self.connection.recv()
+        if status == 'error':
+            raise RuntimeError(f"the viewer daemon failed: {result}")
+        return result
+
+
+def connect(port=default_port, start=True):
+    """Connects to the viewer daemon on this machine, starting it if it is not running.
+
+    :param port: TCP port on localhost.
+    :param start: whether to start the daemon if it is not running.
+    :return: a DaemonClient, whose view method has the same parameters as matrix_viewer.view.
+    """
+    address = ('localhost', port)
+    authkey = _get_authkey()
+    try:
+        return DaemonClient(multiprocessing.connection.Client(address, authkey=authkey))
+    except ConnectionRefusedError:
+        if not start:
+            raise
+
+    # make the package importable in the new process, even if it is not installed
+    environment = dict(os.environ)
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment['PYTHONPATH'] = os.pathsep.join([package_parent] + [environment.get('PYTHONPATH', '')]).rstrip(os.pathsep)
+    subprocess.Popen([sys.executable, '-m', 'matrix_viewer._daemon', '--port', str(port)], env=environment,
+        stdin=subprocess.DEVNULL, start_new_session=(os.name == 'posix'))
+
+    time_end = time.monotonic() + spawn_timeout
+    while True:
+        try:
+            return DaemonClient(multiprocessing.connection.Client(address, authkey=authkey))
+        except ConnectionRefusedError:
+            if time.monotonic() > time_end:
+                raise
+            time.sleep(0.1)
+
+
+def serve(port=default_port):
+    """Runs a viewer daemon in this process until a client calls shutdown."""
+    ViewerDaemon(('localhost', port)).run()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs the matrix_viewer daemon, see matrix_viewer.connect.")
+    parser.add_argument('--port', type=int, default=default_port)
+    serve(parser.parse_args().port)
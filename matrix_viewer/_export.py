@@ -0,0 +1,129 @@
+import os
+import numpy as np
+
+from ._formatting import _printf_format
+
+export_chunk_values = 1 << 20  # number of values that are read and formatted at once, bounds the memory of exports
+export_formats = {'.csv': 'csv', '.tsv': 'tsv', '.txt': 'tsv', '.npy': 'npy', '.parquet': 'parquet'}
+
+
+def full_precision_format(dtype):
+    """Returns a printf-style format that writes values of dtype without losing precision, or None if there is none."""
+    if dtype.kind in ['i', 'u']:
+        return '%d'
+    elif dtype.kind == 'b':
+        return '%s'
+    elif (dtype.kind in ['f', 'c']) and (dtype.itemsize == {'f': 8, 'c': 16}[dtype.kind]):
+        return '%r'  # the shortest string that reads back to the same value
+    elif dtype == np.float32:
+        return '%.9g'
+    elif dtype == np.float16:
+        return '%.5g'
+    return None
+
+
+def _rows_per_chunk(shape, chunk_values):
+    return max(chunk_values // max(int(np.prod(shape[1:], dtype=np.int64)), 1), 1)
+
+
+def iter_text_chunks(matrix, formatters=None, delimiter='\t', chunk_values=export_chunk_values):
+    """Yields a 2-D array as delimiter-separated text with one line per row, a chunk of rows at a time.
+
+    Rows are formatted with a single printf-style % operation per chunk if all formatters allow this (see
+    _formatting._printf_format), otherwise value by value.
+
+    :param formatters: one formatter per column like "{:.6f}".format, e. g. the formatters of a tab. None means full
+                       precision.
+    """
+    num_rows, num_columns = matrix.shape
+    if num_columns == 0:
+        return
+    if formatters is None:
+        printf_formats = [full_precision_format(matrix.dtype)] * num_columns
+        formatters = [str] * num_columns
+    else:
+        printf_formats = [_printf_format(formatter, matrix.dtype) for formatter in formatters]
+    template = None
+    if all(printf_format is not None for printf_format in printf_formats):
+        template = delimiter.replace('%', '%%').join(printf_formats) + '\n'
+
+    rows_per_chunk = _rows_per_chunk(matrix.shape, chunk_values)
+    for row_start in range(0, num_rows, rows_per_chunk):
+        block = np.asarray(matrix[row_start:row_start + rows_per_chunk])
+        if template is not None:
+            yield (template * block.shape[0]) % tuple(block.ravel().tolist())
+        else:
+            columns = [[formatter(value) for value in block[:, i_column]] for i_column, formatter in enumerate(formatters)]
+            yield ''.join([delimiter.join(row) + '\n' for row in zip(*columns)])
+
+
+def save_text(matrix, path, delimiter=',', formatters=None, progress=None):
+    """Writes a 2-D array to a CSV (or TSV) file without header, streaming chunk by chunk.
+
+    :param progress: optional function that is called with the fraction of the work done (0..1).
+    """
+    rows_per_chunk = _rows_per_chunk(matrix.shape, export_chunk_values)
+    with open(path, 'w', newline='') as file:
+        for i_chunk, text in enumerate(iter_text_chunks(matrix, formatters, delimiter)):
+            file.write(text)
+            if progress is not None:
+                progress(min((i_chunk + 1) * rows_per_chunk / matrix.shape[0], 1.0))
+
+
+def save_npy(matrix, path, progress=None, shape=None):
+    """Writes an array to a .npy file like np.save, but reads and writes it in chunks of rows, so that arrays that do
+    not fit into memory (e. g. memory-mapped or lazily copied ones) can be saved.
+
+    :param shape: shape written to the file, e. g. to save a single column as a vector. Defaults to matrix.shape.
+    """
+    dtype = np.dtype(matrix.dtype)
+    shape = tuple(matrix.shape) if shape is None else tuple(shape)
+    assert np.prod(shape, dtype=np.int64) == np.prod(matrix.shape, dtype=np.int64), "shape must have as many values as matrix"
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape}
+    rows_per_chunk = _rows_per_chunk(matrix.shape, export_chunk_values)
+    with open(path, 'wb') as file:
+        if len(repr(header)) < 65000:
+            np.lib.format.write_array_header_1_0(file, header)
+        else:  # e. g. many fields
+            np.lib.format.write_array_header_2_0(file, header)
+        for row_start in range(0, matrix.shape[0], rows_per_chunk):
+            file.write(np.ascontiguousarray(matrix[row_start:row_start + rows_per_chunk], dtype=dtype).tobytes())
+            if progress is not None:
+                progress(min((row_start + rows_per_chunk) / matrix.shape[0], 1.0))
+
+
+def save_parquet(matrix, path, column_names=None, progress=None):
+    """Writes a 2-D array to a Parquet file with one column per array column and one row group per chunk of rows.
+    Needs pyarrow.
+
+    :param column_names: defaults to "0", "1", ...
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("exporting to Parquet needs pyarrow, please install it (pip install pyarrow)") from None
+    if matrix.dtype.kind == 'c':
+        raise ValueError("Parquet does not support complex values")
+    if column_names is None:
+        column_names = [str(i_column) for i_column in range(matrix.shape[1])]
+
+    schema = pyarrow.schema([(name, pyarrow.from_numpy_dtype(matrix.dtype)) for name in column_names])
+    rows_per_chunk = _rows_per_chunk(matrix.shape, export_chunk_values)
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for row_start in range(0, matrix.shape[0], rows_per_chunk):
+            block = np.asarray(matrix[row_start:row_start + rows_per_chunk])
+            writer.write_table(pyarrow.Table.from_arrays([block[:, i_column] for i_column in range(block.shape[1])], schema=schema))
+            if progress is not None:
+                progress(min((row_start + rows_per_chunk) / matrix.shape[0], 1.0))
+
+
+def export_format(path):
+    """Returns 'csv', 'tsv', 'npy' or 'parquet' depending on the file extension of path.
+
+    :raises ValueError: for other extensions.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in export_formats:
+        raise ValueError(f"cannot export to {extension or 'files without extension'}, supported are {', '.join(export_formats)}")
+    return export_formats[extension]
@@ -0,0 +1,86 @@
+import collections
+import re
+import numpy as np
+
+# "{:.6f}".format and friends can be translated 1:1 to printf-style formats, which Python can apply to many values in a
+# single % operation. Alignment, fill and the '-' sign option are excluded because their meaning differs, and so is a
+# precision for integer conversions, which format rejects but printf pads with zeros.
+_format_string_regex = re.compile(r'^\{:([+ ]?#?0?\d*(?:(?:\.\d+)?[eEfFgG]|[dxXo]))\}$')
+_separator = '\x1f'  # ASCII unit separator, does not appear in formatted numbers
+
+
+def _printf_format(formatter, dtype):
+    """Returns the printf-style format equivalent to formatter for values of the given dtype, or None if there is none.
+
+    Only the format method of simple format strings like "{:.6f}" or "{}" is recognized.
+    """
+    format_string = getattr(formatter, '__self__', None)
+    if (not isinstance(format_string, str)) or (getattr(formatter, '__name__', None) != 'format'):
+        return None
+    if dtype.kind == 'c':
+        return None  # complex values do not support printf-style float formats
+    if (dtype.kind == 'f') and (dtype.itemsize > 8):
+        return None  # converting long doubles to Python floats would lose precision
+    if format_string == '{}':
+        # str of a Python float differs from str of a float32 / float16, so only allow types that convert exactly
+        if (dtype.kind in ['i', 'u', 'b']) or (dtype == np.float64):
+            return '%s'
+        return None
+    match = _format_string_regex.match(format_string)
+    if match is None:
+        return None
+    if (match.group(1)[-1] in 'dxXo') and (dtype.kind not in ['i', 'u', 'b']):
+        return None  # "{:d}".format raises for floats, but '%d' would silently truncate them
+    return '%' + match.group(1)
+
+
+def format_block(formatter, block):
+    """Formats all values of a 2-D block at once.
+
+    :param formatter: function that converts a single value to a string, e.g. "{:.6f}".format.
+    :param block: 2-D numpy array.
+    :return: list of rows, each row being a list of strings.
+    """
+    num_columns = block.shape[1]
+    if block.size == 0:
+        return [[] for _ in range(block.shape[0])]
+
+    printf_format = _printf_format(formatter, block.dtype)
+    if printf_format is None:
+        strings = [formatter(value) for value in block.ravel()]  # iterating yields numpy scalars, same as block[i, j]
+    else:
+        values = block.ravel().tolist()
+        strings = (_separator.join([printf_format] * len(values)) % tuple(values)).split(_separator)
+    return [strings[i:i + num_columns] for i in range(0, len(strings), num_columns)]
+
+
+class TileCache:
+    """A bounded least-recently-used cache for formatted tiles."""
+
+    def __init__(self, max_tiles=256):
+        self.max_tiles = max_tiles
+        self.hits = 0
+        self.misses = 0
+        self._tiles = collections.OrderedDict()
+
+    def get(self, key):
+        """Returns the cached tile or None if it is not cached."""
+        tile = self._tiles.get(key, None)
+        if tile is None:
+            self.misses += 1
+        else:
+            self._tiles.move_to_end(key)
+            self.hits += 1
+        return tile
+
+    def put(self, key, tile):
+        self._tiles[key] = tile
+        self._tiles.move_to_end(key)
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def clear(self):
+        self._tiles.clear()
+
+    def __len__(self):
+        return len(self._tiles)
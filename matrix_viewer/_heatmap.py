@@ -0,0 +1,71 @@
+import numpy as np
+
+from ._statistics import sample_matrix
+
+# a few colors of the viridis color map, interpolated linearly to 256 colors
+_colormap_anchors = np.array([
+    [68, 1, 84], [72, 40, 120], [62, 74, 137], [49, 104, 142], [38, 130, 142],
+    [31, 158, 137], [53, 183, 121], [110, 206, 88], [181, 222, 43], [253, 231, 37],
+], dtype=np.float64)
+nan_color = (160, 160, 160)
+
+
+def _build_colormap():
+    positions = np.linspace(0, 1, len(_colormap_anchors))
+    levels = np.linspace(0, 1, 256)
+    colormap = np.empty((257, 3), dtype=np.uint8)
+    for channel in range(3):
+        colormap[:256, channel] = np.round(np.interp(levels, positions, _colormap_anchors[:, channel]))
+    colormap[256] = nan_color  # index 256 is used for nan
+    return colormap
+
+
+colormap = _build_colormap()
+
+
+def heatmap_values(block):
+    """Converts a block of any supported dtype to the float values that are color-mapped: complex values are mapped by
+    their magnitude, booleans as 0 and 1."""
+    if block.dtype.kind == 'c':
+        return np.abs(block)
+    return block.astype(np.float64, copy=False)
+
+
+def heatmap_limits(matrix, sample_budget=1 << 20):
+    """Returns the (low, high) values of the color map. Only a sample of big arrays is analyzed, more extreme values get
+    the color of the limit."""
+    values = heatmap_values(np.asarray(sample_matrix(matrix, sample_budget)))
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return 0.0, 1.0
+    return float(finite.min()), float(finite.max())
+
+
+def heatmap_rgb(block, limits, cell_size=1, max_shape=None):
+    """Color-maps a 2-D block in one vectorized pass.
+
+    :param limits: (low, high) values that get the first and the last color.
+    :param cell_size: each value becomes a square of cell_size x cell_size pixels.
+    :param max_shape: optional (height, width) in pixels, the image is cut to this size.
+    :return: uint8 array with the shape (height, width, 3).
+    """
+    low, high = limits
+    values = heatmap_values(block)
+    scale = 255 / (high - low) if high > low else 0.0
+    with np.errstate(invalid='ignore'):
+        indices = np.clip((values - low) * scale, 0, 255)
+    indices = np.where(np.isnan(indices), 256, indices).astype(np.intp)
+    if max_shape is not None:
+        # cut before repeating, so that no pixels outside of the image are computed
+        indices = indices[:-(-max_shape[0] // cell_size), :-(-max_shape[1] // cell_size)]
+    if cell_size > 1:
+        indices = np.repeat(np.repeat(indices, cell_size, axis=0), cell_size, axis=1)
+    if max_shape is not None:
+        indices = indices[:max_shape[0], :max_shape[1]]
+    return colormap[indices]
+
+
+def ppm_data(rgb):
+    """Encodes an RGB image as binary PPM, which tk.PhotoImage can read without any conversion."""
+    height, width = rgb.shape[:2]
+    return f"P6 {width} {height} 255\n".encode('ascii') + np.ascontiguousarray(rgb).tobytes()
@@ -1,4 +1,8 @@
+import _tkinter
 import tkinter as tk
+import tkinter.font
+
+max_cached_measurements = 100000  # the measurement cache is cleared when it gets bigger
 
 
 class ManagerSingleton:
@@ -8,6 +12,11 @@ class ManagerSingleton:
         self.tk_root = None
         self.event_loop_id = None
         self.mainloop_running = False
+        self._dpi = None
+        self._fonts = {}  # (family, size) -> tk.font.Font
+        self._measurements = {}  # (font name, string) -> width in pixels
+        self._glyph_widths = {}  # font name -> {character: width in pixels}
+        self.num_font_measurements = 0  # number of measurements done by Tk, the others came from the cache
 
     def register(self, viewer):
         assert viewer not in self.registered_viewers
@@ -37,6 +46,48 @@ class ManagerSingleton:
             self.tk_root.withdraw()
         return self.tk_root
 
+    def get_dpi(self):
+        """Returns the screen resolution in pixels per inch. It is only queried once from Tk."""
+        if self._dpi is None:
+            self._dpi = self.get_or_create_root().winfo_fpixels('1i')
+        return self._dpi
+
+    def get_font(self, family, size):
+        """Returns a font that is shared by all tabs using the same family and size.
+
+        :param size: in pixels.
+        """
+        font = self._fonts.get((family, size), None)
+        if font is None:
+            self.get_or_create_root()  # default root window needed to create a font
+            font = tk.font.Font(size=-size, family=family)  # -size -> size in pixels instead of points
+            self._fonts[(family, size)] = font
+        return font
+
+    def measure_text(self, font, string):
+        """Returns the width of the string in pixels like font.measure, but caches the results for all tabs."""
+        key = (font.name, string)
+        width = self._measurements.get(key, None)
+        if width is None:
+            if len(self._measurements) >= max_cached_measurements:
+                self._measurements.clear()
+            width = font.measure(string)
+            self.num_font_measurements += 1
+            self._measurements[key] = width
+        return width
+
+    def estimate_text_width(self, font, string):
+        """Estimates the width of the string in pixels as the sum of the widths of its characters, ignoring kerning.
+
+        Each character is only measured once per font, so this is fast for long strings and strings that were never
+        measured before.
+        """
+        glyph_widths = self._glyph_widths.setdefault(font.name, {})
+        for character in set(string).difference(glyph_widths):
+            glyph_widths[character] = font.measure(character)
+            self.num_font_measurements += 1
+        return sum(map(glyph_widths.__getitem__, string))
+
     def show(self, block=True):
         if block:
             self.mainloop_running = True
@@ -45,14 +96,26 @@ class ManagerSingleton:
         else:
             pass
 
+    def process_events(self):
+        """Handles all pending events (including due timers and idle callbacks such as redraws) without waiting.
+
+        :return: the number of handled events.
+        """
+        if self.tk_root is None:
+            return 0
+        num_events = 0
+        while self.tk_root.tk.dooneevent(_tkinter.DONT_WAIT):
+            num_events += 1
+        return num_events
+
     def pause(self, timeout):
         # timeout: in seconds
 
         milliseconds = int(1000 * timeout)
-        if milliseconds > 0:
-            self.event_loop_id = self.tk_root.after(milliseconds, self.stop_event_loop)
-        else:
-            self.event_loop_id = self.tk_root.after_idle(self.stop_event_loop)
+        if milliseconds <= 0:
+            self.process_events()  # no need to start and stop the main loop
+            return
+        self.event_loop_id = self.tk_root.after(milliseconds, self.stop_event_loop)
 
         self.mainloop_running = True
         self.tk_root.mainloop()
@@ -0,0 +1,64 @@
+import collections
+
+draw_phases = ('background', 'grid_lines', 'cells', 'selection_border', 'total')
+
+
+class DrawProfiler:
+    """Rolling draw timings and counters of a tab, see ViewerTabTable.perf_stats."""
+
+    def __init__(self, num_frames=100):
+        """
+        :param num_frames: the timing statistics are computed over this many most recent draws.
+        """
+        self.num_frames = num_frames
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.phase_times = {phase: collections.deque(maxlen=self.num_frames) for phase in draw_phases}  # in seconds
+        self.counters = collections.Counter()
+
+    def add_frame(self, phase_times):
+        """Records the timings of a draw.
+
+        :param phase_times: dict phase -> seconds, for the phases in draw_phases.
+        """
+        self.frames += 1
+        for phase, seconds in phase_times.items():
+            self.phase_times[phase].append(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def stats(self):
+        """Returns the statistics as a dict, see ViewerTabTable.perf_stats."""
+        phases = {}
+        for phase, times in self.phase_times.items():
+            if len(times) == 0:
+                phases[phase] = {'last_ms': None, 'mean_ms': None, 'max_ms': None}
+            else:
+                phases[phase] = {
+                    'last_ms': times[-1] * 1000,
+                    'mean_ms': sum(times) / len(times) * 1000,
+                    'max_ms': max(times) * 1000,
+                }
+        stats = {'frames': self.frames, 'phases': phases}
+        stats.update(self.counters)
+        return stats
+
+
+def format_perf_stats(stats):
+    """Formats the result of perf_stats as a few short lines for the overlay."""
+    phases = stats['phases']
+    if phases['total']['last_ms'] is None:
+        return "no draws yet"
+    lines = [
+        "draw {:.1f} ms (mean {:.1f}, max {:.1f}), {} frames".format(
+            phases['total']['last_ms'], phases['total']['mean_ms'], phases['total']['max_ms'], stats['frames']),
+        "background {:.1f}  grid {:.1f}  cells {:.1f}  border {:.1f}".format(*(phases[phase]['mean_ms'] for phase in
+            ['background', 'grid_lines', 'cells', 'selection_border'])),
+    ]
+    counters = [(name, value) for name, value in stats.items() if name not in ['frames', 'phases']]
+    for i in range(0, len(counters), 2):
+        lines.append("  ".join(f"{name.replace('_', ' ')} {value}" for name, value in counters[i:i + 2]))
+    return "\n".join(lines)
@@ -0,0 +1,191 @@
+import concurrent.futures
+import os
+import warnings
+import numpy as np
+
+from ._heatmap import heatmap_values
+
+pyramid_memory_budget = 256 << 20  # bytes, levels that would need more memory are not stored
+pyramid_statistics = ('min', 'max', 'mean')
+
+
+def num_pyramid_levels(shape):
+    """Returns the level at which the whole 2-D array is reduced to a single value."""
+    level = 0
+    while max(shape[0], shape[1]) > 2 ** level:
+        level += 1
+    return level
+
+
+def first_pyramid_level(shape, memory_budget=pyramid_memory_budget):
+    """Returns the finest level whose values, together with all coarser levels, fit into memory_budget bytes.
+    Each level stores the three statistics as float32."""
+    level = 1
+    while (shape[0] * shape[1] / 4 ** level) * len(pyramid_statistics) * 4 * 4 / 3 > memory_budget:
+        level += 1
+    return level
+
+
+def reduce_blocks(values, factor, statistic):
+    """Reduces each factor x factor block of a 2-D float array to its min, max, mean or sum, or counts its values
+    ('count'), ignoring nan. Incomplete blocks at the bottom and right border are reduced, too."""
+    num_rows, num_columns = values.shape
+    padding = (-num_rows % factor, -num_columns % factor)
+    if padding != (0, 0):
+        values = np.pad(values, ((0, padding[0]), (0, padding[1])), constant_values=np.nan)
+    blocks = values.reshape(values.shape[0] // factor, factor, values.shape[1] // factor, factor)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-nan blocks
+        if statistic == 'min':
+            return np.nanmin(blocks, axis=(1, 3))
+        elif statistic == 'max':
+            return np.nanmax(blocks, axis=(1, 3))
+        elif statistic == 'sum':
+            return np.nansum(blocks, axis=(1, 3))
+        elif statistic == 'count':
+            return np.sum(~np.isnan(blocks), axis=(1, 3))
+        else:
+            return np.nanmean(blocks, axis=(1, 3))
+
+
+def reduce_level(task, matrix, factor, rows, columns, chunk_size, num_threads):
+    """Reduces the factor x factor blocks of matrix[rows, columns] to their min, max and mean, ignoring nan. The rows
+    are read in stripes of about chunk_size values, which are distributed over a thread pool (numpy releases the GIL
+    during the reductions).
+
+    :param task: object with the attributes cancelled, which stops early, and progress, which is set to the fraction
+                 of the stripes done.
+    :param rows: range of the rows, its start has to be a multiple of factor. Likewise for columns.
+    :return: ({statistic: float32 array}, number of non-nan values per block), or None if cancelled.
+    """
+    num_rows = len(rows)
+    num_columns = len(columns)
+    level_shape = (-(-num_rows // factor), -(-num_columns // factor))
+    arrays = {statistic: np.empty(level_shape, dtype=np.float32) for statistic in pyramid_statistics}
+    counts = np.empty(level_shape, dtype=np.float32)
+    stripe_rows = max(chunk_size // max(num_columns * factor, 1), 1) * factor
+    stripe_starts = range(0, num_rows, stripe_rows)
+
+    def reduce_stripe(row_start):
+        if task.cancelled:
+            return
+        stripe = slice(rows.start + row_start, rows.start + min(row_start + stripe_rows, num_rows))
+        values = heatmap_values(np.asarray(matrix[stripe, columns.start:columns.stop]))
+        for statistic in pyramid_statistics:
+            reduced = reduce_blocks(values, factor, statistic)
+            arrays[statistic][row_start // factor:row_start // factor + reduced.shape[0]] = reduced
+        reduced = reduce_blocks(values, factor, 'count')
+        counts[row_start // factor:row_start // factor + reduced.shape[0]] = reduced
+
+    if num_threads is None:
+        num_threads = os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
+        futures = [executor.submit(reduce_stripe, row_start) for row_start in stripe_starts]
+        for i_done, future in enumerate(concurrent.futures.as_completed(futures)):
+            future.result()
+            task.progress = (i_done + 1) / len(futures)
+    if task.cancelled:
+        return None
+    return arrays, counts
+
+
+class Pyramid:
+    """A min / max / mean pyramid (mipmap) of a 2-D array, for heatmaps that are zoomed out.
+
+    Level k has one value per 2**k x 2**k block of the array. Levels below first_level are not stored to save memory,
+    see PyramidWindow for a part of them. Values are mapped like in the heatmap, i. e. complex values by their magnitude.
+    """
+
+    def __init__(self, matrix, memory_budget=pyramid_memory_budget):
+        self.matrix = matrix
+        self.first_level = first_pyramid_level(matrix.shape, memory_budget)
+        self.num_levels = num_pyramid_levels(matrix.shape)
+        self.levels = {}  # level -> {statistic: float32 array}, only contains finished levels
+        self.progress = 0.0
+        self.cancelled = False
+
+    def get(self, level, statistic='mean'):
+        """Returns the array of a level, or None if it is not stored or not built yet."""
+        arrays = self.levels.get(level, None)
+        return None if arrays is None else arrays[statistic]
+
+    def coarser_level(self, level):
+        """Returns the finest built level above level, or None if there is none yet."""
+        built = [stored_level for stored_level in self.levels if stored_level > level]
+        return min(built) if built else None
+
+    def build(self, chunk_size=1 << 22, num_threads=None):
+        """Builds all levels. The first level is computed from stripes of about chunk_size values on a thread pool (see
+        reduce_level); the other levels are computed from the previous level. Can run on a worker thread; set cancelled
+        to stop early."""
+        if self.first_level > self.num_levels:
+            return
+        num_rows, num_columns = self.matrix.shape
+        reduced = reduce_level(self, self.matrix, 2 ** self.first_level, range(num_rows), range(num_columns), chunk_size,
+            num_threads)
+        if reduced is None:
+            return
+        arrays, counts = reduced  # the counts of non-nan values per block weight the means
+        self.levels[self.first_level] = arrays
+
+        for level in range(self.first_level + 1, self.num_levels + 1):
+            if self.cancelled:
+                return
+            # border blocks and blocks with nan contain fewer values, so the mean of the means would be biased
+            sums = reduce_blocks(arrays['mean'] * counts, 2, 'sum')
+            counts = reduce_blocks(counts, 2, 'sum')
+            with np.errstate(invalid='ignore'):
+                means = (sums / counts).astype(np.float32)
+            arrays = {
+                'min': reduce_blocks(arrays['min'], 2, 'min'),
+                'max': reduce_blocks(arrays['max'], 2, 'max'),
+                'mean': means,
+            }
+            self.levels[level] = arrays
+
+
+class PyramidWindow:
+    """A part of a pyramid level that is too big to be stored as a whole, e. g. the visible part of a heatmap.
+
+    Its values are the same as those of the whole level would be. build reads the cells of the part and can run on a
+    worker thread; set cancelled to stop early.
+    """
+
+    def __init__(self, matrix, level, block_row_start, block_row_end, block_column_start, block_column_end):
+        """
+        :param block_row_start: first row of the level, i. e. of 2**level x 2**level blocks, in the window. Likewise
+                                for the other arguments, the ends are exclusive.
+        """
+        self.matrix = matrix
+        self.level = level
+        self.block_rows = range(block_row_start, block_row_end)
+        self.block_columns = range(block_column_start, block_column_end)
+        self.levels = {}  # level -> {statistic: float32 array} once finished, like Pyramid.levels
+        self.progress = 0.0
+        self.cancelled = False
+
+    @property
+    def finished(self):
+        return self.level in self.levels
+
+    def contains(self, level, block_row_start, block_row_end, block_column_start, block_column_end):
+        """Whether the window covers the given blocks of the level."""
+        return ((level == self.level) and (self.block_rows.start <= block_row_start) and (block_row_end <= self.block_rows.stop)
+            and (self.block_columns.start <= block_column_start) and (block_column_end <= self.block_columns.stop))
+
+    def get(self, statistic, block_row_start, block_row_end, block_column_start, block_column_end):
+        """Returns the given blocks (see contains), or None if the window is not built yet."""
+        arrays = self.levels.get(self.level, None)
+        if arrays is None:
+            return None
+        return arrays[statistic][block_row_start - self.block_rows.start:block_row_end - self.block_rows.start,
+            block_column_start - self.block_columns.start:block_column_end - self.block_columns.start]
+
+    def build(self, chunk_size=1 << 22, num_threads=None):
+        factor = 2 ** self.level
+        num_rows, num_columns = self.matrix.shape
+        rows = range(self.block_rows.start * factor, min(self.block_rows.stop * factor, num_rows))
+        columns = range(self.block_columns.start * factor, min(self.block_columns.stop * factor, num_columns))
+        reduced = reduce_level(self, self.matrix, factor, rows, columns, chunk_size, num_threads)
+        if reduced is not None:
+            self.levels[self.level] = reduced[0]
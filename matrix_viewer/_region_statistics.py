@@ -0,0 +1,264 @@
+import math
+import warnings
+import numpy as np
+
+min_block_values = 4096  # number of values per block of the tables
+max_blocks = 1 << 18  # bigger arrays get bigger blocks, so that the block tables need at most a few 10 MB
+min_aggregated_cells = 8  # the columns (rows) within a stripe (column of blocks) are aggregated if it is at least this high (wide)
+direct_budget = 1 << 18  # regions with at most this many values are reduced directly while their tables are not built
+
+
+def reduce_values(values):
+    """Returns (sum, nan count, min, max) of a block, ignoring nan. min and max are None for complex or empty blocks
+    and blocks that only contain nan. Integers are summed as float64, complex values as complex128."""
+    sum_dtype = np.complex128 if values.dtype.kind == 'c' else np.float64
+    if values.dtype.kind in ['f', 'c']:
+        nans = np.isnan(values)
+        num_nans = int(np.count_nonzero(nans))
+        total = np.sum(np.where(nans, 0, values), dtype=sum_dtype) if num_nans > 0 else np.sum(values, dtype=sum_dtype)
+    else:
+        num_nans = 0
+        total = np.sum(values, dtype=sum_dtype)
+    if (values.dtype.kind == 'c') or (values.size == num_nans):
+        return total, num_nans, None, None
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return total, num_nans, np.fmin.reduce(values, axis=None), np.fmax.reduce(values, axis=None)
+
+
+def _combine(statistics, other):
+    """Combines two results of reduce_values."""
+    def extreme(function, a, b):
+        if a is None:
+            return b
+        if (b is None) or np.isnan(b):
+            return a
+        return function(a, b)
+    return (statistics[0] + other[0], statistics[1] + other[1], extreme(np.fmin, statistics[2], other[2]),
+        extreme(np.fmax, statistics[3], other[3]))
+
+
+class RegionStatistics:
+    """Sum, mean, min, max and number of nan values of rectangular regions of a 2-D array, e. g. of the selection.
+
+    The array is divided into blocks. build computes the sum, nan count, min and max of each block, of each column
+    within each stripe of blocks and of each row within each column of blocks, one stripe after the other, and can run
+    on a worker thread. A region is split at the block borders into up to nine parts. Summed-area tables of the block
+    sums and nan counts give the totals of the blocks inside the region in constant time; sparse tables of each stripe
+    give their min and max with one lookup per stripe. The border strips are reduced from the column and row
+    aggregates, and only the corners, which are smaller than a block, are read from the array. So the cost of a query
+    is bounded by the block size and the number of blocks, not by the size of the region. Small regions are reduced
+    directly while the tables are built.
+
+    The column and row aggregates need about as many values as the array divided by the block height (width), e. g.
+    a sixth of the size of a float32 array with blocks of 64 x 64 values.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        num_rows, num_columns = matrix.shape
+        block_values = max(min_block_values, -(-num_rows * num_columns // max_blocks))
+        # square blocks, unless the array is too narrow or too flat for them
+        self.block_columns = max(min(num_columns, int(math.sqrt(block_values))), 1)
+        self.block_rows = max(min(num_rows, block_values // self.block_columns), 1)
+        self.block_columns = max(min(num_columns, block_values // self.block_rows), 1)
+        self.num_block_rows = -(-num_rows // self.block_rows)
+        self.num_block_columns = -(-num_columns // self.block_columns)
+        self.has_extremes = matrix.dtype.kind != 'c'
+        self.has_nans = matrix.dtype.kind in ['f', 'c']
+        sum_dtype = np.complex128 if matrix.dtype.kind == 'c' else np.float64
+
+        table_shape = (self.num_block_rows + 1, self.num_block_columns + 1)
+        self._sums = np.zeros(table_shape, dtype=sum_dtype)
+        self._nans = np.zeros(table_shape, dtype=np.int64)
+        # sparse tables, level k contains the min / max of the blocks i..i + 2**k - 1 of each stripe
+        self._mins = []
+        self._maxs = []
+        if self.has_extremes:
+            for level in range(self.num_block_columns.bit_length()):
+                table_shape = (self.num_block_rows, self.num_block_columns - 2 ** level + 1)
+                self._mins.append(np.empty(table_shape, dtype=matrix.dtype))
+                self._maxs.append(np.empty(table_shape, dtype=matrix.dtype))
+        # [sums, nan counts, mins, maxs] of each column within each stripe and of each row within each column of
+        # blocks. They are only worth their memory if the blocks are more than a few cells high (wide).
+        self._column_tables = None
+        if self.block_rows >= min_aggregated_cells:
+            self._column_tables = self._aggregate_tables((self.num_block_rows, num_columns), sum_dtype)
+        self._row_tables = None
+        if self.block_columns >= min_aggregated_cells:
+            self._row_tables = self._aggregate_tables((num_rows, self.num_block_columns), sum_dtype)
+        self.num_built = 0  # number of stripes whose tables are complete
+        self.cancelled = False
+
+    def _aggregate_tables(self, shape, sum_dtype):
+        return [
+            np.zeros(shape, dtype=sum_dtype),
+            np.zeros(shape, dtype=np.int32) if self.has_nans else None,
+            np.empty(shape, dtype=self.matrix.dtype) if self.has_extremes else None,
+            np.empty(shape, dtype=self.matrix.dtype) if self.has_extremes else None,
+        ]
+
+    @property
+    def finished(self):
+        return self.num_built == self.num_block_rows
+
+    def build(self):
+        """Fills the tables stripe by stripe. Can run on a worker thread; set cancelled to stop early."""
+        starts = np.arange(0, self.matrix.shape[1], self.block_columns)
+        for i_stripe in range(self.num_block_rows):
+            if self.cancelled:
+                return
+            stripe_rows = slice(i_stripe * self.block_rows, (i_stripe + 1) * self.block_rows)
+            values = np.asarray(self.matrix[stripe_rows])
+            nan_mask = np.isnan(values) if self.has_nans else None
+            numbers = np.where(nan_mask, 0, values) if self.has_nans else values
+            column_sums = np.sum(numbers, axis=0, dtype=self._sums.dtype)
+            column_nans = np.count_nonzero(nan_mask, axis=0) if self.has_nans else np.zeros(values.shape[1], dtype=np.int64)
+            sums = np.add.reduceat(column_sums, starts)
+            nans = np.add.reduceat(column_nans, starts)
+            self._sums[i_stripe + 1, 1:] = self._sums[i_stripe, 1:] + np.cumsum(sums)
+            self._nans[i_stripe + 1, 1:] = self._nans[i_stripe, 1:] + np.cumsum(nans)
+
+            column_mins = column_maxs = None
+            if self.has_extremes:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    column_mins = np.fmin.reduce(values, axis=0)
+                    column_maxs = np.fmax.reduce(values, axis=0)
+                    self._mins[0][i_stripe] = np.fmin.reduceat(column_mins, starts)
+                    self._maxs[0][i_stripe] = np.fmax.reduceat(column_maxs, starts)
+                for level in range(1, len(self._mins)):
+                    half = 2 ** (level - 1)
+                    length = self._mins[level].shape[1]
+                    self._mins[level][i_stripe] = np.fmin(self._mins[level - 1][i_stripe, :length], self._mins[level - 1][i_stripe, half:half + length])
+                    self._maxs[level][i_stripe] = np.fmax(self._maxs[level - 1][i_stripe, :length], self._maxs[level - 1][i_stripe, half:half + length])
+
+            if self._column_tables is not None:
+                for table, column_values in zip(self._column_tables, [column_sums, column_nans, column_mins, column_maxs]):
+                    if table is not None:
+                        table[i_stripe] = column_values
+            if self._row_tables is not None:
+                row_values = [np.add.reduceat(numbers, starts, axis=1, dtype=self._sums.dtype),
+                    np.add.reduceat(nan_mask, starts, axis=1, dtype=np.int32) if self.has_nans else None, None, None]
+                if self.has_extremes:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter('ignore', RuntimeWarning)
+                        row_values[2] = np.fmin.reduceat(values, starts, axis=1)
+                        row_values[3] = np.fmax.reduceat(values, starts, axis=1)
+                for table, stripe_values in zip(self._row_tables, row_values):
+                    if table is not None:
+                        table[stripe_rows] = stripe_values
+            self.num_built = i_stripe + 1  # last, so that the tables of the stripe are complete
+
+    def region(self, row_start, row_end, column_start, column_end):
+        """Returns the statistics of matrix[row_start:row_end, column_start:column_end].
+
+        :return: dict with shape, sum, mean, min, max and nan_count, where mean, min and max are None if the region
+                 contains no numbers (and min and max for complex arrays). None if the region is big and the tables
+                 of its stripes are not built yet.
+        """
+        row_start, row_end, column_start, column_end = int(row_start), int(row_end), int(column_start), int(column_end)
+        num_rows = row_end - row_start
+        num_columns = column_end - column_start
+        if (row_end - 1) // self.block_rows >= self.num_built:
+            if num_rows * num_columns > direct_budget:
+                return None
+            statistics = reduce_values(np.asarray(self.matrix[row_start:row_end, column_start:column_end]))
+        else:
+            statistics = (0, 0, None, None)
+            # the rows (columns) are split into the whole stripes (columns of blocks) and the cells before and after
+            row_parts = _split(row_start, row_end, self.block_rows)
+            column_parts = _split(column_start, column_end, self.block_columns)
+            for i_row_part, (part_row_start, part_row_end) in enumerate(row_parts):
+                for i_column_part, (part_column_start, part_column_end) in enumerate(column_parts):
+                    if (part_row_end <= part_row_start) or (part_column_end <= part_column_start):
+                        continue
+                    whole_rows = i_row_part == 1
+                    whole_columns = i_column_part == 1
+                    if whole_rows and whole_columns:
+                        part = self._blocks(part_row_start // self.block_rows, part_row_end // self.block_rows,
+                            part_column_start // self.block_columns, part_column_end // self.block_columns)
+                    elif whole_rows and (self._column_tables is not None):
+                        part = _reduce_tables(self._column_tables,
+                            slice(part_row_start // self.block_rows, part_row_end // self.block_rows), slice(part_column_start, part_column_end))
+                    elif whole_columns and (self._row_tables is not None):
+                        part = _reduce_tables(self._row_tables, slice(part_row_start, part_row_end),
+                            slice(part_column_start // self.block_columns, part_column_end // self.block_columns))
+                    else:  # a corner, or a strip of an array that is only a few cells high or wide
+                        part = reduce_values(np.asarray(self.matrix[part_row_start:part_row_end, part_column_start:part_column_end]))
+                    statistics = _combine(statistics, part)
+
+        total, num_nans, minimum, maximum = statistics
+        num_numbers = num_rows * num_columns - num_nans
+        total = total.item() if isinstance(total, np.generic) else total
+        if isinstance(total, int):
+            total = float(total)
+        return {
+            'shape': (num_rows, num_columns),
+            'sum': total,
+            'mean': (total / num_numbers) if num_numbers > 0 else None,
+            'min': None if (minimum is None) or np.isnan(minimum) else minimum.item(),
+            'max': None if (maximum is None) or np.isnan(maximum) else maximum.item(),
+            'nan_count': int(num_nans),
+        }
+
+    def _blocks(self, block_row_start, block_row_end, block_column_start, block_column_end):
+        """Returns (sum, nan count, min, max) of the blocks in the given range of built stripes."""
+        def rectangle(table):
+            return (table[block_row_end, block_column_end] - table[block_row_start, block_column_end]
+                - table[block_row_end, block_column_start] + table[block_row_start, block_column_start])
+
+        minimum = maximum = None
+        if self.has_extremes:
+            level = (block_column_end - block_column_start).bit_length() - 1
+            second = block_column_end - 2 ** level  # the two ranges of 2**level blocks overlap
+            rows = slice(block_row_start, block_row_end)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                minimum = np.fmin.reduce(np.fmin(self._mins[level][rows, block_column_start], self._mins[level][rows, second]))
+                maximum = np.fmax.reduce(np.fmax(self._maxs[level][rows, block_column_start], self._maxs[level][rows, second]))
+            if np.isnan(minimum):
+                minimum = maximum = None
+        return rectangle(self._sums), int(rectangle(self._nans)), minimum, maximum
+
+
+def _split(start, end, block_size):
+    """Splits the range start:end into the part before the first block border, the whole blocks and the part after
+    the last block border. If there are no whole blocks, the first part is the whole range."""
+    inner_start = -(-start // block_size) * block_size
+    inner_end = end // block_size * block_size
+    if inner_start >= inner_end:
+        return [(start, end), (end, end), (end, end)]
+    return [(start, inner_start), (inner_start, inner_end), (inner_end, end)]
+
+
+def _reduce_tables(tables, rows, columns):
+    """Returns (sum, nan count, min, max) of the given part of the column or row aggregates."""
+    sums, nans, mins, maxs = tables
+    minimum = maximum = None
+    if mins is not None:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            minimum = np.fmin.reduce(mins[rows, columns], axis=None)
+            maximum = np.fmax.reduce(maxs[rows, columns], axis=None)
+        if np.isnan(minimum):
+            minimum = maximum = None  # only nan
+    return np.sum(sums[rows, columns]), 0 if nans is None else int(np.sum(nans[rows, columns], dtype=np.int64)), minimum, maximum
+
+
+def format_statistics(statistics):
+    """Formats the result of RegionStatistics.region for the status bar."""
+    def number(value):
+        if value is None:
+            return "-"
+        return f"{value:.6g}" if isinstance(value, (float, complex)) else str(value)
+    parts = [
+        f"{statistics['shape'][0]} x {statistics['shape'][1]}",
+        f"Sum: {number(statistics['sum'])}",
+        f"Mean: {number(statistics['mean'])}",
+        f"Min: {number(statistics['min'])}",
+        f"Max: {number(statistics['max'])}",
+    ]
+    if statistics['nan_count'] > 0:
+        parts.append(f"NaN: {statistics['nan_count']}")
+    return "    ".join(parts)
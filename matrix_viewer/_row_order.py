@@ -0,0 +1,118 @@
+import numpy as np
+
+from ._search import parse_query, search_chunk_size
+
+
+def sort_order(values, descending=False):
+    """Returns the indices that sort a 1-D array. The sort is stable in both directions, and nan values come last."""
+    values = np.asarray(values)
+    if not descending:
+        return np.argsort(values, kind='stable')
+    # sorting the reversed values and reversing the result keeps equal values in their original order
+    order = (len(values) - 1 - np.argsort(values[::-1], kind='stable'))[::-1]
+    if values.dtype.kind in ['f', 'c']:
+        num_nans = int(np.count_nonzero(np.isnan(values)))
+        order = np.concatenate([order[num_nans:], order[:num_nans]])  # the nan values were sorted to the front
+    return order
+
+
+class RowView:
+    """The rows of a 2-D array in another order or a subset of them, without copying the array.
+
+    Indexing works like for a 2-D numpy array, where the first index refers to the displayed rows. Only the rows that
+    are read are gathered from the array.
+    """
+
+    def __init__(self, matrix, rows):
+        """
+        :param rows: integer array of the rows of matrix in the displayed order.
+        """
+        self.matrix = matrix
+        self.rows = rows
+        self.shape = (len(rows), matrix.shape[1])
+        self.dtype = matrix.dtype
+        self.ndim = 2
+        self.size = self.shape[0] * self.shape[1]
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        row_key, column_key = key + (slice(None),) * (2 - len(key))
+        rows = self.rows[row_key]
+        if isinstance(self.matrix, np.ndarray):
+            return self.matrix[rows, column_key]
+        # e. g. a LazySnapshot, which only supports basic indexing
+        if np.ndim(rows) == 0:
+            return np.asarray(self.matrix[int(rows), column_key])
+        values = [np.asarray(self.matrix[row, column_key]) for row in rows.tolist()]
+        if len(values) == 0:
+            return np.empty((0, self.matrix.shape[1]), dtype=self.dtype)[:, column_key]
+        return np.stack(values)
+
+    def __array__(self, dtype=None, copy=None):
+        """Gathers (and thereby copies) all rows."""
+        array = self[:, :]
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    def __len__(self):
+        return self.shape[0]
+
+
+class RowOrder:
+    """Computes which rows of a 2-D array are displayed and in which order: the rows can be sorted by a column and
+    filtered by a query (see _search.parse_query).
+
+    run can take long for big arrays and can run on a worker thread. The sort order of a column can be passed in again,
+    so that it is only computed once.
+    """
+
+    def __init__(self, matrix, sort_column=None, descending=False, query=None, filter_column=None, sorted_rows=None,
+            chunk_size=search_chunk_size):
+        """
+        :param filter_column: the column that has to match the query. None means that any column of a row can match.
+        :param sorted_rows: result of an earlier sort_order of the sort column in the same direction, if known.
+        :raises ValueError: if the query is invalid.
+        """
+        self.matrix = matrix
+        self.sort_column = sort_column
+        self.descending = descending
+        self.query = query
+        self.filter_column = filter_column
+        self._predicate = None if query is None else parse_query(query)
+        self.sorted_rows = sorted_rows
+        self._chunk_rows = max(chunk_size // max(matrix.shape[1] if filter_column is None else 1, 1), 1)
+        self.rows = None  # the displayed rows, None means all rows in their original order
+        self.progress = 0.0
+        self.error = None
+        self.cancelled = False
+        self.finished = False
+
+    def run(self):
+        """Sorts and filters. Errors of the query are stored in error."""
+        try:
+            rows = None
+            if self.sort_column is not None:
+                if self.sorted_rows is None:
+                    self.sorted_rows = sort_order(self.matrix[:, self.sort_column], self.descending)
+                rows = self.sorted_rows
+            if self._predicate is not None:
+                num_rows = self.matrix.shape[0]
+                mask = np.empty(num_rows, dtype=bool)
+                for row_start in range(0, num_rows, self._chunk_rows):
+                    if self.cancelled:
+                        return
+                    if self.filter_column is None:
+                        block = np.asarray(self.matrix[row_start:row_start + self._chunk_rows])
+                        mask[row_start:row_start + len(block)] = np.any(self._predicate(block), axis=1)
+                    else:
+                        column = np.asarray(self.matrix[row_start:row_start + self._chunk_rows, self.filter_column])
+                        mask[row_start:row_start + len(column)] = self._predicate(column)
+                    self.progress = min((row_start + self._chunk_rows) / num_rows, 1.0)
+                rows = np.flatnonzero(mask) if rows is None else rows[mask[rows]]
+            self.rows = rows
+        except Exception as e:
+            self.error = e
+        self.progress = 1.0
+        self.finished = True  # last, so that rows is complete
@@ -0,0 +1,174 @@
+import numpy as np
+
+from ._utils import clip
+
+search_chunk_size = 1 << 20  # number of values that are compared at once
+max_stored_hits = 4096  # chunks with more hits only store their number, the positions are computed again when needed
+_comparison_operators = ('<', '>', '=', '!')
+
+
+def parse_query(query):
+    """Converts a search query to a function(block) returning a boolean array that marks the matching values.
+
+    The query can be
+    * a value, e. g. ``3.5``, ``-1`` or ``nan``. The value is converted to the dtype of the array first, so searching
+      0.1 finds float32(0.1). Note that the displayed values may be rounded.
+    * a range ``low..high`` including both limits. One of the limits can be omitted, e. g. ``..0``.
+    * an expression of x, e. g. ``abs(x) > 1e3`` or ``(x > 0) & (x % 2 == 1)``, where np is numpy. If it starts with a
+      comparison operator, x is added in front, so ``> 1e3`` means ``x > 1e3``.
+
+    :raises ValueError: if the query is invalid.
+    """
+    query = query.strip()
+    if query == '':
+        raise ValueError("empty search query")
+
+    if '..' in query:
+        low, high = query.split('..', 1)
+        try:
+            low = float(low) if low.strip() != '' else None
+            high = float(high) if high.strip() != '' else None
+        except ValueError:
+            pass  # e. g. an expression containing a float like 1..real
+        else:
+            def matches_range(block):
+                mask = np.ones(block.shape, dtype=bool)
+                if low is not None:
+                    mask &= block >= low
+                if high is not None:
+                    mask &= block <= high
+                return mask
+            return matches_range
+
+    try:
+        value = int(query)  # exact, also for big integers
+    except ValueError:
+        try:
+            value = complex(query.replace(' ', ''))
+        except ValueError:
+            value = None
+        else:
+            if value.imag == 0:
+                value = value.real
+    if value is not None:
+        is_nan = value != value
+
+        def matches_value(block):
+            if is_nan:
+                return np.isnan(block) if block.dtype.kind in ['f', 'c'] else np.zeros(block.shape, dtype=bool)
+            if block.dtype.kind in ['f', 'c']:
+                return block == np.array(value).astype(block.dtype)
+            return block == value
+        return matches_value
+
+    if query.startswith(_comparison_operators):
+        query = 'x ' + query
+    try:
+        code = compile(query, '<search query>', 'eval')
+    except SyntaxError as e:
+        raise ValueError(f"invalid search query: {e.msg}") from None
+
+    def matches_expression(block):
+        return np.broadcast_to(np.asarray(eval(code, {'np': np, 'abs': np.abs}, {'x': block}), dtype=bool), block.shape)
+    return matches_expression
+
+
+class Search:
+    """Finds the cells of a 2-D array that match a query (see parse_query).
+
+    The array is scanned in chunks of rows, which can run on a worker thread (see run). The chunks are scanned in the
+    search direction, beginning at the chunk of a start row and wrapping around, so the next hit is usually known long
+    before the whole array was scanned. next_hit can be called at any time from another thread.
+    """
+
+    def __init__(self, matrix, query, start_row=0, forward=True, chunk_size=search_chunk_size):
+        """
+        :raises ValueError: if the query is invalid.
+        """
+        self.matrix = matrix
+        self.query = query
+        self._predicate = parse_query(query)
+        num_rows, self._num_columns = matrix.shape
+        self._chunk_rows = max(chunk_size // max(self._num_columns, 1), 1)
+        if self._num_columns == 0:
+            num_rows = 0  # nothing to find
+        self.num_chunks = -(-num_rows // self._chunk_rows)
+        self.counts = np.full(self.num_chunks, -1, dtype=np.int64)  # hits per chunk, -1 if not scanned yet
+        self._hits = {}  # chunk -> sorted flat indices of the hits, for chunks with at most max_stored_hits hits
+        self.num_scanned = 0
+        self.error = None
+        self.cancelled = False
+
+        first = clip(start_row // self._chunk_rows, 0, max(self.num_chunks - 1, 0))
+        if forward:
+            self._order = [(first + i) % self.num_chunks for i in range(self.num_chunks)]
+        else:
+            self._order = [(first - i) % self.num_chunks for i in range(self.num_chunks)]
+
+    @property
+    def finished(self):
+        return (self.num_scanned == self.num_chunks) or (self.error is not None)
+
+    @property
+    def progress(self):
+        """Fraction of the array that was scanned (0..1)."""
+        return self.num_scanned / self.num_chunks if self.num_chunks > 0 else 1.0
+
+    @property
+    def num_hits(self):
+        """Number of hits in the chunks that were scanned so far."""
+        return int(self.counts[self.counts > 0].sum())
+
+    def run(self):
+        """Scans all chunks. Stops early if cancelled is set. Errors of the query are stored in error."""
+        try:
+            for chunk in self._order:
+                if self.cancelled:
+                    return
+                hits = self._evaluate(chunk)
+                if len(hits) <= max_stored_hits:
+                    self._hits[chunk] = hits
+                self.counts[chunk] = len(hits)  # last, so that _hits is complete when the chunk counts as scanned
+                self.num_scanned += 1
+        except Exception as e:
+            self.error = e
+
+    def _evaluate(self, chunk):
+        """Returns the sorted flat indices (row * number of columns + column) of the hits in a chunk."""
+        row_start = chunk * self._chunk_rows
+        block = np.asarray(self.matrix[row_start:row_start + self._chunk_rows])
+        return np.flatnonzero(self._predicate(block)) + row_start * self._num_columns
+
+    def _chunk_hits(self, chunk):
+        hits = self._hits.get(chunk, None)
+        return self._evaluate(chunk) if hits is None else hits
+
+    def next_hit(self, row, column, forward=True):
+        """Returns (row, column) of the first hit after the cell (row, column), or before it if not forward. The search
+        wraps around at the end of the array, so the cell itself is returned if it is the only hit. column may be -1
+        (or the number of columns) to include the first (or the last) cell of the row.
+
+        :return: None if there is no hit in the scanned chunks up to the first chunk that was not scanned yet. If the
+                 search is finished, None means that there is no hit at all.
+        """
+        if self.num_chunks == 0:
+            return None
+        position = row * self._num_columns + column
+        chunk_values = self._chunk_rows * self._num_columns
+        first = clip(position // chunk_values, 0, self.num_chunks - 1)
+        step = 1 if forward else -1
+        for i in range(self.num_chunks + 1):
+            chunk = (first + i * step) % self.num_chunks
+            if self.counts[chunk] < 0:
+                return None  # a hit in this chunk would come first
+            if self.counts[chunk] == 0:
+                continue
+            hits = self._chunk_hits(chunk)
+            if i == 0:  # only the hits after the position
+                hits = hits[hits > position] if forward else hits[hits < position]
+            elif i == self.num_chunks:  # wrapped around, only the hits before the position
+                hits = hits[hits <= position] if forward else hits[hits >= position]
+            if len(hits) > 0:
+                hit = int(hits[0] if forward else hits[-1])
+                return hit // self._num_columns, hit % self._num_columns
+        return None
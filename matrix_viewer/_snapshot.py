@@ -0,0 +1,111 @@
+import numpy as np
+
+snapshot_policies = ('copy', 'view', 'lazy')
+
+
+class LazySnapshot:
+    """A 2-D array that copies blocks of the source array the first time they are read.
+
+    Once a block was read, later changes of the source array are not visible in that block anymore. Only basic indexing
+    with two slices or integers is supported without copying the whole array.
+    """
+
+    def __init__(self, source, block_shape=(256, 256)):
+        assert source.ndim == 2, "LazySnapshot only supports 2-D arrays"
+        self.source = source
+        self.block_shape = block_shape
+        self.shape = source.shape
+        self.dtype = source.dtype
+        self.ndim = 2
+        self.size = source.size
+        self._blocks = {}  # (block_row, block_column) -> copied block
+
+    @property
+    def nbytes_copied(self):
+        """Number of bytes of the source array that were copied so far."""
+        return sum(block.nbytes for block in self._blocks.values())
+
+    def _block(self, block_row, block_column):
+        block = self._blocks.get((block_row, block_column), None)
+        if block is None:
+            row_start = block_row * self.block_shape[0]
+            column_start = block_column * self.block_shape[1]
+            block = self.source[row_start:row_start + self.block_shape[0], column_start:column_start + self.block_shape[1]].copy()
+            self._blocks[(block_row, block_column)] = block
+        return block
+
+    def _read(self, row_start, row_end, column_start, column_end):
+        block_rows, block_columns = self.block_shape
+        first_block_row, first_block_column = row_start // block_rows, column_start // block_columns
+        if ((row_end - 1) // block_rows == first_block_row) and ((column_end - 1) // block_columns == first_block_column):
+            # inside a single block, so a view can be returned
+            block = self._block(first_block_row, first_block_column)
+            row_offset, column_offset = first_block_row * block_rows, first_block_column * block_columns
+            return block[row_start - row_offset:row_end - row_offset, column_start - column_offset:column_end - column_offset]
+
+        result = np.empty((row_end - row_start, column_end - column_start), dtype=self.dtype)
+        for block_row in range(first_block_row, (row_end - 1) // block_rows + 1):
+            block_row_start = block_row * block_rows
+            r0, r1 = max(row_start, block_row_start), min(row_end, block_row_start + block_rows)
+            for block_column in range(first_block_column, (column_end - 1) // block_columns + 1):
+                block_column_start = block_column * block_columns
+                c0, c1 = max(column_start, block_column_start), min(column_end, block_column_start + block_columns)
+                result[r0 - row_start:r1 - row_start, c0 - column_start:c1 - column_start] = \
+                    self._block(block_row, block_column)[r0 - block_row_start:r1 - block_row_start, c0 - block_column_start:c1 - block_column_start]
+        return result
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        key = key + (slice(None),) * (2 - len(key))
+        if len(key) != 2:
+            raise IndexError(f"LazySnapshot only supports indexing with two indices, got {key}")
+
+        ranges = []
+        result_key = []
+        for index, length in zip(key, self.shape):
+            if isinstance(index, slice):
+                start, stop, step = index.indices(length)
+                if step < 0:
+                    return np.asarray(self)[key]  # rare, not worth optimizing
+                stop = max(stop, start)
+                ranges.append((start, stop))
+                result_key.append(slice(0, stop - start, step))
+            else:
+                index = int(index)
+                if index < 0:
+                    index += length
+                if not (0 <= index < length):
+                    raise IndexError(f"index {index} is out of bounds for axis with size {length}")
+                ranges.append((index, index + 1))
+                result_key.append(0)
+
+        (row_start, row_end), (column_start, column_end) = ranges
+        if (row_end == row_start) or (column_end == column_start):
+            return np.empty((row_end - row_start, column_end - column_start), dtype=self.dtype)[tuple(result_key)]
+        return self._read(row_start, row_end, column_start, column_end)[tuple(result_key)]
+
+    def __array__(self, dtype=None, copy=None):
+        """Reads (and thereby copies) the whole array."""
+        array = self[:, :]
+        if dtype is not None:
+            array = array.astype(dtype)
+        return array
+
+    def __len__(self):
+        return self.shape[0]
+
+
+def take_snapshot(matrix, policy):
+    """Applies the snapshot policy to a 2-D numpy array.
+
+    :param policy: 'copy' copies the whole array, 'view' returns the array itself, 'lazy' returns a LazySnapshot.
+    """
+    if policy == 'copy':
+        return matrix.copy()
+    elif policy == 'view':
+        return matrix
+    elif policy == 'lazy':
+        return LazySnapshot(matrix)
+    else:
+        raise ValueError(f"invalid snapshot policy {policy!r}, must be one of {snapshot_policies}")
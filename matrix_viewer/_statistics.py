@@ -0,0 +1,134 @@
+import collections
+import concurrent.futures
+import os
+import numpy as np
+
+
+def _run_indices(length, num_indices, num_runs=16):
+    """Returns about num_indices indices from range(length), grouped into evenly spaced contiguous runs.
+
+    Contiguous runs keep the number of memory pages touched small if the array is memory-mapped.
+    """
+    if num_indices >= length:
+        return np.arange(length)
+    num_runs = max(min(num_runs, num_indices), 1)
+    run_length = num_indices // num_runs
+    run_starts = np.linspace(0, length - run_length, num_runs).astype(np.int64)
+    return np.unique((run_starts[:, np.newaxis] + np.arange(run_length)).ravel())
+
+
+def sample_matrix(matrix, budget):
+    """Returns a sample of an array with at most about budget elements, or the array itself if it is small enough.
+
+    The budget is split proportionally over the axes.
+    """
+    if matrix.size <= budget:
+        return matrix
+    scale = (budget / matrix.size) ** (1 / matrix.ndim)
+    num_samples = [max(int(length * scale), 1) for length in matrix.shape]
+    return matrix[np.ix_(*(_run_indices(length, num) for length, num in zip(matrix.shape, num_samples)))]
+
+
+small_value_limit = 1e-4  # values with a smaller magnitude look bad in fixed point format
+small_formatted_threshold = 0.1  # use exponential format if at least this fraction of the values is small
+max_value_for_fixed_point = 1e8
+
+MatrixStatistics = collections.namedtuple('MatrixStatistics', ['max_value', 'num_small', 'num_small_imag', 'num_values'])
+MatrixStatistics.__doc__ = """Statistics used to choose the formatter. num_small_imag is only set for complex matrices."""
+
+
+def _count_small(values):
+    return int(np.count_nonzero((values != 0) & (np.abs(values) < small_value_limit)))
+
+
+def _chunk_statistics(chunk):
+    """Returns (max, num_small, max_imag, num_small_imag) of a chunk, allocating only chunk-sized temporaries."""
+    if chunk.dtype.kind == 'c':
+        return chunk.real.max(), _count_small(chunk.real), chunk.imag.max(), _count_small(chunk.imag)
+    elif chunk.dtype.kind == 'f':
+        return chunk.max(), _count_small(chunk), None, 0
+    else:
+        return chunk.max(), 0, None, 0
+
+
+def _chunk_slices(shape, chunk_size):
+    """Yields index tuples that split an array of the given shape into chunks of at most about chunk_size values."""
+    if len(shape) == 0:
+        yield ()
+        return
+    inner_size = int(np.prod(shape[1:]))
+    if inner_size <= chunk_size:
+        rows_per_chunk = max(chunk_size // max(inner_size, 1), 1)
+        for row_start in range(0, shape[0], rows_per_chunk):
+            yield (slice(row_start, row_start + rows_per_chunk),)
+    else:
+        for i_row in range(shape[0]):
+            for inner_slices in _chunk_slices(shape[1:], chunk_size):
+                yield (i_row,) + inner_slices
+
+
+def compute_statistics(matrix, chunk_size=1 << 18, num_threads=None, sample_budget=None, progress=None):
+    """Computes the statistics needed to choose the formatter of an array in a single pass.
+
+    The array is processed in chunks of about chunk_size values, which are distributed over a thread pool (numpy
+    releases the GIL during the reductions). Temporaries are never bigger than a chunk.
+
+    :param num_threads: number of worker threads, defaults to the number of CPUs.
+    :param sample_budget: if given and the array has more values, only a sample of about this size is analyzed.
+    :param progress: optional function that is called with the processed fraction (0..1) after each chunk.
+    :return: a MatrixStatistics tuple.
+    """
+    if (sample_budget is not None) and (matrix.size > sample_budget):
+        matrix = sample_matrix(matrix, sample_budget)
+
+    if matrix.size == 0:
+        return MatrixStatistics(np.zeros((), dtype=matrix.dtype)[()], 0, 0, 0)
+
+    slices = list(_chunk_slices(matrix.shape, chunk_size))
+    results = []
+    if len(slices) == 1:
+        results.append(_chunk_statistics(matrix))
+    else:
+        if num_threads is None:
+            num_threads = os.cpu_count() or 1
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as executor:
+            futures = [executor.submit(_chunk_statistics, matrix[chunk_slices]) for chunk_slices in slices]
+            for future in concurrent.futures.as_completed(futures):
+                results.append(future.result())
+                if progress is not None:
+                    progress(len(results) / len(slices))
+
+    max_value = np.max(np.array([result[0] for result in results]))
+    num_small = sum(result[1] for result in results)
+    num_small_imag = sum(result[3] for result in results)
+    if matrix.dtype.kind == 'c':
+        max_value = max_value + np.max(np.array([result[2] for result in results])) * 1j
+    return MatrixStatistics(max_value, num_small, num_small_imag, matrix.size)
+
+
+def choose_formatter(dtype, statistics):
+    """Chooses a formatter that converts values of the given dtype to strings, based on the result of compute_statistics."""
+    if dtype.kind in ['i', 'u']:  # signed, unsigned integer
+        return "{:d}".format
+    elif dtype.kind == 'b':  # boolean
+        return "{}".format
+    elif dtype.kind == 'f':
+        if statistics.max_value >= max_value_for_fixed_point:
+            return "{:.6e}".format
+        elif statistics.num_small < small_formatted_threshold * statistics.num_values:
+            # below 10% of the values is not looking nice with non-exponential format
+            return "{:.6f}".format
+        else:
+            return "{:.6e}".format  # use exponential format
+    elif dtype.kind == 'c':  # complex float (there is no complex int)
+        if (statistics.max_value.real >= max_value_for_fixed_point) or (statistics.max_value.imag >= max_value_for_fixed_point):
+            return "{:.6e}".format
+        elif ((statistics.num_small < small_formatted_threshold * statistics.num_values) and
+                (statistics.num_small_imag < small_formatted_threshold * statistics.num_values)):
+            # below 10% of both the imag and the real part is not looking nice with non-exponential format
+            return "{:.6f}".format
+        else:
+            return "{:.6e}".format  # use exponential format
+    else:
+        # use string formatter as fallback
+        return "{}".format
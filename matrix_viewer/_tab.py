@@ -1,6 +1,3 @@
-
-import tkinter as tk
-import tkinter.font
 import numpy as np
 import math
 import platform
@@ -24,7 +21,7 @@ class ViewerTab():
         """
         sets self.cell_font and self.font_size according to the specified user font and the screen DPI
         """
-        dpi = manager.get_or_create_root().winfo_fpixels('1i')
+        dpi = manager.get_dpi()
         if user_font_size is None:
             if dpi >= 200:
                 self.font_size = 28
@@ -37,8 +34,8 @@ class ViewerTab():
         else:
             self.font_size = user_font_size
 
-        # default root window needed to create font. -size -> size in pixels instead of inches
+        # the fonts are shared between all tabs, so zooming back to a size that was used before does not create a font
         if platform.system() == 'Linux':
-            self.cell_font = tk.font.Font(size=-self.font_size, family="Sans")  # Arial was messing up
+            self.cell_font = manager.get_font("Sans", self.font_size)  # Arial was messing up
         else:
-            self.cell_font = tk.font.Font(size=-self.font_size, family="Arial")
+            self.cell_font = manager.get_font("Arial", self.font_size)
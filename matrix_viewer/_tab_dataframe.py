@@ -0,0 +1,243 @@
+import numpy as np
+
+from ._column_widths import ColumnWidths
+from ._formatting import format_block, TileCache
+from ._manager import manager
+from ._statistics import compute_statistics, choose_formatter, _run_indices
+from ._tab_numpy import tile_rows
+from ._tab_table import ViewerTabTable
+
+max_cell_length = 60  # longer strings are cut
+format_sample_rows = 1000  # number of rows per column that are looked at to choose the formatter and the width
+cut_marker = "..."
+
+
+def _cut(string):
+    """Makes a string fit into a single table cell."""
+    string = string.replace('\n', ' ')
+    if len(string) > max_cell_length:
+        string = string[:max_cell_length - len(cut_marker)] + cut_marker
+    return string
+
+
+def _label_string(label):
+    """Converts an index or column label to a string. The levels of MultiIndex labels are joined by ' / '."""
+    if isinstance(label, tuple):
+        return " / ".join(str(level) for level in label)
+    return str(label)
+
+
+def is_numeric_column(column):
+    """Whether the values of a pandas Series can be formatted like a numpy array, i. e. whether it has a numeric numpy
+    dtype. Extension dtypes (e. g. nullable integers or categoricals), strings and dates are converted with str."""
+    return isinstance(column.dtype, np.dtype) and (column.dtype.kind in ['i', 'u', 'f', 'c', 'b'])
+
+
+def format_column(column, formatter, start, end):
+    """Formats column[start:end] (by position) as a list of strings.
+
+    :param column: pandas Series.
+    :param formatter: formatter of the column, see choose_column_formatter. None means str.
+    """
+    if formatter is None:
+        return [_cut(str(value)) for value in column.iloc[start:end]]
+    values = column.iloc[start:end].to_numpy()
+    return [row[0] for row in format_block(formatter, values[:, np.newaxis])]
+
+
+def choose_column_formatter(column):
+    """Chooses the formatter of a pandas Series based on its dtype and a sample of its values.
+
+    :return: (formatter, longest string), where formatter is None for columns that are converted with str and the
+             longest string is the longest formatted value of the sample, which is used to estimate the column width.
+    """
+    sample_indices = _run_indices(len(column), format_sample_rows)
+    if is_numeric_column(column):
+        values = column.iloc[sample_indices].to_numpy()
+        statistics = compute_statistics(values)
+        formatter = choose_formatter(column.dtype, statistics)
+        strings = [formatter(statistics.max_value)] if len(values) > 0 else []
+        strings += [row[0] for row in format_block(formatter, values[:, np.newaxis])]
+    else:
+        formatter = None
+        strings = [_cut(str(value)) for value in column.iloc[sample_indices]]
+    return formatter, max(strings, key=len, default="")
+
+
+def _columns_of(frame):
+    """Returns (number of columns, function returning column i as a Series) of a DataFrame or Series."""
+    if type(frame).__name__ == 'Series':
+        return 1, lambda i: frame
+    return frame.shape[1], lambda i: frame.iloc[:, i]
+
+
+class ViewerTabDataFrame(ViewerTabTable):
+    """A viewer tab that shows a pandas DataFrame or Series.
+
+    The values are read column by column directly from the DataFrame, and only the visible cells are fetched and
+    formatted, so the DataFrame is never converted to a numpy array. Each column has its own formatter, chosen from its
+    dtype and a sample of its values when the column comes into view, and its own width. The index and the column
+    labels are shown as headings.
+    """
+    def __init__(self, viewer, frame, title=None, font_size=None, prepared=None):
+        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass.
+
+        :param prepared: result of prepare(frame) if it was already run on a worker thread.
+        """
+        self.frame = frame
+        if prepared is None:
+            prepared = self.prepare(frame)
+        num_columns, self._column = _columns_of(frame)
+        self._column_formats = {}  # column -> [formatter, longest expected string], see _column_format
+        self._longest_index_label = prepared['longest_index_label']
+        if type(frame).__name__ == 'Series':
+            self.column_labels = ["Value" if frame.name is None else _label_string(frame.name)]
+        else:
+            self.column_labels = [_label_string(label) for label in frame.columns]
+        self.index_name = "" if frame.index.name is None else str(frame.index.name)
+
+        self._calc_font(font_size)
+        self._tile_cache = TileCache()
+        self._font_changed()
+
+        if title is None:
+            title = f"{len(frame)} x {num_columns} {type(frame).__name__}"
+
+        ViewerTabTable.__init__(self, viewer, title, num_columns, len(frame))
+        self.column_widths = ColumnWidths(num_columns, self._measure_columns, self.cell_width)
+        self._calc_size_scroll()
+
+        self.canvas1.bind("<ButtonPress-1>", self._on_mouse_press)
+        self.canvas1.bind("<ButtonRelease-1>", self._on_mouse_release)
+        self.canvas1.bind("<Motion>", self._on_mouse_motion)
+
+    @staticmethod
+    def prepare(frame, progress=None):
+        """Samples the index to estimate the width of the row headings. The formatters of the columns are chosen when
+        the columns are shown.
+
+        :param progress: optional function that is called with the fraction of the work done (0..1).
+        :return: a dict that can be passed to __init__ as prepared.
+        """
+        index_sample = frame.index[_run_indices(len(frame), format_sample_rows)]
+        longest_index_label = max((_cut(_label_string(label)) for label in index_sample), key=len, default="")
+        if progress is not None:
+            progress(1.0)
+
+        return {
+            'longest_index_label': longest_index_label,
+        }
+
+    def _column_format(self, i_column):
+        """Returns [formatter, longest expected string] of column i_column, see choose_column_formatter. The label is
+        included in the longest string so that it fits into the heading."""
+        column_format = self._column_formats.get(i_column, None)
+        if column_format is None:
+            formatter, longest_value = choose_column_formatter(self._column(i_column))
+            column_format = [formatter, max('0' + longest_value, self.column_labels[i_column], key=len)]
+            self._column_formats[i_column] = column_format
+        return column_format
+
+    def _measure_columns(self, column_start, column_end):
+        return [manager.measure_text(self.cell_font, self._column_format(i_column)[1]) + self.cell_hpadding * 2
+            for i_column in range(column_start, column_end)]
+
+    def _font_changed(self):
+        # columns that were not shown yet get the width of the first column
+        if len(self.column_labels) > 0:
+            self.max_text_width = manager.measure_text(self.cell_font, self._column_format(0)[1])
+        else:
+            self.max_text_width = 0
+        self.row_heading_text_width = manager.measure_text(self.cell_font, max(self._longest_index_label, self.index_name, key=len))
+        if self.column_widths is not None:
+            self.column_widths.reset(self.max_text_width + self.cell_hpadding * 2)
+
+    def _column_texts(self, i_column, row_start, row_end):
+        """Returns the formatted cells of column i_column in the rows row_start:row_end. i_column -1 is the index.
+
+        The cells are formatted in tiles of tile_rows rows, which are cached.
+        """
+        texts = []
+        for tile_row in range(row_start // tile_rows, (row_end - 1) // tile_rows + 1):
+            tile_row_start = tile_row * tile_rows
+            tile = self._tile_cache.get((i_column, tile_row))
+            if tile is None:
+                tile_row_end = min(tile_row_start + tile_rows, self.yscroll_items)
+                if i_column == -1:
+                    tile = [_cut(_label_string(label)) for label in self.frame.index[tile_row_start:tile_row_end]]
+                else:
+                    column_format = self._column_format(i_column)
+                    tile = format_column(self._column(i_column), column_format[0], tile_row_start, tile_row_end)
+                    longest = max(tile, key=len, default="")
+                    if len(longest) >= len(column_format[1]):  # e. g. an outlier that was not sampled
+                        column_format[1] = '0' + longest
+                        self._fit_column(i_column, column_format[1])
+                self._tile_cache.put((i_column, tile_row), tile)
+                self._count_perf('formatted_values', len(tile))
+            texts.extend(tile[max(row_start - tile_row_start, 0):row_end - tile_row_start])
+        return texts
+
+    def _draw_cells(self):
+        row_end = min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)
+
+        x = self.cell_hpadding
+        y = self.cell_vpadding
+        self._draw_text(x, y, self.index_name, anchor='nw')
+        y += self.cell_height
+        if row_end > self.yscroll_item:
+            for text in self._column_texts(-1, self.yscroll_item, row_end):
+                self._draw_text(x, y, text, anchor='nw')
+                y += self.cell_height
+
+        for i_column in range(self.xscroll_item, min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)):
+            x = self._column_x(i_column)
+            column_width = self._column_width(i_column)
+            y = self.cell_vpadding
+            self._draw_text(x + column_width // 2, y, self.column_labels[i_column], anchor='n')
+            y += self.cell_height
+            if row_end > self.yscroll_item:
+                # numbers are right-aligned like in numpy tabs, everything else is left-aligned
+                if self._column_format(i_column)[0] is None:
+                    text_x, anchor = x + self.cell_hpadding, 'nw'
+                else:
+                    text_x, anchor = x + column_width - self.cell_hpadding, 'ne'
+                for text in self._column_texts(i_column, self.yscroll_item, row_end):
+                    self._draw_text(text_x, y, text, anchor=anchor)
+                    y += self.cell_height
+
+    def perf_stats(self, reset=False):
+        """See ViewerTabTable.perf_stats. Additionally contains tile_cache_hits and tile_cache_misses, where a miss means
+        that a tile of cells had to be fetched from the DataFrame and formatted."""
+        stats = ViewerTabTable.perf_stats(self, reset)
+        stats['tile_cache_hits'] = self._tile_cache.hits
+        stats['tile_cache_misses'] = self._tile_cache.misses
+        if reset:
+            self._tile_cache.hits = 0
+            self._tile_cache.misses = 0
+        return stats
+
+    def get_selection(self):
+        """Get the current selected area.
+
+        :return: [start0, end0, start1, end1] so that frame.iloc[start0:end0, start1:end1] represents the selected part.
+                 If nothing was selected, returns None. If no area was explicitly selected, this is an 1x1 area representing the focused cell.
+        """
+        if self._selection is None:
+            return None
+        else:
+            return [self._selection[1], self._selection[3], self._selection[0], self._selection[2]]
+
+    def get_focused_cell(self):
+        """Get the currently focused cell. This is the most recent cell that the user clicked on.
+
+        :return: [index0, index1] so that frame.iloc[index0, index1] represents the focused cell.
+        """
+        if self._focused_cell is None:
+            return None
+        else:
+            return [self._focused_cell[1], self._focused_cell[0]]
+
+
+def matches_tab_dataframe(object):
+    """Whether object is a pandas DataFrame or Series. pandas is not imported, it is an optional dependency."""
+    return (type(object).__name__ in ["DataFrame", "Series"]) and type(object).__module__.startswith("pandas")
@@ -0,0 +1,149 @@
+import threading
+import traceback
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+
+from ._manager import manager
+from ._tab import ViewerTab
+
+# objects at least this big are prepared in the background if Viewer.view is called with background=None
+background_min_array_size = 10_000_000  # number of values
+background_min_string_length = 10_000_000
+
+
+def is_heavy(object):
+    """Whether preparing a tab for the object probably takes long enough to freeze the window noticeably."""
+    if isinstance(object, np.ndarray):
+        return object.size >= background_min_array_size
+    elif type(object).__name__ == "Tensor":
+        return object.numel() >= background_min_array_size
+    elif type(object).__module__.startswith("scipy.sparse"):
+        return object.nnz >= background_min_array_size
+    elif isinstance(object, (str, bytes)):
+        return len(object) >= background_min_string_length
+    else:
+        return False
+
+
+class ViewerTabLoading(ViewerTab):
+    """Placeholder tab with a progress bar that is shown while a tab is prepared on a worker thread.
+
+    When the preparation is finished, the placeholder is replaced by the real tab, which is then available as the
+    attribute tab. Until then, tab is None. Other attributes and methods of the real tab can be used through the
+    placeholder after loading.
+    """
+
+    poll_interval = 50  # in milliseconds
+
+    def __init__(self, viewer, title, prepare, create, prepare_update=None):
+        """
+        :param prepare: function(progress) doing the heavy work. It runs on a worker thread and must not use the GUI.
+        :param create: function(prepared) creating the real tab from the result of prepare. It runs on the GUI thread.
+        :param prepare_update: optional function(object) that update calls while loading, e. g. to take the snapshot of
+                               an array before the caller modifies it. It may raise for invalid objects. Its result is
+                               passed to the update method of the real tab as prepared.
+        """
+        ViewerTab.__init__(self)
+        self.viewer = viewer
+        self.tab = None
+        self._create = create
+        self._prepared = None
+        self._error = None
+        self._finished = False
+        self._progress = None
+        self._closed = False
+        self._prepare_update = prepare_update
+        self._pending_update = None  # (object, prepared) of the last update while loading
+
+        self.top_frame = tk.Frame(self.viewer.paned)
+        self.label = tk.Label(self.top_frame, text=f"Loading {title} ...")
+        self.label.pack(pady=(40, 10))
+        self.progressbar = ttk.Progressbar(self.top_frame, mode='indeterminate', length=200, maximum=1.0)
+        self.progressbar.pack()
+        self.progressbar.start()
+
+        self.viewer.register(self, self.top_frame, title)
+
+        self._thread = threading.Thread(target=self._run, args=(prepare,), daemon=True)
+        self._thread.start()
+        # poll via the root window because the frame is destroyed if the window is closed while loading
+        manager.get_or_create_root().after(self.poll_interval, self._poll)
+
+    def _run(self, prepare):
+        try:
+            self._prepared = prepare(self._set_progress)
+        except BaseException as e:
+            traceback.print_exc()
+            self._error = e
+        self._finished = True
+
+    def _set_progress(self, fraction):
+        # called on the worker thread, so only store the value; _poll shows it
+        self._progress = fraction
+
+    def _poll(self):
+        if self._closed or self.viewer._destroyed:
+            return
+
+        if not self._finished:
+            if self._progress is not None:
+                if str(self.progressbar['mode']) == 'indeterminate':
+                    self.progressbar.stop()
+                    self.progressbar.configure(mode='determinate')
+                self.progressbar['value'] = self._progress
+            manager.get_or_create_root().after(self.poll_interval, self._poll)
+        elif self._error is not None:
+            self.progressbar.stop()
+            self.label.configure(text=f"Error: {self._error}")
+        else:
+            try:
+                tab = self._create(self._prepared)
+            except Exception as e:
+                traceback.print_exc()
+                self.progressbar.stop()
+                self.label.configure(text=f"Error: {e}")
+                return
+            finally:
+                self._prepared = None
+            self.tab = tab
+            self.viewer._replace_tab(self, self.tab)
+            self._apply_pending_update()
+
+    def _apply_pending_update(self):
+        if self._pending_update is not None:
+            object, prepared = self._pending_update
+            self._pending_update = None
+            if self._prepare_update is None:
+                self.tab.update(object)
+            else:
+                self.tab.update(object, prepared=prepared)
+
+    def update(self, object):
+        """See the update method of the real tab. While loading, only the last update is remembered and applied when
+        the real tab was created. Its snapshot is taken (and the object checked) right away, see prepare_update."""
+        if self.tab is None:
+            prepared = None if self._prepare_update is None else self._prepare_update(object)
+            self._pending_update = (object, prepared)
+        else:
+            self.tab.update(object)
+
+    def get_selection(self):
+        """See the get_selection method of the real tab. Returns None while loading."""
+        return None if self.tab is None else self.tab.get_selection()
+
+    def get_focused_cell(self):
+        """See the get_focused_cell method of the real tab. Returns None while loading."""
+        return None if self.tab is None else self.tab.get_focused_cell()
+
+    def __getattr__(self, name):
+        # only called for attributes that the placeholder does not have
+        tab = self.__dict__.get('tab', None)
+        if tab is None:
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r} while the tab is loading")
+        return getattr(tab, name)
+
+    def on_destroy(self):
+        """Internal method called by the viewer."""
+        self._closed = True
+        self.viewer.unregister(self)
@@ -1,186 +1,1172 @@
 
+import os
+import platform
 import numpy as np
 import tkinter as tk
+import tkinter.filedialog
 import tkinter.font
-import time
+from tkinter import ttk
+import threading
+import traceback
 from ._tab_table import ViewerTabTable
+from ._utils import clip
+from ._formatting import format_block, TileCache
+from ._column_widths import ColumnWidths
+from ._export import export_format, iter_text_chunks, save_npy, save_parquet, save_text
+from ._heatmap import heatmap_limits, heatmap_rgb, ppm_data
+from ._manager import manager
+from ._pyramid import Pyramid, PyramidWindow
+from ._region_statistics import RegionStatistics, format_statistics
+from ._row_order import RowOrder, RowView
+from ._search import Search, parse_query
+from ._snapshot import take_snapshot, LazySnapshot
+from ._statistics import compute_statistics, choose_formatter
+
+# size of the blocks that are formatted at once and cached
+tile_rows = 64
+tile_columns = 16
+min_text_font_size = 6  # zooming out further switches to the heatmap
+max_measured_columns = 1 << 22  # wider matrices show all columns with the width of the first column
 
 class ViewerTabNumpy(ViewerTabTable):
-    """A viewer tab that can be used to visualize numpy.ndarray matrices and vectors."""
-    def __init__(self, viewer, matrix, matrix_title=None, font_size=None, cell_formatter=None):
-        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass."""
-        self.matrix = matrix
-        self.num_dims = matrix.ndim
+    """A viewer tab that can be used to visualize numpy.ndarray matrices and vectors.
 
-        if type(self.matrix).__name__ == "Tensor":
-            self.matrix = self.matrix.cpu().numpy()  # convert pytorch to numpy. This is like a copy
-        else:
-            # If the user modifies the value after running viewer.view, but before viewer.show, the new values
-            # are displayed but one would expect that the state when viewer.view was called is displayed. Therefore,
-            # make a copy
-            self.matrix = self.matrix.copy()
+    Each column gets its own formatter and width, which are chosen from a sample of the column when it comes into view.
+
+    Besides the numeric table, there is a heatmap mode that shows each cell as a colored square (toggled with the h key).
+    It is also activated by zooming out with Ctrl-Scroll below a readable font size, and zooming in far enough switches
+    back to the table. Below one pixel per cell, the heatmap shows the min, max or mean (see heatmap_statistic) of
+    2**heatmap_level x 2**heatmap_level blocks, which are read from a pyramid that is built in the background.
+
+    Ctrl-F opens a find bar, which jumps to the next or previous cell matching a value, a range or an expression (see
+    find). F3 and Shift-F3 repeat the last search.
+
+    The status bar shows the sum, mean, min, max and nan count of the selection (see get_selection_statistics).
+
+    Ctrl-C copies the selection as tab-separated text (see copy_selection), and Ctrl-S or the context menu exports the
+    selection or the array to a CSV, .npy or Parquet file (see export).
+
+    Double-clicking a column heading sorts the rows by that column (see sort_rows), and the find bar can hide the rows
+    that do not match the query (see filter_rows). Both only change which rows of the array are shown, the array is not
+    copied. The row headings, get_selection and get_focused_cell refer to the rows of the array.
+    """
+
+    heatmap_statistic = 'mean'  # 'min', 'max' or 'mean'
+    pyramid_poll_interval = 100  # in milliseconds
+    search_poll_interval = 50  # in milliseconds
+    statistics_poll_interval = 100  # in milliseconds, also used to show the progress of exports
+    clipboard_max_values = 1 << 22  # bigger selections are not copied to the clipboard, they should be exported
+    row_order_poll_interval = 50  # in milliseconds
+    sort_cache_size = 4  # number of sort orders that are kept, each needs 8 bytes per row
+
+    statistics_sample_budget = 1 << 20  # only a sample of this many values of longer columns is used to choose the formatter
+    mmap_statistics_budget = 65536  # the same for memory-mapped arrays, where reading is slower
+
+    def __init__(self, viewer, matrix, matrix_title=None, font_size=None, cell_formatter=None, snapshot=None, prepared=None):
+        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass.
+
+        :param snapshot: 'copy', 'view', 'lazy' or None, see Viewer.view.
+        :param prepared: result of prepare(matrix, cell_formatter, snapshot) if it was already run on a worker thread.
+        """
+        if prepared is None:
+            prepared = self.prepare(matrix, cell_formatter, snapshot)
+        self.num_dims = prepared['num_dims']
+        self.snapshot = prepared['snapshot']
+        self._source = prepared['source']
+        self.memory_mapped = prepared['memory_mapped']
+        self.float_formatter = prepared['float_formatter']  # None means that each column has its own formatter
+        self._column_formats = {}  # (slice key, column) -> [formatter, longest expected string], see _column_format
+        self._table_column_widths = None  # ColumnWidths of the displayed slice, created by _calc_dimensions
+        self._lazy_slices = {}
+        self.matrix = self._source[:, 0] if self.num_dims == 1 else self._source
+        self._search = None  # Search of the last query in the displayed slice
+        self._search_forward = None  # direction of the hit that find is waiting for, None if it is not waiting
+        self._search_poll_id = None
+        self.find_frame = None  # created when the find bar is opened for the first time
+        self._region_statistics = None  # RegionStatistics of the displayed slice, created for the first selection
+        self._region_statistics_started = False  # whether its tables are built
+        self._status_key = None  # selection shown in the status bar
+        self._statistics_poll_id = None
+
+        self.sort_column = None  # column by which the rows are sorted, see sort_rows
+        self.sort_descending = False
+        self.row_filter = None  # (query, column) of filter_rows
+        self._rows = None  # the displayed rows of the slice, None means all rows in their original order
+        self._sorted_rows = {}  # (slice key, column, descending) -> sort order, see sort_cache_size
+        self._row_order = None  # RowOrder that is computed on a worker thread
+        self._row_order_key = None  # key of its sort order in _sorted_rows
+        self._row_order_poll_id = None
 
-        assert self.matrix.dtype.isbuiltin == 1, "matrix must be a type built-in into numpy (e. g. float32 ndarray), but it is a composed type or something else"
+        # for arrays with more than 2 dimensions, a 2-D slice is shown
+        self.display_axes = [max(self._source.ndim - 2, 0), self._source.ndim - 1]  # [row axis, column axis]
+        self.slice_indices = [0] * self._source.ndim  # indices of the axes that are not displayed
+        self._select_slice()
 
         if matrix_title is None:
             if self.num_dims == 1:
-                matrix_title = f"{self.matrix.shape[0]} {self.matrix.dtype}"
+                matrix_title = f"{self._source.shape[0]} {self._source.dtype}"
             else:
-                matrix_title = f"{self.matrix.shape[0]} x {self.matrix.shape[1]} {self.matrix.dtype}"
+                matrix_title = " x ".join(str(length) for length in self._source.shape) + f" {self._source.dtype}"
 
         self._calc_font(font_size)
 
-        if self.matrix.dtype.kind == 'c':
-            self.max_val = np.max(self.matrix.real) + np.max(self.matrix.imag) * 1j
-        else:
-            self.max_val = np.max(self.matrix)
-
-        small_formatted_threshold = 0.1
-        max_value_for_fixed_point = 1e8
-        if cell_formatter is None:
-            if self.matrix.dtype.kind in ['i', 'u']:  # signed, unsigned integer
-                self.float_formatter = "{:d}".format
-            elif self.matrix.dtype.kind == 'b': # boolean
-                self.float_formatter = "{}".format
-            elif self.matrix.dtype.kind == 'f':
-                if self.max_val >= max_value_for_fixed_point:
-                    self.float_formatter = "{:.6e}".format
-                else:
-                    if np.sum(np.logical_and(self.matrix != 0, np.abs(self.matrix) < 1e-4)) < small_formatted_threshold * np.prod(self.matrix.shape):
-                        # below 10% of the values is not looking nice with non-exponential format
-                        self.float_formatter = "{:.6f}".format
-                    else:
-                        self.float_formatter = "{:.6e}".format  # use exponential format
-            elif self.matrix.dtype.kind == 'c':  # complex float (there is no complex int)
-                if (self.max_val.real >= max_value_for_fixed_point) or (self.max_val.imag >= max_value_for_fixed_point):
-                    self.float_formatter = "{:.6e}".format
-                else:
-                    if ((np.sum(np.logical_and(self.matrix.real != 0, np.abs(self.matrix.real) < 1e-4))
-                        < small_formatted_threshold * np.prod(self.matrix.shape)) and
-                        (np.sum(np.logical_and(self.matrix.imag != 0, np.abs(self.matrix.imag) < 1e-4))
-                        < small_formatted_threshold * np.prod(self.matrix.shape))):
-                        # below 10% of both the imag and the real part is not looking nice with non-exponential format
-                        self.float_formatter = "{:.6f}".format
-                    else:
-                        self.float_formatter = "{:.6e}".format  # use exponential format
-            else:
-                # use string formatter as fallback
-                self.float_formatter = "{}".format
-        else:
-            self.float_formatter = cell_formatter
+        self._tile_cache = TileCache()
+        self._drawn_cells = None  # (row_start, column_start, values) of the visible cells at the last _draw
+        self._cell_items = []  # text items of the visible cells at the last _draw, indexed [row][column]
 
         self.column_heading_formatter = "{:d}".format
         self.row_heading_formatter = "{:d}".format
         self._font_changed()
 
+        self.heatmap = False
+        self.heatmap_cell_size = 1  # in pixels
+        self.heatmap_level = 0  # each pixel shows 2**heatmap_level x 2**heatmap_level cells if heatmap_cell_size is 1
+        self._pyramids = {}  # slice key -> Pyramid, built on a worker thread when zooming out for the first time
+        self._pyramid_window = None  # (slice key, PyramidWindow) of the visible part of a level that is not stored
+        self._pyramid_poll_id = None
+        self._pyramid_state_drawn = None
+        self._heatmap_limits = None  # computed when the heatmap is shown for the first time
+        self._table_font_size = None  # font size to restore when leaving the heatmap
+        self._heatmap_exit_size = None  # the heatmap is left when zooming in to this cell size
+
         if self.num_dims == 1:
-            ViewerTabTable.__init__(self, viewer, matrix_title, 1, self.matrix.shape[0], highlight_selected_columns=False)
+            ViewerTabTable.__init__(self, viewer, matrix_title, 1, self._matrix2d.shape[0], highlight_selected_columns=False)
         else:
-            ViewerTabTable.__init__(self, viewer, matrix_title, self.matrix.shape[1], self.matrix.shape[0])
+            ViewerTabTable.__init__(self, viewer, matrix_title, self._matrix2d.shape[1], self._matrix2d.shape[0])
+
+        self._heatmap_photo = tk.PhotoImage(master=self.canvas1, width=1, height=1)
+        self._heatmap_item = self.canvas1.create_image(0, 0, image=self._heatmap_photo, anchor='nw', state='hidden')
+        self._item_states[self._heatmap_item] = [None, {'state': 'hidden'}]
+        self._raise_top_items()  # the selection border must be drawn above the heatmap
+
+        status_frame = tk.Frame(self.top_frame)
+        status_frame.grid(column=0, row=4, sticky="ew")
+        self.status_bar = tk.Label(status_frame, text="", anchor='w')
+        self.status_bar.pack(side=tk.LEFT)
+        self.message_label = tk.Label(status_frame, text="", anchor='e')  # results of copy and export
+        self.message_label.pack(side=tk.RIGHT)
+        self._export_state = None  # [path, progress, error, finished] of the running export
+
+        self.context_menu = tk.Menu(self.canvas1, tearoff=0)
+        self.context_menu.add_command(label="Copy", accelerator="Ctrl+C", command=self._on_copy)
+        self.context_menu.add_command(label="Export selection...", command=lambda: self._on_export(True))
+        self.context_menu.add_command(label="Export array...", accelerator="Ctrl+S", command=lambda: self._on_export(False))
+        # the right mouse button is button 2 on mac
+        self.canvas1.bind("<Button-2>" if platform.system() == "Darwin" else "<Button-3>",
+            lambda event: self.context_menu.tk_popup(event.x_root, event.y_root))
 
         self.canvas1.bind("<ButtonPress-1>", self._on_mouse_press)
         self.canvas1.bind("<ButtonRelease-1>", self._on_mouse_release)
         self.canvas1.bind("<Motion>", self._on_mouse_motion)
+        self.canvas1.bind("<Double-Button-1>", self._on_double_click)
+
+        if self.num_dims > 2:
+            self._create_slice_selector()
+
+    @classmethod
+    def prepare(cls, matrix, cell_formatter=None, snapshot=None, progress=None):
+        """Does the part of __init__ that does not need the GUI: taking the snapshot, which can take long for big
+        arrays, but it can run on a worker thread. The formatters are chosen when the columns are shown.
+
+        :param progress: optional function that is called with the fraction of the work done (0..1).
+        :return: a dict that can be passed to __init__ as prepared.
+        """
+        if snapshot is None:
+            snapshot = 'view' if isinstance(matrix, np.memmap) else 'copy'
+
+        num_dims = matrix.ndim
+        matrix, source = cls._take_source(matrix, snapshot)
+        if progress is not None:
+            progress(1.0)
+
+        return {
+            'num_dims': num_dims,
+            'snapshot': snapshot,
+            'source': source,
+            'memory_mapped': isinstance(matrix, np.memmap),
+            'float_formatter': cell_formatter,
+        }
+
+    @staticmethod
+    def _take_source(matrix, snapshot):
+        """Converts matrix to numpy and applies the snapshot policy.
+
+        :return: (numpy array, source array), where the source array is the snapshot with 1-D vectors as a single column.
+        """
+        if type(matrix).__name__ == "Tensor":
+            on_gpu = matrix.device.type != 'cpu'
+            matrix = matrix.detach().cpu().numpy()  # convert pytorch to numpy. For gpu tensors, this is a copy
+            if on_gpu and (snapshot == 'copy'):
+                snapshot = 'view'  # no need to copy a second time
+
+        assert matrix.dtype.isbuiltin == 1, "matrix must be a type built-in into numpy (e. g. float32 ndarray), but it is a composed type or something else"
+
+        # If the user modifies the value after running viewer.view, but before viewer.show, the new values
+        # are displayed but one would expect that the state when viewer.view was called is displayed. Therefore,
+        # make a snapshot (by default a copy). Lazy snapshots are taken per displayed 2-D slice, see _select_slice.
+        # 1-D vectors are shown as a single column.
+        source = matrix[:, np.newaxis] if matrix.ndim == 1 else matrix
+        if snapshot != 'lazy':
+            source = take_snapshot(source, snapshot)
+        return matrix, source
+
+    @classmethod
+    def prepare_update(cls, matrix, num_dims, snapshot):
+        """Does the part of update that does not need the GUI: checking the number of dimensions and taking the
+        snapshot, e. g. while the tab is still loading in the background.
+
+        :return: the source array, which can be passed to update as prepared.
+        """
+        if matrix.ndim != num_dims:
+            raise ValueError(f"update needs an array with {num_dims} dimensions, but it has {matrix.ndim}. Please use viewer.view instead.")
+        return cls._take_source(matrix, snapshot)[1]
+
+    def update(self, matrix, prepared=None):
+        """Replaces the displayed values, e. g. to watch an array change in a loop that calls matrix_viewer.pause.
+
+        The scroll position, the selection and the formatter are kept, and the new values are snapshotted in the same
+        way as the original ones. If the shape did not change, only the visible cells whose values changed are
+        redrawn. Note that the default 'copy' snapshot copies the whole array on every update; to watch big arrays
+        in a loop, view them with snapshot='lazy' (only the visible blocks are copied) or snapshot='view'.
+
+        :param matrix: numpy array or pytorch tensor with the same number of dimensions as the displayed one.
+        :param prepared: result of prepare_update(matrix, num_dims, snapshot) if the snapshot was already taken.
+        """
+        if prepared is None:
+            prepared = self.prepare_update(matrix, self.num_dims, self.snapshot)
+        source = prepared
+        shape_changed = source.shape != self._source.shape
+        if source.dtype.kind != self._source.dtype.kind:
+            # e. g. "{:d}".format cannot format floats, so the formatters have to be chosen again
+            self._column_formats = {}
+            shape_changed = True  # the cell widths may change, too
+
+        self._source = source
+        self.matrix = self._source[:, 0] if self.num_dims == 1 else self._source
+        self._lazy_slices = {}
+        self._sorted_rows = {}  # sorted by the old values
+        if shape_changed:
+            self._rows = None  # the old rows may not exist anymore
+        self._tile_cache.clear()
+        self._cancel_pyramids()
+        if self.num_dims > 2:
+            self.slice_indices = [min(i, length - 1) for i, length in zip(self.slice_indices, self._source.shape)]
+        self._select_slice()
+
+        if shape_changed:
+            if self.num_dims > 2:
+                for axis, spinbox in enumerate(self._index_spinboxes):
+                    spinbox.configure(to=self._source.shape[axis] - 1)
+                self._update_slice_selector()
+            self.xscroll_items = self._matrix2d.shape[1]
+            self.yscroll_items = self._matrix2d.shape[0]
+            if (self._focused_cell is not None) and ((self._focused_cell[0] >= self.xscroll_items) or (self._focused_cell[1] >= self.yscroll_items)):
+                self._focused_cell = None
+            if self._selection is not None:
+                self._selection = [min(self._selection[0], self.xscroll_items), min(self._selection[1], self.yscroll_items),
+                    min(self._selection[2], self.xscroll_items), min(self._selection[3], self.yscroll_items)]
+                if (self._selection[0] == self._selection[2]) or (self._selection[1] == self._selection[3]):
+                    self._selection = None
+            self._font_changed()
+            self._calc_dimensions()
+            self._calc_size_scroll()
+            self._invalidate()
+        else:
+            self._redraw_changed_cells()
+            self._update_status_bar()
+        if (self.sort_column is not None) or (self.row_filter is not None):
+            self._start_row_order()  # the old rows are shown until the new ones are ready
+
+    def _redraw_changed_cells(self):
+        """Updates the texts of the visible cells whose values differ from the values shown by the last _draw."""
+        if self._drawn_cells is None:  # e. g. in heatmap mode
+            self._invalidate()
+            return
+        if self._draw_id is not None:
+            return  # a full redraw is pending anyway
+        row_start, column_start, old_values = self._drawn_cells
+        new_values = np.asarray(self._matrix2d[row_start:row_start + old_values.shape[0], column_start:column_start + old_values.shape[1]])
+
+        changed = changed_cells(old_values, new_values)
+        if changed is None:
+            self._invalidate()
+            return
+        changed_rows, changed_columns = changed
+        for i_column in np.unique(changed_columns).tolist():
+            rows = changed_rows[changed_columns == i_column]
+            column_format = self._column_format(column_start + i_column)
+            texts = format_block(column_format[0], new_values[rows, i_column][np.newaxis, :])[0]
+            self._count_perf('formatted_values', len(texts))
+            longest = max(texts, key=len)
+            if (self.column_widths is not None) and (len(longest) > len(column_format[1])):
+                column_format[1] = longest  # like in _format_tile, e.g. a value grew from 1.0 to 1e12
+                self._fit_column(column_start + i_column, '0' + longest)  # redraws everything if the column got wider
+            for i_row, text in zip(rows.tolist(), texts):
+                self._update_item(self._cell_items[i_row][i_column], text=text)
+        self._drawn_cells = (row_start, column_start, new_values.copy())
+
+    def _select_slice(self):
+        """Sets self._matrix2d to the 2-D slice given by self.display_axes and self.slice_indices.
+
+        The slice is a strided view of the array, nothing is copied (except for lazy snapshots, which copy blocks when
+        they are shown).
+        """
+        self._cancel_search()  # the search results belong to the old values
+        self._cancel_statistics()
+        index = tuple(slice(None) if axis in self.display_axes else i for axis, i in enumerate(self.slice_indices))
+        self._slice_key = (tuple(self.display_axes), tuple(None if axis in self.display_axes else i for axis, i in enumerate(self.slice_indices)))
+        if self.snapshot == 'lazy':
+            matrix2d = self._lazy_slices.get(self._slice_key, None)
+            if matrix2d is None:
+                matrix2d = self._source[index]
+                if self.display_axes[0] > self.display_axes[1]:
+                    matrix2d = matrix2d.T
+                matrix2d = take_snapshot(matrix2d, 'lazy')
+                self._lazy_slices[self._slice_key] = matrix2d
+        else:
+            matrix2d = self._source[index]
+            if self.display_axes[0] > self.display_axes[1]:
+                matrix2d = matrix2d.T
+        self._slice2d = matrix2d  # in the original row order
+        self._matrix2d = matrix2d if self._rows is None else RowView(matrix2d, self._rows)
+
+    def _create_slice_selector(self):
+        """Creates the widgets for choosing the displayed axes and the indices of the other axes."""
+        self.slice_frame = tk.Frame(self.top_frame)
+        self.slice_frame.grid(column=0, row=2, sticky="ew")
+
+        axis_names = [str(axis) for axis in range(self.num_dims)]
+        self._axis_comboboxes = []
+        for i_display_axis, label in enumerate(["Rows: axis", "Columns: axis"]):
+            tk.Label(self.slice_frame, text=label).pack(side=tk.LEFT)
+            combobox = ttk.Combobox(self.slice_frame, values=axis_names, width=3, state='readonly')
+            combobox.set(str(self.display_axes[i_display_axis]))
+            combobox.bind("<<ComboboxSelected>>", lambda event, i=i_display_axis: self._on_display_axis_selected(i))
+            combobox.pack(side=tk.LEFT, padx=(0, 10))
+            self._axis_comboboxes.append(combobox)
+
+        self._index_spinboxes = []
+        for axis in range(self.num_dims):
+            tk.Label(self.slice_frame, text=f"[{axis}]:").pack(side=tk.LEFT)
+            spinbox = tk.Spinbox(self.slice_frame, from_=0, to=self._source.shape[axis] - 1, width=len(str(self._source.shape[axis])) + 1,
+                command=self._on_slice_index_changed)
+            spinbox.bind("<Return>", self._on_slice_index_changed)
+            spinbox.bind("<FocusOut>", self._on_slice_index_changed)
+            spinbox.pack(side=tk.LEFT, padx=(0, 5))
+            self._index_spinboxes.append(spinbox)
+        self._update_slice_selector()
+
+    def _update_slice_selector(self):
+        for axis, spinbox in enumerate(self._index_spinboxes):
+            spinbox.configure(state='normal')
+            spinbox.delete(0, tk.END)
+            if axis in self.display_axes:
+                spinbox.insert(0, ':')
+                spinbox.configure(state='disabled')
+            else:
+                spinbox.insert(0, str(self.slice_indices[axis]))
+        for combobox, axis in zip(self._axis_comboboxes, self.display_axes):
+            combobox.set(str(axis))
+
+    def _on_display_axis_selected(self, i_display_axis):
+        new_axis = int(self._axis_comboboxes[i_display_axis].get())
+        if new_axis == self.display_axes[1 - i_display_axis]:  # the other displayed axis was chosen, so swap them
+            self.display_axes[1 - i_display_axis] = self.display_axes[i_display_axis]
+        self.display_axes[i_display_axis] = new_axis
+        self._update_slice_selector()
+
+        self._reset_row_order()  # the columns are others now
+        self._select_slice()
+        self.xscroll_items = self._matrix2d.shape[1]
+        self.yscroll_items = self._matrix2d.shape[0]
+        self.xscroll_item = 0
+        self.yscroll_item = 0
+        self._selection = None
+        self._focused_cell = None
+        self._font_changed()
+        self._calc_dimensions()
+        self._calc_size_scroll()
+        self._invalidate()
+
+    def _on_slice_index_changed(self, event=None):
+        changed = False
+        for axis, spinbox in enumerate(self._index_spinboxes):
+            if axis not in self.display_axes:
+                try:
+                    index = clip(int(spinbox.get()), 0, self._source.shape[axis] - 1)
+                except ValueError:
+                    index = self.slice_indices[axis]
+                changed = changed or (index != self.slice_indices[axis])
+                self.slice_indices[axis] = index
+        self._update_slice_selector()
+        if changed:
+            self._select_slice()
+            self._table_column_widths = None  # the other slice has other values
+            self._calc_dimensions()
+            self._calc_size_scroll()
+            self._invalidate()
+            if (self.sort_column is not None) or (self.row_filter is not None):
+                self._start_row_order()
+
+    def get_slice(self):
+        """Get the currently displayed 2-D slice of an array with more than 2 dimensions.
+
+        :return: (index, display_axes) so that matrix[index] is the displayed slice. display_axes is [row axis, column axis];
+                 if the row axis is greater than the column axis, the displayed slice is matrix[index].T.
+        """
+        index = tuple(slice(None) if axis in self.display_axes else i for axis, i in enumerate(self.slice_indices))
+        return index, list(self.display_axes)
+
+    def _column_format(self, i_column):
+        """Returns [formatter, longest expected string] of column i_column of the displayed slice. The formatter is
+        chosen from a sample of the column when it is needed for the first time."""
+        key = (self._slice_key, i_column)
+        column_format = self._column_formats.get(key, None)
+        if column_format is None:
+            # sample the source array of lazy snapshots so that no blocks are copied
+            matrix2d = self._slice2d.source if isinstance(self._slice2d, LazySnapshot) else self._slice2d
+            sample_budget = self.mmap_statistics_budget if self.memory_mapped else self.statistics_sample_budget
+            statistics = compute_statistics(matrix2d[:, i_column], sample_budget=sample_budget)
+            formatter = self.float_formatter
+            if formatter is None:
+                formatter = choose_formatter(matrix2d.dtype, statistics)
+            column_format = [formatter, formatter(statistics.max_value)]
+            self._column_formats[key] = column_format
+        return column_format
+
+    def _measure_columns(self, column_start, column_end):
+        # add a leading 0 as a placeholder for better readability
+        return [manager.measure_text(self.cell_font, '0' + self._column_format(i_column)[1]) + self.cell_hpadding * 2
+            for i_column in range(column_start, column_end)]
 
     def _font_changed(self):
-        self.max_text_width = self.cell_font.measure('0' + self.float_formatter(self.max_val))  # add trailing 0 as a placeholder for better readability
-        self.row_heading_text_width = self.cell_font.measure("0" * (len(str(self.matrix.shape[0] - 1))))
+        if self._matrix2d.shape[1] > 0:
+            self.max_text_width = manager.measure_text(self.cell_font, '0' + self._column_format(0)[1])
+        else:
+            self.max_text_width = manager.measure_text(self.cell_font, '0')
+        self.row_heading_text_width = manager.measure_text(self.cell_font, "0" * (len(str(self._slice2d.shape[0] - 1))))
+        self._table_column_widths = None  # measured with the old font
 
-    def _on_mouse_press(self, event):
-        if (self._selection is not None) and (event.state & 0x01 == 0x01):  # shift pressed
-            self.mouse_press_start = self.old_mouse_press_start  # if we start selecting a rectangle by moving the holded mouse to the right, then release the mouse button, and then press shift on a point left to the rectangle, the start point is needed because we do correct the actual selection rectangle so that end > start
-            if self.mouse_press_start is not None:
-                self._adjust_selection(event)
+    def set_heatmap(self, enabled, cell_size=None, level=None):
+        """Switches between the numeric table and the heatmap.
+
+        :param cell_size: size of the heatmap cells in pixels. Defaults to the current row height.
+        :param level: zoom out so that each pixel shows 2**level x 2**level cells. Needs cell_size 1.
+        """
+        if enabled and not self.heatmap:
+            self._table_font_size = self.font_size
+            self._heatmap_exit_size = self.cell_width
+            self.heatmap_cell_size = self.cell_height
+            if self._heatmap_limits is None:
+                self._heatmap_limits = heatmap_limits(self._source)
+        elif self.heatmap and not enabled:
+            self._calc_font(self._table_font_size)
+            self._font_changed()
+        if cell_size is not None:
+            self.heatmap_cell_size = max(int(cell_size), 1)
+        if level is not None:
+            self.heatmap_level = level
+        if (not enabled) or (self.heatmap_cell_size > 1):
+            self.heatmap_level = 0
+        if self.heatmap_level > 0:
+            self._start_pyramid()
+        self.heatmap = enabled
+        self.show_grid_lines = not enabled
+        self._calc_dimensions()
+        self._calc_size_scroll()
+        self._invalidate()
+
+    def _calc_dimensions(self):
+        if self.heatmap:
+            self.row_heading_width = 0
+            self.cell_width = self.heatmap_cell_size if self.heatmap_level == 0 else self.heatmap_cell_size / 2 ** self.heatmap_level
+            self.cell_height = self.cell_width
+            self.column_widths = None
         else:
-            self.mouse_press_start = None
-            hit_x, hit_y = self._calc_hit_cell(event.x, event.y)
+            ViewerTabTable._calc_dimensions(self)
+            if self._matrix2d.shape[1] > max_measured_columns:
+                self.column_widths = None  # the cumulative widths would need too much memory
+            else:
+                if self._table_column_widths is None:
+                    self._table_column_widths = ColumnWidths(self._matrix2d.shape[1], self._measure_columns, self.cell_width)
+                self.column_widths = self._table_column_widths
 
-            if hit_x is None:
-                self._selection = None
-                self._focused_cell = None
-            elif (hit_x == -1) and (hit_y == -1):
-                self._selection = [0, 0, self.xscroll_items, self.yscroll_items]
-            elif hit_x == -1:
-                self._selection = [0, hit_y, self.xscroll_items, hit_y + 1]
-                self._focused_cell = [0, hit_y]
-                self.mouse_press_start = [-1, hit_y]
-            elif hit_y == -1:
-                self._selection = [hit_x, 0, hit_x + 1, self.yscroll_items]
-                self._focused_cell = [hit_x, 0]
-                self.mouse_press_start = [hit_x, -1]
+    def _num_text_items_needed(self):
+        if self.heatmap:
+            return 0
+        return ViewerTabTable._num_text_items_needed(self)
+
+    def _on_key(self, event):
+        if (event.keysym in ['f', 'F']) and (event.state & 0x04 == 0x04):  # control
+            self._show_find_bar()
+        elif (event.keysym in ['c', 'C']) and (event.state & 0x04 == 0x04):
+            self._on_copy()
+        elif (event.keysym in ['s', 'S']) and (event.state & 0x04 == 0x04):
+            self._on_export(False)
+        elif event.keysym == 'F3':
+            if self._search is not None:
+                self.find(self._search.query, forward=(event.state & 0x01 == 0))  # shift searches backwards
+        elif event.keysym == 'h':
+            self.set_heatmap(not self.heatmap)
+        else:
+            ViewerTabTable._on_key(self, event)
+
+    def _on_mouse_wheel(self, event, delta):
+        if (event.state & 0x04 == 0x04) and (self.heatmap or (self.font_size - delta < min_text_font_size)):  # control
+            if not self.heatmap:
+                self.set_heatmap(True)
+            elif delta < 0:  # zoom in
+                new_size = self.heatmap_cell_size + max(self.heatmap_cell_size // 8, 1)
+                if self.heatmap_level > 0:
+                    self.set_heatmap(True, level=self.heatmap_level - 1)
+                elif new_size >= self._heatmap_exit_size:
+                    self.set_heatmap(False)  # the cells are big enough for text again
+                else:
+                    self.set_heatmap(True, new_size)
+            elif self.heatmap_cell_size > 1:
+                self.set_heatmap(True, self.heatmap_cell_size - max(self.heatmap_cell_size // 8, 1))
+            elif max(self.xscroll_items, self.yscroll_items) > 2 ** self.heatmap_level:  # zoom out until the whole slice is a pixel
+                self.set_heatmap(True, level=self.heatmap_level + 1)
+        elif self.heatmap:
+            ViewerTabTable._on_mouse_wheel(self, event, delta * 2 ** self.heatmap_level)  # scroll the same number of pixels
+        else:
+            ViewerTabTable._on_mouse_wheel(self, event, delta)
+
+    def _start_pyramid(self):
+        """Starts building the pyramid of the displayed slice on a worker thread if that did not happen yet."""
+        if self._slice_key in self._pyramids:
+            return
+        pyramid = Pyramid(self._readable_matrix2d())
+        self._pyramids[self._slice_key] = pyramid
+        threading.Thread(target=pyramid.build, daemon=True).start()
+        self._start_pyramid_poll()
+
+    def _start_pyramid_window(self, level, block_row_start, block_row_end, block_column_start, block_column_end):
+        """Starts computing the given blocks of a level that is not stored, and a margin around them for scrolling, on
+        a worker thread. A window that is still being computed is cancelled."""
+        if self._pyramid_window is not None:
+            self._pyramid_window[1].cancelled = True
+        num_level_rows, num_level_columns = (-(-length // 2 ** level) for length in self._matrix2d.shape)
+        row_margin = (block_row_end - block_row_start) // 4
+        column_margin = (block_column_end - block_column_start) // 4
+        window = PyramidWindow(self._readable_matrix2d(), level, max(block_row_start - row_margin, 0),
+            min(block_row_end + row_margin, num_level_rows), max(block_column_start - column_margin, 0),
+            min(block_column_end + column_margin, num_level_columns))
+        self._pyramid_window = (self._slice_key, window)
+        threading.Thread(target=window.build, daemon=True).start()
+        self._start_pyramid_poll()
+
+    def _start_pyramid_poll(self):
+        if self._pyramid_poll_id is None:
+            self._pyramid_poll_id = manager.get_or_create_root().after(self.pyramid_poll_interval, self._poll_pyramids)
+
+    def _poll_pyramids(self):
+        """Redraws when a pyramid level or window was finished, until all of them are built."""
+        self._pyramid_poll_id = None
+        if not self.canvas1.winfo_exists():
+            return
+        window = None if self._pyramid_window is None else self._pyramid_window[1]
+        state = (sum(len(pyramid.levels) for pyramid in self._pyramids.values()), window, window is not None and window.finished)
+        if state != self._pyramid_state_drawn:
+            self._pyramid_state_drawn = state
+            if self.heatmap and (self.heatmap_level > 0):
+                self._invalidate()
+        if any(len(pyramid.levels) < pyramid.num_levels - pyramid.first_level + 1 for pyramid in self._pyramids.values()
+                if not pyramid.cancelled) or ((window is not None) and not (window.finished or window.cancelled)):
+            self._pyramid_poll_id = manager.get_or_create_root().after(self.pyramid_poll_interval, self._poll_pyramids)
+
+    def _cancel_pyramids(self):
+        """Stops building the pyramids and forgets them, e. g. because the values changed."""
+        for pyramid in self._pyramids.values():
+            pyramid.cancelled = True
+        self._pyramids = {}
+        if self._pyramid_window is not None:
+            self._pyramid_window[1].cancelled = True
+            self._pyramid_window = None
+        self._pyramid_state_drawn = None
+
+    def _pyramid_blocks(self, level, block_row_start, block_row_end, block_column_start, block_column_end):
+        """Returns the given blocks of a pyramid level of the displayed slice, see heatmap_statistic.
+
+        Levels that are too big to be stored are computed for the visible blocks on a worker thread. Until a level is
+        available, each of its blocks shows the block of the next coarser level that contains it, so the GUI thread
+        never reads the array. None if no level is built yet.
+        """
+        self._start_pyramid()  # e. g. another slice is shown now
+        pyramid = self._pyramids[self._slice_key]
+        blocks = (block_row_start, block_row_end, block_column_start, block_column_end)
+        values = pyramid.get(level, self.heatmap_statistic)
+        if values is not None:
+            return values[block_row_start:block_row_end, block_column_start:block_column_end]
+        if level < pyramid.first_level:
+            window = self._pyramid_window
+            if (window is None) or (window[0] != self._slice_key) or not window[1].contains(level, *blocks):
+                self._start_pyramid_window(level, *blocks)
+            elif window[1].finished:
+                return window[1].get(self.heatmap_statistic, *blocks)
+
+        coarser_level = pyramid.coarser_level(level)
+        if coarser_level is None:
+            return None
+        shift = coarser_level - level
+        rows = np.arange(block_row_start, block_row_end) >> shift
+        columns = np.arange(block_column_start, block_column_end) >> shift
+        return pyramid.get(coarser_level, self.heatmap_statistic)[np.ix_(rows, columns)]
+
+    def find(self, query, forward=True):
+        """Focuses the next cell after the focused cell (the previous one if not forward) whose value matches the query,
+        wrapping around at the end of the displayed slice.
+
+        The slice is scanned in chunks on a worker thread, beginning at the focused cell, and the cell is focused as
+        soon as it was found. Calling find again with the same query reuses the scan. The find bar (Ctrl-F) shows the
+        number of hits.
+
+        :param query: a value (e. g. ``3.5`` or ``nan``), a range (e. g. ``-1..1``) or an expression of x (e. g.
+                      ``abs(x) > 1e3``), see matrix_viewer._search.parse_query.
+        :raises ValueError: if the query is invalid.
+        """
+        if (self._search is None) or (self._search.query != query):
+            self._cancel_search()
+            matrix2d = self._readable_matrix2d()
+            self._search = Search(matrix2d, query, self._search_position()[0], forward)
+            threading.Thread(target=self._search.run, daemon=True).start()
+        self._search_forward = forward
+        self._continue_search()
+        if (not self._search.finished) and (self._search_poll_id is None):
+            self._search_poll_id = manager.get_or_create_root().after(self.search_poll_interval, self._poll_search)
+
+    def _search_position(self):
+        """Returns (row, column) of the cell from which find searches, i. e. the focused cell, or the position before
+        the first visible cell."""
+        if self._focused_cell is None:
+            return self.yscroll_item, -1
+        return self._focused_cell[1], self._focused_cell[0]
+
+    def _continue_search(self):
+        """Focuses the hit that find is waiting for if the scan got far enough, and shows the progress."""
+        search = self._search
+        if (search is not None) and (self._search_forward is not None):
+            hit = search.next_hit(*self._search_position(), forward=self._search_forward)
+            if hit is not None:
+                self._search_forward = None
+                self._focus_cell(hit[1], hit[0])
+            elif search.finished:
+                self._search_forward = None  # there is no hit
+        self._update_find_status()
+
+    def _poll_search(self):
+        self._search_poll_id = None
+        if (self._search is None) or not self.canvas1.winfo_exists():
+            return
+        self._continue_search()
+        if not self._search.finished:
+            self._search_poll_id = manager.get_or_create_root().after(self.search_poll_interval, self._poll_search)
+
+    def _cancel_search(self):
+        if self._search is not None:
+            self._search.cancelled = True
+            self._search = None
+        self._search_forward = None
+        if self._search_poll_id is not None:
+            manager.get_or_create_root().after_cancel(self._search_poll_id)
+            self._search_poll_id = None
+        self._update_find_status()
+
+    def _show_find_bar(self):
+        if self.find_frame is None:
+            self.find_frame = tk.Frame(self.top_frame)
+            tk.Label(self.find_frame, text="Find:").pack(side=tk.LEFT)
+            self.find_entry = tk.Entry(self.find_frame, width=30)
+            self.find_entry.pack(side=tk.LEFT)
+            self.find_entry.bind("<Return>", lambda event: self._on_find(True))
+            self.find_entry.bind("<Shift-Return>", lambda event: self._on_find(False))
+            self.find_entry.bind("<Escape>", lambda event: self._hide_find_bar())
+            tk.Button(self.find_frame, text="Previous", command=lambda: self._on_find(False)).pack(side=tk.LEFT)
+            tk.Button(self.find_frame, text="Next", command=lambda: self._on_find(True)).pack(side=tk.LEFT)
+            tk.Button(self.find_frame, text="Filter rows", command=self._on_filter).pack(side=tk.LEFT, padx=(10, 0))
+            tk.Button(self.find_frame, text="All rows", command=lambda: self.filter_rows(None)).pack(side=tk.LEFT)
+            self.find_status = tk.Label(self.find_frame, text="")
+            self.find_status.pack(side=tk.LEFT, padx=(10, 0))
+        self.find_frame.grid(column=0, row=3, sticky="ew")
+        self.find_entry.focus_set()
+        self._update_find_status()
+
+    def _hide_find_bar(self):
+        self.find_frame.grid_remove()
+        self.canvas1.focus_set()
+
+    def _on_find(self, forward):
+        try:
+            self.find(self.find_entry.get(), forward)
+        except ValueError as e:
+            self.find_status.configure(text=str(e))
+        return 'break'
+
+    def _on_filter(self):
+        """Filters by the selected column if a whole column is selected, otherwise by all columns."""
+        selection = self._selection
+        column = None
+        if (selection is not None) and (selection[2] - selection[0] == 1) and (selection[3] - selection[1] == self.yscroll_items):
+            column = selection[0]
+        try:
+            self.filter_rows(self.find_entry.get(), column)
+        except ValueError as e:
+            self.find_status.configure(text=str(e))
+
+    def _update_find_status(self):
+        if self.find_frame is None:
+            return
+        search = self._search
+        if search is None:
+            text = ""
+        elif search.error is not None:
+            text = f"Error: {search.error}"
+        elif search.finished:
+            text = "no hits" if search.num_hits == 0 else f"{search.num_hits} hits"
+        else:
+            text = f"{search.num_hits} hits so far, {search.progress:.0%} searched"
+        self.find_status.configure(text=text)
+
+    def sort_rows(self, column=None, descending=False):
+        """Shows the rows sorted by the values in a column of the displayed slice. nan values come last, and rows with
+        equal values keep their order. The array is not copied.
+
+        The sort order is computed on a worker thread and kept for the last sort_cache_size columns, so sorting by a
+        column again is instant. Until it is ready, the rows are shown in the previous order.
+
+        :param column: None shows the rows in their original order again.
+        """
+        self.sort_column = column
+        self.sort_descending = descending
+        self._start_row_order()
+
+    def filter_rows(self, query=None, column=None):
+        """Shows only the rows of the displayed slice that match a query. The filter is applied on a worker thread and
+        combined with the sort order (see sort_rows).
+
+        :param query: a value, a range or an expression of x like for find. None shows all rows again.
+        :param column: the column that has to match. None means that a row is shown if any of its cells matches.
+        :raises ValueError: if the query is invalid.
+        """
+        if query is not None:
+            parse_query(query)  # raises for invalid queries, so that the current filter is kept
+        self.row_filter = None if query is None else (query, column)
+        self._start_row_order()
+
+    def _on_double_click(self, event):
+        """Double-clicking a column heading sorts by the column in ascending, then descending, then the original order."""
+        if self.heatmap:
+            return
+        hit_x, hit_y = self._calc_hit_cell(event.x, event.y)
+        if (hit_x is None) or (hit_x < 0) or (hit_y != -1):
+            return
+        if self.sort_column != hit_x:
+            self.sort_rows(hit_x)
+        elif not self.sort_descending:
+            self.sort_rows(hit_x, descending=True)
+        else:
+            self.sort_rows(None)
+
+    def _start_row_order(self):
+        """Computes the rows for sort_column and row_filter on a worker thread and shows them when they are ready."""
+        self._cancel_row_order()
+        if (self.sort_column is None) and (self.row_filter is None):
+            self._set_rows(None)
+            self.message_label.configure(text="")
+            return
+        query, filter_column = (None, None) if self.row_filter is None else self.row_filter
+        matrix2d = self._slice2d.source if isinstance(self._slice2d, LazySnapshot) else self._slice2d
+        self._row_order_key = (self._slice_key, self.sort_column, self.sort_descending)
+        self._row_order = RowOrder(matrix2d, self.sort_column, self.sort_descending, query, filter_column,
+            self._sorted_rows.get(self._row_order_key, None))
+        threading.Thread(target=self._row_order.run, daemon=True).start()
+        self._row_order_poll_id = manager.get_or_create_root().after(self.row_order_poll_interval, self._poll_row_order)
+        self._invalidate()  # shows the sort marker
+
+    def _poll_row_order(self):
+        self._row_order_poll_id = None
+        row_order = self._row_order
+        if (row_order is None) or not self.canvas1.winfo_exists():
+            return
+        if not row_order.finished:
+            if (row_order.sort_column is not None) and (row_order.sorted_rows is None):
+                self.message_label.configure(text="Sorting ...")
             else:
-                self._selection = [hit_x, hit_y, hit_x + 1, hit_y + 1]
-                self._focused_cell = [hit_x, hit_y]
-                self.mouse_press_start = [hit_x, hit_y]
-
-        self._draw()
-
-    def _on_mouse_release(self, event):
-        self.old_mouse_press_start = self.mouse_press_start
-        self.mouse_press_start = None
-
-    def _on_mouse_motion(self, event):
-        if self.mouse_press_start is not None:
-            current_time = time.time()
-            if self.last_autoscroll_time < current_time - self.autoscroll_delay:
-                if self.mouse_press_start[0] != -1:
-                    if event.x < self.row_heading_width:
-                        self.xscroll_item = max(self.xscroll_item - 1, 0)
-                        self._scroll_x()
-                        self.last_autoscroll_time = current_time
-                    elif event.x > self.row_heading_width + self.xscroll_page_size * self.cell_width:
-                        self.xscroll_item = min(self.xscroll_item + 1, self.xscroll_max)
-                        self._scroll_x()
-                        self.last_autoscroll_time = current_time
-
-                if self.mouse_press_start[1] != -1:
-                    if event.y < self.cell_height:
-                        self.yscroll_item = max(self.yscroll_item - 1, 0)
-                        self._scroll_y()
-                        self.last_autoscroll_time = current_time
-                    elif event.y > self.cell_height + self.yscroll_page_size * self.cell_height:
-                        self.yscroll_item = min(self.yscroll_item + 1, self.yscroll_max)
-                        self._scroll_y()
-                        self.last_autoscroll_time = current_time
-
-            self._adjust_selection(event)
-            self._draw()
+                self.message_label.configure(text=f"Filtering ... {row_order.progress:.0%}")
+            self._row_order_poll_id = manager.get_or_create_root().after(self.row_order_poll_interval, self._poll_row_order)
+            return
+
+        self._row_order = None
+        if row_order.error is not None:
+            self.message_label.configure(text=f"Error: {row_order.error}")
+            return
+        if row_order.sorted_rows is not None:
+            self._sorted_rows.pop(self._row_order_key, None)
+            self._sorted_rows[self._row_order_key] = row_order.sorted_rows  # the most recently used comes last
+            while len(self._sorted_rows) > self.sort_cache_size:
+                del self._sorted_rows[next(iter(self._sorted_rows))]
+        self._set_rows(row_order.rows)
+
+        texts = []
+        if row_order.sort_column is not None:
+            texts.append(f"sorted by column {row_order.sort_column}" + (" (descending)" if row_order.descending else ""))
+        if row_order.query is not None:
+            texts.append(f"{len(row_order.rows)} of {self._slice2d.shape[0]} match {row_order.query!r}")
+        self.message_label.configure(text="Rows: " + ", ".join(texts))
+
+    def _set_rows(self, rows):
+        """Shows the given rows of the slice. The focus stays on the same row of the array if it is still shown."""
+        focused_cell = self.get_focused_cell()
+        self._rows = rows
+        self._matrix2d = self._slice2d if rows is None else RowView(self._slice2d, rows)
+        self.yscroll_items = self._matrix2d.shape[0]
+        self._tile_cache.clear()
+        self._cancel_pyramids()
+        self._cancel_statistics()
+        self._cancel_search()
+        self._selection = None
+        self._focused_cell = None
+        self._calc_size_scroll()
+        if focused_cell is not None:
+            displayed_rows = [focused_cell[0]] if rows is None else np.flatnonzero(rows == focused_cell[0])
+            if len(displayed_rows) > 0:
+                self._focus_cell(focused_cell[1], int(displayed_rows[0]))
+        self._invalidate()
+
+    def _cancel_row_order(self):
+        if self._row_order is not None:
+            self._row_order.cancelled = True
+            self._row_order = None
+        if self._row_order_poll_id is not None:
+            manager.get_or_create_root().after_cancel(self._row_order_poll_id)
+            self._row_order_poll_id = None
+
+    def _reset_row_order(self):
+        """Shows all rows in their original order without redrawing, e. g. because other columns are shown."""
+        self._cancel_row_order()
+        self.sort_column = None
+        self.row_filter = None
+        self._rows = None
+        self.message_label.configure(text="")
+
+    def _readable_matrix2d(self):
+        """Returns the displayed slice for reading big parts of it, e. g. on a worker thread. Lazy snapshots are read
+        from their source array, so that no blocks are copied."""
+        matrix2d = self._slice2d.source if isinstance(self._slice2d, LazySnapshot) else self._slice2d
+        return matrix2d if self._rows is None else RowView(matrix2d, self._rows)
+
+    def get_selection_statistics(self):
+        """Get statistics of the selected cells, which are also shown in the status bar.
+
+        Small selections are reduced directly. For big selections, tables of block statistics are built in the
+        background once, so that afterwards the statistics of any selection are available quickly.
+
+        :return: dict with shape, sum, mean, min, max and nan_count of the selection, where nan values are ignored. mean,
+                 min and max are None if there are no numbers (min and max also for complex arrays). None if nothing is
+                 selected or if the tables for a big selection are still being built.
+        """
+        selection = self._displayed_selection()
+        if selection is None:
+            return None
+        if self._region_statistics is None:
+            matrix2d = self._readable_matrix2d()
+            self._region_statistics = RegionStatistics(matrix2d)
+        statistics = self._region_statistics.region(*selection)
+        if (statistics is None) and not self._region_statistics_started:
+            self._region_statistics_started = True
+            threading.Thread(target=self._region_statistics.build, daemon=True).start()
+        return statistics
+
+    def _update_status_bar(self):
+        """Shows the statistics of the selection. They are only computed again if the selection changed."""
+        selection = self._displayed_selection()
+        key = None if selection is None else tuple(selection)
+        if key == self._status_key:
+            return
+        if selection is None:
+            text = ""
+        else:
+            statistics = self.get_selection_statistics()
+            if statistics is None:
+                text = f"{selection[1] - selection[0]} x {selection[3] - selection[2]}    computing ..."
+                key = 'computing'  # try again at the next poll
+                if self._statistics_poll_id is None:
+                    self._statistics_poll_id = manager.get_or_create_root().after(self.statistics_poll_interval, self._poll_statistics)
+            else:
+                text = format_statistics(statistics)
+        self._status_key = key
+        self.status_bar.configure(text=text)
+
+    def _poll_statistics(self):
+        self._statistics_poll_id = None
+        if self.canvas1.winfo_exists():
+            self._update_status_bar()
+
+    def _cancel_statistics(self):
+        """Forgets the statistics, e. g. because the values changed."""
+        if self._region_statistics is not None:
+            self._region_statistics.cancelled = True
+            self._region_statistics = None
+        self._region_statistics_started = False
+        self._status_key = 'outdated'
+        if self._statistics_poll_id is not None:
+            manager.get_or_create_root().after_cancel(self._statistics_poll_id)
+            self._statistics_poll_id = None
+
+    def copy_selection(self):
+        """Copies the selected cells to the clipboard as tab-separated text, which can be pasted into spreadsheets. The
+        values are formatted like they are shown.
+
+        :return: the number of copied cells.
+        :raises ValueError: if nothing is selected or more than clipboard_max_values cells are selected.
+        """
+        selection = self._displayed_selection()
+        if selection is None:
+            raise ValueError("nothing is selected")
+        num_values = (selection[1] - selection[0]) * (selection[3] - selection[2])
+        if num_values > self.clipboard_max_values:
+            raise ValueError(f"{num_values} cells are too many for the clipboard (the limit is {self.clipboard_max_values}), please export them")
+        block = self._matrix2d[selection[0]:selection[1], selection[2]:selection[3]]
+        formatters = [self._column_format(i_column)[0] for i_column in range(selection[2], selection[3])]
+        text = ''.join(iter_text_chunks(block, formatters, delimiter='\t'))
+        self.canvas1.clipboard_clear()
+        self.canvas1.clipboard_append(text[:-1])  # without the line break after the last row
+        return num_values
+
+    def export(self, path, selection_only=False, progress=None):
+        """Writes the values to a file, chunk by chunk so that the memory needed is bounded. The format is chosen by
+        the extension of path:
+
+        * .csv, .tsv or .txt: comma- or tab-separated text without header, with all digits.
+        * .npy: numpy array file. The whole array is saved with all its dimensions, and vectors as 1-D arrays.
+        * .parquet: one column per array column. Needs pyarrow.
+
+        :param selection_only: if True, only the selected cells are exported.
+        :param progress: optional function that is called with the fraction of the work done (0..1).
+        :raises ValueError: if the extension is not supported or selection_only is True but nothing is selected.
+        """
+        file_format = export_format(path)
+        matrix2d = self._readable_matrix2d()
+        if selection_only:
+            selection = self._displayed_selection()
+            if selection is None:
+                raise ValueError("nothing is selected")
+            if isinstance(matrix2d, RowView):
+                # slicing a RowView would gather the whole selection, so that it is read chunk by chunk
+                values = RowView(matrix2d.matrix[:, selection[2]:selection[3]], matrix2d.rows[selection[0]:selection[1]])
+            else:
+                values = matrix2d[selection[0]:selection[1], selection[2]:selection[3]]
+        elif file_format == 'npy':
+            values = self.matrix
+        else:
+            values = matrix2d  # text and Parquet files are 2-D
+
+        if file_format == 'npy':
+            # selections of vectors are saved as vectors, too
+            save_npy(values, path, progress, shape=values.shape[:1] if selection_only and (self.num_dims == 1) else None)
+        elif file_format == 'parquet':
+            save_parquet(values, path, progress=progress)
+        else:
+            save_text(values, path, ',' if file_format == 'csv' else '\t', progress=progress)
+
+    def _on_copy(self):
+        try:
+            num_values = self.copy_selection()
+        except ValueError as e:
+            self.message_label.configure(text=str(e))
+        else:
+            self.message_label.configure(text=f"Copied {num_values} cells")
+
+    def _on_export(self, selection_only):
+        """Asks for a file name and exports on a worker thread, showing the progress in the status bar."""
+        if self._export_state is not None:
+            self.message_label.configure(text="Please wait until the running export is finished")
+            return
+        if selection_only and (self._displayed_selection() is None):
+            self.message_label.configure(text="Nothing is selected")
+            return
+        path = tkinter.filedialog.asksaveasfilename(parent=self.top_frame, title="Export selection" if selection_only else "Export array",
+            defaultextension='.csv', filetypes=[("CSV", "*.csv"), ("Tab-separated text", "*.tsv *.txt"), ("numpy", "*.npy"), ("Parquet", "*.parquet")])
+        if not path:
+            return  # cancelled
+
+        state = [path, 0.0, None, False]
+        self._export_state = state
+
+        def run():
+            try:
+                self.export(path, selection_only, lambda fraction: state.__setitem__(1, fraction))
+            except Exception as e:
+                traceback.print_exc()
+                state[2] = e
+            state[3] = True
+
+        threading.Thread(target=run, daemon=True).start()
+        self._poll_export()
+
+    def _poll_export(self):
+        path, progress, error, finished = self._export_state
+        if not self.canvas1.winfo_exists():
+            return
+        if not finished:
+            self.message_label.configure(text=f"Exporting {os.path.basename(path)} ... {progress:.0%}")
+            manager.get_or_create_root().after(self.statistics_poll_interval, self._poll_export)
+            return
+        self._export_state = None
+        if error is None:
+            self.message_label.configure(text=f"Exported to {os.path.basename(path)}")
+        else:
+            self.message_label.configure(text=f"Export failed: {error}")
+
+    def on_destroy(self):
+        self._cancel_row_order()
+        self._cancel_statistics()
+        self._cancel_search()
+        self._cancel_pyramids()
+        if self._pyramid_poll_id is not None:
+            manager.get_or_create_root().after_cancel(self._pyramid_poll_id)
+            self._pyramid_poll_id = None
+        ViewerTabTable.on_destroy(self)
+
+    def _draw_heatmap(self):
+        """Shows the visible cells as a single image, which is color-mapped in one vectorized pass."""
+        row_end = min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)
+        column_end = min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)
+        max_shape = (int(self.size_y - self.cell_height), int(self.size_x - self.row_heading_width))
+        if (row_end <= self.yscroll_item) or (column_end <= self.xscroll_item) or (min(max_shape) <= 0):
+            self._update_item(self._heatmap_item, state='hidden')
+            return
+
+        if self.heatmap_level == 0:
+            block = np.asarray(self._matrix2d[self.yscroll_item:row_end, self.xscroll_item:column_end])
+        else:
+            factor = 2 ** self.heatmap_level
+            block = self._pyramid_blocks(self.heatmap_level, self.yscroll_item // factor, -(-row_end // factor),
+                self.xscroll_item // factor, -(-column_end // factor))
+            if block is None:
+                self._update_item(self._heatmap_item, state='hidden')
+                return
+        rgb = heatmap_rgb(block, self._heatmap_limits, self.heatmap_cell_size, max_shape)
+        self._heatmap_photo.configure(width=rgb.shape[1], height=rgb.shape[0], data=ppm_data(rgb), format='PPM')
+        self._update_item(self._heatmap_item, [self.row_heading_width, int(self.cell_height)], state='normal')
+
+    def _cell_texts(self, row_start, row_end, column_start, column_end):
+        """Returns the formatted cells of matrix[row_start:row_end, column_start:column_end] as a list of rows.
+
+        The cells are formatted tile by tile, and the tiles are kept in an LRU cache so that scrolling back to an area
+        does not format anything.
+        """
+        cell_texts = [[] for _ in range(row_end - row_start)]
+        if (row_end <= row_start) or (column_end <= column_start):
+            return cell_texts
+
+        for tile_row in range(row_start // tile_rows, (row_end - 1) // tile_rows + 1):
+            tile_row_start = tile_row * tile_rows
+            for tile_column in range(column_start // tile_columns, (column_end - 1) // tile_columns + 1):
+                tile_column_start = tile_column * tile_columns
+                key = (self._slice_key, tile_row, tile_column, self.float_formatter)
+                tile = self._tile_cache.get(key)
+                if tile is None:
+                    block = self._matrix2d[tile_row_start:tile_row_start + tile_rows, tile_column_start:tile_column_start + tile_columns]
+                    tile = self._format_tile(block, tile_column_start)
+                    self._tile_cache.put(key, tile)
+                    self._count_perf('formatted_values', block.size)
+
+                first_column = max(column_start - tile_column_start, 0)
+                last_column = min(column_end - tile_column_start, tile_columns)
+                for i_row in range(max(row_start, tile_row_start), min(row_end, tile_row_start + tile_rows)):
+                    cell_texts[i_row - row_start].extend(tile[i_row - tile_row_start][first_column:last_column])
+        return cell_texts
+
+    def _format_tile(self, block, column_start):
+        """Formats a block whose first column is column_start. Neighbouring columns with the same formatter are formatted
+        together. Columns with values that are longer than expected, e. g. outliers that were not sampled, are widened."""
+        tile = [[] for _ in range(block.shape[0])]
+        i_end = 0
+        while i_end < block.shape[1]:
+            i_start = i_end
+            formatter = self._column_format(column_start + i_start)[0]
+            while (i_end < block.shape[1]) and (self._column_format(column_start + i_end)[0] == formatter):
+                i_end += 1
+            for tile_row, texts in zip(tile, format_block(formatter, block[:, i_start:i_end])):
+                tile_row.extend(texts)
+
+        if (self.column_widths is not None) and (block.shape[0] > 0):
+            for i, texts in enumerate(zip(*tile)):
+                column_format = self._column_format(column_start + i)
+                longest = max(texts, key=len)
+                if len(longest) > len(column_format[1]):
+                    column_format[1] = longest
+                    self._fit_column(column_start + i, '0' + longest)
+        return tile
 
     def _draw_cells(self):
+        self._update_status_bar()
+        if self.heatmap:
+            self._drawn_cells = None
+            self._draw_heatmap()
+            return
+        self._update_item(self._heatmap_item, state='hidden')
+
+        row_end = min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)
+        column_end = min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)
+        cell_texts = self._cell_texts(self.yscroll_item, row_end, self.xscroll_item, column_end)
+        # remember the shown values and their text items, so that update can redraw only the cells that changed
+        self._drawn_cells = (self.yscroll_item, self.xscroll_item,
+            np.array(self._matrix2d[self.yscroll_item:row_end, self.xscroll_item:column_end]))
+        self._cell_items = [[] for _ in cell_texts]
+
         x = -self.cell_hpadding + self.row_heading_width
         y = self.cell_vpadding + self.cell_height
-        for i_row in range(self.yscroll_item, min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)):
-            self.canvas1.create_text(x, y, text=self.row_heading_formatter(i_row), font=self.cell_font, anchor='ne')
+        # the row headings are the rows of the array, also if the rows are sorted or filtered
+        rows = range(self.yscroll_item, row_end) if self._rows is None else self._rows[self.yscroll_item:row_end].tolist()
+        for i_row in rows:
+            self._draw_text(x, y, self.row_heading_formatter(i_row), anchor='ne')
             y += self.cell_height
-        x += self.cell_width
 
-        if self.num_dims == 1:
-            for i_column in range(self.xscroll_item, min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)):
-                y = self.cell_vpadding
-                self.canvas1.create_text(x, y, text='Value', font=self.cell_font, anchor='ne')
-                y += self.cell_height
+        for i_column in range(self.xscroll_item, column_end):
+            column_x = self._column_x(i_column)
+            column_width = self._column_width(i_column)
+            x = column_x + column_width - self.cell_hpadding
+            y = self.cell_vpadding
+            sort_marker = '' if i_column != self.sort_column else (' \u25bc' if self.sort_descending else ' \u25b2')
+            if self.num_dims == 1:
+                self._draw_text(x, y, 'Value' + sort_marker, anchor='ne')
+            else:
+                self._draw_text(column_x + column_width // 2, y, self.column_heading_formatter(i_column) + sort_marker, anchor='n')
+            y += self.cell_height
 
-                for i_row in range(self.yscroll_item, min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)):
-                    self.canvas1.create_text(x, y, text=self.float_formatter(self.matrix[i_row]), font=self.cell_font, anchor='ne')
-                    y += self.cell_height
-                x += self.cell_width
-        else:
-            for i_column in range(self.xscroll_item, min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)):
-                y = self.cell_vpadding
-                self.canvas1.create_text(x - self.max_text_width // 2, y, text=self.column_heading_formatter(i_column), font=self.cell_font, anchor='n')
+            for row_texts, row_items in zip(cell_texts, self._cell_items):
+                row_items.append(self._draw_text(x, y, row_texts[i_column - self.xscroll_item], anchor='ne'))
                 y += self.cell_height
 
-                for i_row in range(self.yscroll_item, min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)):
-                    self.canvas1.create_text(x, y, text=self.float_formatter(self.matrix[i_row, i_column]), font=self.cell_font, anchor='ne')
-                    y += self.cell_height
-                x += self.cell_width
+    def perf_stats(self, reset=False):
+        """See ViewerTabTable.perf_stats. Additionally contains tile_cache_hits and tile_cache_misses, where a miss means
+        that a tile of cells had to be formatted."""
+        stats = ViewerTabTable.perf_stats(self, reset)
+        stats['tile_cache_hits'] = self._tile_cache.hits
+        stats['tile_cache_misses'] = self._tile_cache.misses
+        if reset:
+            self._tile_cache.hits = 0
+            self._tile_cache.misses = 0
+        return stats
 
     def get_selection(self):
         """Get the current selected matrix area.
 
         :return: [start0, end0, start1, end1] so that matrix[start0:end0, start1:end1] represents the selected part.
                  If nothing was selected, returns None. If no area was explicitly selected, this is an 1x1 area representing the focused cell.
+                 For arrays with more than 2 dimensions, the indices refer to the displayed slice (see get_slice).
+                 If the rows are sorted or filtered, start0 is an array of the selected rows in the displayed order and
+                 end0 is None, so that matrix[start0, start1:end1] represents the selected part.
         """
+        selection = self._displayed_selection()
+        if (selection is None) or (self._rows is None):
+            return selection
+        return [self._rows[selection[0]:selection[1]], None, selection[2], selection[3]]
+
+    def _displayed_selection(self):
+        """Like get_selection, but the rows are the displayed ones."""
         if self._selection is None:
             return None
         else:
@@ -192,12 +1178,32 @@ class ViewerTabNumpy(ViewerTabTable):
         the cell with a white background inside the blue rectangle.
 
         :return: [index0, index1] so that matrix[index0, index1] represents the focused cell.
+                 For arrays with more than 2 dimensions, the indices refer to the displayed slice (see get_slice).
         """
         if self._focused_cell is None:
             return None
-        else:
+        elif self._rows is None:
             return [self._focused_cell[1], self._focused_cell[0]]
+        else:
+            return [int(self._rows[self._focused_cell[1]]), self._focused_cell[0]]
+
+def changed_cells(old_values, new_values):
+    """Compares the values of a block before and after an update.
+
+    :return: (rows, columns) of the cells whose values differ, where nan values count as equal because they look the
+             same. None if the blocks have different shapes or dtypes, i.e. everything has to be redrawn.
+    """
+    if (old_values.shape != new_values.shape) or (old_values.dtype != new_values.dtype):
+        return None
+    changed = old_values != new_values
+    if new_values.dtype.kind in ['f', 'c']:
+        changed &= ~(np.isnan(old_values) & np.isnan(new_values))  # nan != nan, but it looks the same
+    return np.nonzero(changed)
+
+def is_npy_file(object):
+    """Whether object is the path of an existing .npy file, which can be opened memory-mapped."""
+    return isinstance(object, (str, os.PathLike)) and str(object).endswith('.npy') and os.path.isfile(object)
 
 def matches_tab_numpy(object):
-    return ((isinstance(object, np.ndarray) and (object.ndim <= 2) and (object.dtype.isbuiltin == 1)) or
-        ((type(object).__name__ == "Tensor") and (object.ndim <= 2)))  # pytorch
\ No newline at end of file
+    return ((isinstance(object, np.ndarray) and (object.ndim >= 1) and (object.dtype.isbuiltin == 1)) or
+        ((type(object).__name__ == "Tensor") and (object.ndim >= 1)))  # pytorch
\ No newline at end of file
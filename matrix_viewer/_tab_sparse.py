@@ -0,0 +1,193 @@
+import numpy as np
+
+from ._formatting import format_block
+from ._manager import manager
+from ._statistics import compute_statistics, choose_formatter
+from ._tab_table import ViewerTabTable
+
+implicit_zero_color = "#aaaaaa"  # color of the zeros that are not stored
+
+
+def canonical_csr(matrix):
+    """Converts a scipy.sparse matrix or array to CSR with sorted column indices and without duplicates. CSR matrices
+    that are already canonical are returned as they are, without copying."""
+    csr = matrix.tocsr()
+    if not csr.has_canonical_format:
+        if csr is matrix:
+            csr = csr.copy()  # do not modify the caller's matrix
+        csr.sum_duplicates()  # also sorts the indices
+    return csr
+
+
+def sparse_block(csr, row_start, row_end, column_start, column_end):
+    """Returns csr[row_start:row_end, column_start:column_end] as dense arrays (values, stored), where stored marks the
+    stored entries. Only the rows of the block are searched, by binary search in their sorted column indices.
+
+    :param csr: canonical CSR matrix, see canonical_csr.
+    """
+    shape = (max(row_end - row_start, 0), max(column_end - column_start, 0))
+    values = np.zeros(shape, dtype=csr.dtype)
+    stored = np.zeros(shape, dtype=bool)
+    for i_row in range(row_start, row_end):
+        start, end = csr.indptr[i_row], csr.indptr[i_row + 1]
+        columns = csr.indices[start:end]
+        first, last = np.searchsorted(columns, [column_start, column_end])
+        block_columns = columns[first:last] - column_start
+        values[i_row - row_start, block_columns] = csr.data[start + first:start + last]
+        stored[i_row - row_start, block_columns] = True
+    return values, stored
+
+
+def next_stored(csr, row, column, forward=True):
+    """Returns (row, column) of the first stored entry after the cell (row, column) in row-major order, or before it if
+    not forward. The search wraps around at the end of the matrix. column may be -1 (or the number of columns) to
+    include the first (or the last) cell of the row.
+
+    :param csr: canonical CSR matrix, see canonical_csr.
+    :return: None if the matrix has no stored entries.
+    """
+    if csr.nnz == 0:
+        return None
+    start, end = csr.indptr[row], csr.indptr[row + 1]
+    if forward:
+        position = (start + np.searchsorted(csr.indices[start:end], column, side='right')) % csr.nnz
+    else:
+        position = (start + np.searchsorted(csr.indices[start:end], column, side='left') - 1) % csr.nnz
+    # the row is the last one whose first entry is at or before the position, which skips empty rows
+    return int(np.searchsorted(csr.indptr, position, side='right') - 1), int(csr.indices[position])
+
+
+class ViewerTabSparse(ViewerTabTable):
+    """A viewer tab that shows a scipy.sparse matrix or array without converting it to a dense array.
+
+    The matrix is converted to CSR once (CSR matrices are used as they are, so later modifications are visible). For
+    each redraw, only the stored entries of the visible block are looked up and formatted. The zeros that are not
+    stored are drawn in a lighter color. Press n (Shift-n) to jump to the next (previous) stored entry, see
+    next_nonzero.
+    """
+    def __init__(self, viewer, matrix, title=None, font_size=None, cell_formatter=None, prepared=None):
+        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass.
+
+        :param prepared: result of prepare(matrix, cell_formatter) if it was already run on a worker thread.
+        """
+        self.matrix = matrix
+        if prepared is None:
+            prepared = self.prepare(matrix, cell_formatter)
+        self.csr = prepared['csr']
+        self.cell_formatter = prepared['formatter']
+        self._longest_text = prepared['longest_text']
+        self._zero_text = self.cell_formatter(np.zeros((), dtype=self.csr.dtype)[()])
+
+        self._calc_font(font_size)
+        self._font_changed()
+
+        if title is None:
+            title = f"{matrix.shape[0]} x {matrix.shape[1]} {type(matrix).__name__} {self.csr.dtype} ({matrix.nnz} stored)"
+
+        ViewerTabTable.__init__(self, viewer, title, self.csr.shape[1], self.csr.shape[0])
+
+        self.canvas1.bind("<ButtonPress-1>", self._on_mouse_press)
+        self.canvas1.bind("<ButtonRelease-1>", self._on_mouse_release)
+        self.canvas1.bind("<Motion>", self._on_mouse_motion)
+
+    @staticmethod
+    def prepare(matrix, cell_formatter=None, progress=None):
+        """Converts the matrix to CSR and chooses the formatter from the stored values.
+
+        :param progress: optional function that is called with the fraction of the work done (0..1).
+        :return: a dict that can be passed to __init__ as prepared.
+        """
+        csr = canonical_csr(matrix)
+        if progress is not None:
+            progress(0.5)
+        values = csr.data if csr.nnz > 0 else np.zeros(1, dtype=csr.dtype)
+        statistics = compute_statistics(values)
+        formatter = cell_formatter
+        if formatter is None:
+            formatter = choose_formatter(csr.dtype, statistics)
+        if progress is not None:
+            progress(1.0)
+
+        return {
+            'csr': csr,
+            'formatter': formatter,
+            'longest_text': formatter(statistics.max_value),
+        }
+
+    def _font_changed(self):
+        self.max_text_width = manager.measure_text(self.cell_font, '0' + max(self._longest_text, self._zero_text, key=len))
+        self.row_heading_text_width = manager.measure_text(self.cell_font, "0" * len(str(self.csr.shape[0] - 1)))
+
+    def _draw_cells(self):
+        row_end = min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)
+        column_end = min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)
+        values, stored = sparse_block(self.csr, self.yscroll_item, row_end, self.xscroll_item, column_end)
+        # only the stored entries are formatted, the other cells all show the same zero
+        texts = np.full(values.shape, self._zero_text, dtype=object)
+        if np.any(stored):
+            texts[stored] = format_block(self.cell_formatter, values[stored][np.newaxis, :])[0]
+            self._count_perf('formatted_values', int(np.count_nonzero(stored)))
+
+        x = -self.cell_hpadding + self.row_heading_width
+        y = self.cell_vpadding + self.cell_height
+        for i_row in range(self.yscroll_item, row_end):
+            self._draw_text(x, y, str(i_row), anchor='ne')
+            y += self.cell_height
+
+        for i_column in range(self.xscroll_item, column_end):
+            column_x = self._column_x(i_column)
+            x = column_x + self.cell_width - self.cell_hpadding
+            y = self.cell_vpadding
+            self._draw_text(column_x + self.cell_width // 2, y, str(i_column), anchor='n')
+            y += self.cell_height
+            for text, is_stored in zip(texts[:, i_column - self.xscroll_item], stored[:, i_column - self.xscroll_item]):
+                self._draw_text(x, y, text, anchor='ne', fill='black' if is_stored else implicit_zero_color)
+                y += self.cell_height
+
+    def _on_key(self, event):
+        if event.keysym in ['n', 'N']:
+            self.next_nonzero(forward=(event.keysym == 'n'))
+        else:
+            ViewerTabTable._on_key(self, event)
+
+    def next_nonzero(self, forward=True):
+        """Focuses the next stored entry after the focused cell in row-major order (the previous one if not forward),
+        wrapping around at the end. It is found by binary search in the index arrays of the CSR matrix.
+
+        :return: [index0, index1] of the focused entry, or None if no entry is stored.
+        """
+        if self._focused_cell is None:
+            row, column = self.yscroll_item, -1
+        else:
+            row, column = self._focused_cell[1], self._focused_cell[0]
+        hit = next_stored(self.csr, row, column, forward)
+        if hit is None:
+            return None
+        self._focus_cell(hit[1], hit[0])
+        return list(hit)
+
+    def get_selection(self):
+        """Get the current selected area.
+
+        :return: [start0, end0, start1, end1] so that matrix[start0:end0, start1:end1] represents the selected part.
+                 If nothing was selected, returns None. If no area was explicitly selected, this is an 1x1 area representing the focused cell.
+        """
+        if self._selection is None:
+            return None
+        else:
+            return [self._selection[1], self._selection[3], self._selection[0], self._selection[2]]
+
+    def get_focused_cell(self):
+        """Get the currently focused cell. This is the most recent cell that the user clicked on.
+
+        :return: [index0, index1] so that matrix[index0, index1] represents the focused cell.
+        """
+        if self._focused_cell is None:
+            return None
+        else:
+            return [self._focused_cell[1], self._focused_cell[0]]
+
+
+def matches_tab_sparse(object):
+    """Whether object is a 2-D scipy.sparse matrix or array. scipy is not imported, it is an optional dependency."""
+    return type(object).__module__.startswith("scipy.sparse") and (getattr(object, 'ndim', None) == 2)
@@ -1,121 +1,334 @@
-
+import inspect
+import itertools
+import time
 import numpy as np
 import tkinter as tk
 
+from ._manager import manager
 from ._tab_table import ViewerTabTable
 from ._tab_numpy import matches_tab_numpy
+from ._tab_dataframe import matches_tab_dataframe
+
+max_summary_length = 200  # longer value strings are cut
+summary_time_budget = 0.02  # in seconds, entries that do not fit into this time per draw are summarized in the next draw
+prefetch_rows = 50  # entries above and below the visible rows are summarized in advance
+key_chunk_size = 10000  # dict keys and set elements that are iterated between two checks of the time budget
+pending_summary = "..."
+
+_excluded_attributes = ["__class__", "__dict__", "__doc__", "__module__", "__weakref__"]  # __class__ is always callable
+
+
+def _is_static_method(attribute):
+    """Whether an attribute found by inspect.getattr_static is a method, so that it can be skipped without calling getattr."""
+    return callable(attribute) or isinstance(attribute, (staticmethod, classmethod))
+
+
+class StructEntries:
+    """The rows of a struct tab, i. e. the (name, value) pairs of the elements or attributes of an object.
+
+    Nothing is fetched up front: list and tuple elements are accessed by index, dicts and sets are only iterated as far
+    as needed, and attributes are only queried with getattr when they are needed.
+
+    dicts and sets cannot be indexed, so showing entry N needs the first N keys. fetch_keys iterates in chunks and can
+    stop after a time budget, so jumping to the end of a big dict takes several draws instead of freezing the window.
+    The keys that were iterated are kept, which needs 8 bytes per key, a fraction of what the dict itself needs.
+    """
+
+    def __init__(self, object):
+        self.object = object
+        self._values = {}  # index -> value, for attributes that may be expensive to query again
+        if type(object) in (list, tuple):
+            self._kind = 'sequence'
+            self._length = len(object)
+        elif isinstance(object, dict) or (type(object) == set):
+            self._kind = 'dict' if isinstance(object, dict) else 'set'
+            self._length = len(object)
+            self._keys = []  # prefix of the keys or elements in iteration order
+            self._iterator = iter(object)
+            self._num_skipped = 0  # number of keys that the iterator still has to skip to continue after _keys
+        else:
+            # methods are skipped based on the class attributes, which does not run any property code
+            names = []
+            for name in dir(object):
+                if name in _excluded_attributes:
+                    continue
+                try:
+                    static_attribute = inspect.getattr_static(object, name)
+                except AttributeError:
+                    static_attribute = None  # e. g. provided by __getattr__
+                if not _is_static_method(static_attribute):
+                    names.append(name)
+            self._kind = 'attributes'
+            self._keys = names
+            self._length = len(names)
+
+    def __len__(self):
+        return self._length
+
+    def is_fetched(self, index):
+        """Whether the entry can be accessed without iterating a dict or set, see fetch_keys. Entries beyond the end of
+        a container that shrank count as fetched, accessing them raises IndexError."""
+        return (self._kind not in ['dict', 'set']) or (index < len(self._keys)) or (index >= self._length)
+
+    def fetch_keys(self, end, time_end=None):
+        """Iterates the dict or set until the keys of the first end entries are known.
+
+        :param time_end: stop early once time.perf_counter() is past it. It is checked after every chunk of key_chunk_size
+                         keys, so each call makes progress.
+        :return: whether the keys are known.
+        """
+        if self._kind not in ['dict', 'set']:
+            return True
+        end = min(end, self._length)
+        while len(self._keys) < end:
+            try:
+                if self._num_skipped > 0:
+                    num_requested = min(self._num_skipped, key_chunk_size)
+                    num_skipped = len(list(itertools.islice(self._iterator, num_requested)))
+                    if num_skipped < num_requested:
+                        # the container shrank, so only the keys that it still has are valid
+                        del self._keys[len(self._keys) - self._num_skipped + num_skipped:]
+                        self._length = len(self._keys)
+                        num_skipped = self._num_skipped
+                    self._num_skipped -= num_skipped
+                else:
+                    num_keys = len(self._keys)
+                    self._keys.extend(itertools.islice(self._iterator, min(end - num_keys, key_chunk_size)))
+                    if len(self._keys) < min(end, num_keys + key_chunk_size):
+                        self._length = len(self._keys)  # the container shrank
+            except RuntimeError:
+                # the container was modified while it was shown, so continue with the current state. The keys that
+                # were already iterated are skipped chunk by chunk like the others, without copying the container.
+                self._iterator = iter(self.object)
+                self._num_skipped = len(self._keys)
+            end = min(end, self._length)
+            if (time_end is not None) and (time.perf_counter() > time_end) and (len(self._keys) < end):
+                return False
+        return True
+
+    def _key(self, index):
+        self.fetch_keys(index + 1)
+        if index >= len(self._keys):
+            raise IndexError(f"index {index} is out of range, the container shrank to {self._length} elements")
+        return self._keys[index]
+
+    def name(self, index):
+        """Returns the name of the entry, i. e. the list index, dict key or attribute name."""
+        if self._kind == 'sequence':
+            return str(index) if type(self.object) == list else ""
+        elif self._kind == 'dict':
+            return str(self._key(index))
+        elif self._kind == 'set':
+            return ""
+        else:
+            return self._keys[index]
+
+    def value(self, index):
+        """Returns the value of the entry. Raises an exception if querying an attribute failed."""
+        if self._kind == 'sequence':
+            return self.object[index]
+        elif self._kind == 'dict':
+            return self.object[self._key(index)]
+        elif self._kind == 'set':
+            return self._key(index)
+        else:
+            value = self._values.get(index, self._values)
+            if value is self._values:
+                value = getattr(self.object, self._keys[index])
+                self._values[index] = value
+            return value
+
+
+def summarize_value(value):
+    """Returns (value string, clickable) for the value column of a struct tab. The string is at most
+    max_summary_length characters long."""
+    if isinstance(value, (int, float)):  # also matches bool because bool is a subclass of int
+        value_string = str(value)
+    elif type(value) == str:
+        value_string = value[:max_summary_length + 1]
+        if '\n' in value:
+            value_string = f"multiline string with {len(value)} characters"
+    elif type(value) == bytes:
+        value_string = str(value[:max_summary_length + 1])
+    elif value is None:
+        value_string = "None"
+    elif type(value) == np.ndarray:
+        value_string = f"{value.shape} {value.dtype} ndarray"
+    elif matches_tab_dataframe(value):
+        value_string = f"{value.shape} {type(value).__name__}"
+    elif type(value) in [list, dict, set, tuple]:
+        value_string = f"{value.__class__.__name__} with {len(value)} elements"
+    else:
+        value_string = str(type(value))
+    if len(value_string) > max_summary_length:
+        value_string = value_string[:max_summary_length - 3] + pending_summary
+
+    clickable = matches_tab_numpy(value) or matches_tab_struct(value) or (type(value).__name__ in ["ndarray", "Tensor"])
+    return value_string, clickable
+
 
 class ViewerTabStruct(ViewerTabTable):
-    """A viewer tab that can be used to visualize a class, list, dict and some other container types."""
-    def __init__(self, viewer, object, title=None, font_size=None):
-        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass."""
+    """A viewer tab that can be used to visualize a class, list, dict and some other container types.
+
+    Entries are fetched and summarized when they are shown for the first time, so big containers and objects with
+    expensive properties open quickly.
+    """
+    def __init__(self, viewer, object, title=None, font_size=None, prepared=None):
+        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass.
+
+        :param prepared: result of prepare(object) if it was already run on a worker thread.
+        """
         self.object = object
 
         self._calc_font(font_size)
 
-        default_title = object.__class__.__name__
-
-        # query all attributes associated with the object
-        if type(self.object) in (set, tuple):
-            self.object_attributes = list(("", value) for value in self.object)
-            self.row_heading_heading = ""
-            default_title = f"{self.object.__class__.__name__} with {len(self.object)} elements"
-        elif type(self.object) == list:
-            self.object_attributes = list((str(i), value) for i, value in enumerate(self.object))
-            self.row_heading_heading = ""
-            default_title = f"list with {len(self.object)} elements"
-        elif isinstance(self.object, dict):
-            self.object_attributes = list(self.object.items())
-            self.row_heading_heading = "Key"
-            default_title = f"{type(self.object).__name__} with {len(self.object)} elements"
-        else:
-            self.object_attributes = []
-            for element_name in dir(self.object):
-                try:
-                    attr = getattr(self.object, element_name)
-                    if (not callable(attr)) and (element_name not in ["__dict__", "__doc__", "__module__", "__weakref__"]):
-                        self.object_attributes.append((element_name, attr))
-                except BaseException as e:
-                    # print(f'matrix_viewer: exception querying {element_name}: {e}')
-                    pass
-            self.row_heading_heading = "Name"
-
-        # format the values
-        self.object_value_strings = []
-        self.object_value_clickable = []
-        for _, value in self.object_attributes:
-            if isinstance(value, (int, float)):  # also matches bool because bool is a subclass of int
-                value_string = str(value)
-            elif type(value) in [str, bytes]:
-                value_string = str(value)
-                if '\n' in value_string:
-                    value_string = f"multiline string with {len(value)} characters"
-            elif value is None:
-                value_string = "None"
-            elif type(value) == np.ndarray:
-                value_string = f"{value.shape} {value.dtype} ndarray"
-            elif type(value) in [list, dict, set, tuple]:
-                value_string = f"{value.__class__.__name__} with {len(value)} elements"
-            else:
-                value_string = str(type(value))
-
-            clickable = matches_tab_numpy(value) or matches_tab_struct(value) or (type(value).__name__ in ["ndarray", "Tensor"])
-
-            self.object_value_strings.append(value_string)
-            self.object_value_clickable.append(clickable)
+        if prepared is None:
+            prepared = self.prepare(object)
+        self.entries = prepared['entries']
+        self.row_heading_heading = prepared['row_heading_heading']
+        default_title = prepared['default_title']
+        self._summaries = {}  # index -> (name string, value string, clickable)
+        self._longest_name = self.row_heading_heading  # longest strings summarized so far, used to estimate the column widths
+        self._longest_value = "Value"
 
         self._font_changed()
 
         if title is None:
             title = default_title
 
-        ViewerTabTable.__init__(self, viewer, title, 1, len(self.object_attributes))
+        ViewerTabTable.__init__(self, viewer, title, 1, len(self.entries))
 
         self.clickable_color = "#000077"
         self.clickable_hover_color = "#0000ff"
 
         self.canvas1.bind("<ButtonRelease-1>", self._on_mouse_release)
 
+    @staticmethod
+    def prepare(object, progress=None):
+        """Does the part of __init__ that does not need the GUI. Only the attribute names of objects are queried here,
+        the values are fetched when they are shown.
+
+        :param progress: optional function that is called with the fraction of the work done (0..1).
+        :return: a dict that can be passed to __init__ as prepared.
+        """
+        entries = StructEntries(object)
+        if type(object) in (set, tuple):
+            row_heading_heading = ""
+            default_title = f"{object.__class__.__name__} with {len(object)} elements"
+        elif type(object) == list:
+            row_heading_heading = ""
+            default_title = f"list with {len(object)} elements"
+        elif isinstance(object, dict):
+            row_heading_heading = "Key"
+            default_title = f"{type(object).__name__} with {len(object)} elements"
+        else:
+            row_heading_heading = "Name"
+            default_title = object.__class__.__name__
+        if progress is not None:
+            progress(1.0)
+
+        return {
+            'entries': entries,
+            'row_heading_heading': row_heading_heading,
+            'default_title': default_title,
+        }
+
+    def _summary(self, index):
+        """Returns the cached (name string, value string, clickable) of an entry, summarizing it if needed."""
+        summary = self._summaries.get(index, None)
+        if summary is None:
+            try:
+                name = self.entries.name(index)
+            except IndexError:  # the container shrank
+                name = ""
+            try:
+                value_string, clickable = summarize_value(self.entries.value(index))
+            except BaseException as e:
+                value_string, clickable = f"<error: {type(e).__name__}>", False
+            summary = (name[:max_summary_length], value_string, clickable)
+            self._summaries[index] = summary
+            if len(summary[0]) > len(self._longest_name):
+                self._longest_name = summary[0]
+            if len(summary[1]) > len(self._longest_value):
+                self._longest_value = summary[1]
+        return summary
+
+    def _prefetch(self):
+        """Summarizes the visible entries and a margin around them, but stops after summary_time_budget. The keys of
+        dicts and sets are iterated within the same budget, so entries whose keys are not known yet stay pending.
+        Returns whether all visible entries are summarized."""
+        first_visible = self.yscroll_item
+        end_visible = min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)
+        end_margin = min(end_visible + prefetch_rows, self.yscroll_items)
+        indices = list(range(first_visible, end_visible))  # visible entries first
+        indices += list(range(end_visible, end_margin))
+        indices += list(range(first_visible - 1, max(first_visible - prefetch_rows, 0) - 1, -1))
+
+        time_end = time.perf_counter() + summary_time_budget
+        keys_fetched = self.entries.fetch_keys(end_margin, time_end)
+        for i, index in enumerate(indices):
+            if (index not in self._summaries) and self.entries.is_fetched(index):
+                if time.perf_counter() > time_end:
+                    return first_visible + i >= end_visible
+                self._summary(index)
+        return keys_fetched or self.entries.is_fetched(end_visible - 1)
+
     def _font_changed(self):
-        self.max_text_width = max(self.cell_font.measure(s) for s in (self.object_value_strings + ['Value']))
-        row_headings = list(attr[0] for attr in self.object_attributes)
-        self.row_heading_text_width = max(self.cell_font.measure(s) for s in (row_headings + [self.row_heading_heading]))
+        # estimating the widths from the longest strings seen so far is much faster than measuring every row
+        self._estimated_strings = (self._longest_name, self._longest_value)
+        self.max_text_width = manager.estimate_text_width(self.cell_font, self._longest_value)
+        self.row_heading_text_width = manager.estimate_text_width(self.cell_font, self._longest_name)
+
+    def _draw(self):
+        complete = self._prefetch()
+        if self._estimated_strings != (self._longest_name, self._longest_value):
+            self._font_changed()  # new entries are longer, so widen the columns
+            self._calc_dimensions()
+            self._calc_size_scroll()
+        ViewerTabTable._draw(self)
+        if not complete:
+            self._invalidate()  # summarize the rest in the next draw so that the GUI stays responsive
 
     def _on_mouse_release(self, event):
         hit_x, hit_y = self._calc_hit_cell(event.x, event.y)
 
         if (hit_x is not None) and (hit_x != -1) and (hit_y != -1):
             assert hit_x == 0
-            if self.object_value_clickable[hit_y]:
-                self.viewer.view(self.object_attributes[hit_y][1])
+            if self.entries.is_fetched(hit_y) and self._summary(hit_y)[2]:
+                self.viewer.view(self.entries.value(hit_y))
                 new_tab_index = self.viewer.paned.index('end') - 1  # assumes that the new tab is the last tab
                 self.viewer.paned.select(new_tab_index)  # go to the currently added tab
 
     def _draw_cells(self):
+        row_end = min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)
+        summaries = [self._summaries.get(i_row, None) for i_row in range(self.yscroll_item, row_end)]
+
         x = self.cell_hpadding
         y = self.cell_vpadding
-        self.canvas1.create_text(x, y, text=self.row_heading_heading, font=self.cell_font, anchor='nw')
+        self._draw_text(x, y, self.row_heading_heading, anchor='nw')
         y += self.cell_height
-        for i_row in range(self.yscroll_item, min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)):
-            self.canvas1.create_text(x, y, text=self.object_attributes[i_row][0], font=self.cell_font, anchor='nw')
+        for summary in summaries:
+            self._draw_text(x, y, pending_summary if summary is None else summary[0], anchor='nw')
             y += self.cell_height
         x += self.row_heading_width
 
         for i_column in range(self.xscroll_item, min(self.xscroll_item + self.xscroll_page_size + 1, self.xscroll_items)):
             y = self.cell_vpadding
-            self.canvas1.create_text(x, y, text="Value", font=self.cell_font, anchor='nw')
+            self._draw_text(x, y, "Value", anchor='nw')
             y += self.cell_height
 
-            for i_row in range(self.yscroll_item, min(self.yscroll_item + self.yscroll_page_size + 1, self.yscroll_items)):
-                if self.object_value_clickable[i_row]:
-                    self.canvas1.create_text(
-                        x, y, text=self.object_value_strings[i_row], font=self.cell_font, anchor='nw',
+            for summary in summaries:
+                if summary is None:
+                    self._draw_text(x, y, pending_summary, anchor='nw')
+                elif summary[2]:
+                    self._draw_text(
+                        x, y, summary[1], anchor='nw',
                         fill=self.clickable_color, activefill=self.clickable_hover_color,
                     )
                 else:
-                    self.canvas1.create_text(x, y, text=self.object_value_strings[i_row], font=self.cell_font, anchor='nw')
+                    self._draw_text(x, y, summary[1], anchor='nw')
                 y += self.cell_height
             x += self.cell_width
 
 def matches_tab_struct(object):
-    return (not isinstance(object, (int, float, str, bytes, np.ndarray))) and (type(object).__name__ != "Tensor") and (object is not None)
\ No newline at end of file
+    return (not isinstance(object, (int, float, str, bytes, np.ndarray))) and (type(object).__name__ != "Tensor") and (object is not None)
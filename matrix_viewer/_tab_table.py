@@ -5,16 +5,30 @@ import tkinter.font
 import numpy as np
 import math
 import platform
+import time
 
 from ._manager import manager
+from ._profiling import DrawProfiler, format_perf_stats
 from ._tab import ViewerTab
 from ._utils import clip
 
 class ViewerTabTable(ViewerTab):
     """
     subclasses must implememnt _font_changed(), which calculates cell widths etc on font (size) change
+
+    subclasses must implement _draw_cells(), which draws the headings and cell texts with _draw_text. The canvas items
+    are reused between redraws, so _draw_cells must not create canvas items itself.
+
+    subclasses that support selecting cells bind _on_mouse_press, _on_mouse_release and _on_mouse_motion to the canvas.
+
+    All columns are cell_width wide, unless a subclass sets column_widths to a ColumnWidths object, which measures the
+    columns when they come into view. Use _column_x and _column_width to place the cells of a column.
+
+    Press F12 to show the draw statistics (see perf_stats) in the top right corner of the tab.
     """
 
+    column_widths = None  # ColumnWidths, or None if all columns are cell_width wide
+
     def __init__(self, viewer, title, num_columns, num_rows, highlight_selected_columns=True):
         ViewerTab.__init__(self)
 
@@ -34,6 +48,8 @@ class ViewerTabTable(ViewerTab):
         self.selection_heading_color = "#aaaaaa"
         self.selection_color = "#bbbbff"
         self.autoscroll_delay = 0.1  # in seconds
+        self.max_frame_rate = None  # if set, the table is redrawn at most this many times per second
+        self.show_grid_lines = True
 
         self._calc_dimensions()
 
@@ -45,6 +61,10 @@ class ViewerTabTable(ViewerTab):
         self.mouse_press_start = None
         self.old_mouse_press_start = None
         self.last_autoscroll_time = 0
+        self._draw_id = None  # id of the scheduled redraw, see _invalidate
+        self._last_draw_time = 0
+        self._show_perf_overlay = False
+        self._profiler = DrawProfiler()
 
         self.top_frame = tk.Frame(self.viewer.paned)
 
@@ -56,6 +76,7 @@ class ViewerTabTable(ViewerTab):
 
         self.canvas1.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.canvas1.bind("<Configure>", self._on_resize)
+        self._create_canvas_items()
 
         # see https://stackoverflow.com/questions/17355902/tkinter-binding-mousewheel-to-scrollbar#17457843
         if platform.system() == "Linux":
@@ -83,23 +104,64 @@ class ViewerTabTable(ViewerTab):
         self.cell_width = self.max_text_width + self.cell_hpadding * 2
 
     def _calc_size_scroll(self):
-        self.xscroll_page_size = (self.size_x - self.row_heading_width) // self.cell_width
-        self.xscroll_max = max(self.xscroll_items - self.xscroll_page_size, 0)
+        self._calc_x_page()
         self.xscroll_item = min(self.xscroll_item, self.xscroll_max)
         self._scroll_x()
 
-        self.yscroll_page_size = (self.size_y - self.cell_height) // self.cell_height
+        self.yscroll_page_size = int((self.size_y - self.cell_height) // self.cell_height)
         self.yscroll_max = max(self.yscroll_items - self.yscroll_page_size, 0)
         self.yscroll_item = min(self.yscroll_item, self.yscroll_max)
         self._scroll_y()
 
+        self._resize_text_pool()
+
     def _scroll_y(self):
         if self.yscroll_items == 0:
             self.yscrollbar.set(0, 1)
         else:
             self.yscrollbar.set(self.yscroll_item / self.yscroll_items, (self.yscroll_item + self.yscroll_page_size) / self.yscroll_items)
 
+    def _calc_x_page(self):
+        """Sets xscroll_page_size (the number of completely visible columns) and xscroll_max. With column_widths, this
+        depends on the scroll position and measures the visible columns."""
+        available_width = self.size_x - self.row_heading_width
+        if self.column_widths is None:
+            self.xscroll_page_size = int(available_width // self.cell_width)
+            self.xscroll_max = max(self.xscroll_items - self.xscroll_page_size, 0)
+        else:
+            self.column_widths.measure_visible(self.xscroll_item, available_width)
+            self.xscroll_page_size = max(self._hit_column(self.size_x) - self.xscroll_item, 0)
+            self.xscroll_max = self.column_widths.last_start(available_width)
+
+    def _column_x(self, i_column):
+        """Returns the x coordinate of the left border of column i_column on the canvas."""
+        if self.column_widths is None:
+            return self.row_heading_width + (i_column - self.xscroll_item) * self.cell_width
+        return self.row_heading_width + self.column_widths.offset(i_column) - self.column_widths.offset(self.xscroll_item)
+
+    def _column_width(self, i_column):
+        if self.column_widths is None:
+            return self.cell_width
+        return self.column_widths.width(i_column)
+
+    def _hit_column(self, x):
+        """Returns the index of the column at the canvas x coordinate, which can be out of range."""
+        if self.column_widths is None:
+            return int((x - self.row_heading_width) // self.cell_width) + self.xscroll_item
+        return self.column_widths.index_at(x - self.row_heading_width + self.column_widths.offset(self.xscroll_item))
+
+    def _fit_column(self, i_column, text):
+        """Widens column i_column if text does not fit into it. The table is redrawn if the column got wider."""
+        if self.column_widths is None:
+            return
+        if self.column_widths.widen(i_column, manager.measure_text(self.cell_font, text) + self.cell_hpadding * 2):
+            self._calc_x_page()
+            self._invalidate()
+
     def _scroll_x(self):
+        if self.column_widths is not None:
+            self._calc_x_page()  # other columns with other widths came into view
+            self.xscroll_item = min(self.xscroll_item, self.xscroll_max)
         if self.xscroll_items == 0:
             self.xscrollbar.set(0, 1)
         else:
@@ -119,7 +181,7 @@ class ViewerTabTable(ViewerTab):
         if (new_xscroll_item is not None) and (new_xscroll_item != self.xscroll_item):
             self.xscroll_item = new_xscroll_item
             self._scroll_x()
-            self._draw()
+            self._invalidate()
 
     def _on_y_scroll(self, *args):
         new_yscroll_item = None
@@ -135,13 +197,34 @@ class ViewerTabTable(ViewerTab):
         if (new_yscroll_item is not None) and (new_yscroll_item != self.yscroll_item):
             self.yscroll_item = new_yscroll_item
             self._scroll_y()
+            self._invalidate()
+
+    def _invalidate(self):
+        """Schedules a redraw. All state changes until the redraw (e. g. from key repeats or mouse motion) are merged
+        into a single _draw call, which runs when Tk is idle, i. e. after all pending events were processed.
+        """
+        if self._draw_id is not None:
+            return
+        delay = 0
+        if self.max_frame_rate is not None:
+            delay = self._last_draw_time + 1 / self.max_frame_rate - time.perf_counter()
+        # schedule via the root window because the canvas may be destroyed before the redraw
+        if delay > 0:
+            self._draw_id = manager.get_or_create_root().after(int(delay * 1000) + 1, self._on_scheduled_draw)
+        else:
+            self._draw_id = manager.get_or_create_root().after_idle(self._on_scheduled_draw)
+
+    def _on_scheduled_draw(self):
+        self._draw_id = None
+        if self.canvas1.winfo_exists():
+            self._last_draw_time = time.perf_counter()
             self._draw()
 
     def _on_resize(self, event):
         self.size_x = event.width
         self.size_y = event.height
         self._calc_size_scroll()
-        self._draw()
+        self._invalidate()
 
     def _on_key(self, event):
         if event.keysym == 'Next':
@@ -159,7 +242,10 @@ class ViewerTabTable(ViewerTab):
                         self._focused_cell[0] + 1, self._focused_cell[1] + 1]
                 self.yscroll_item = min(self.yscroll_item + self.yscroll_page_size, self.yscroll_max)
                 self._scroll_y()
-            self._draw()
+            self._invalidate()
+        elif event.keysym == 'F12':
+            self._show_perf_overlay = not self._show_perf_overlay
+            self._invalidate()
         elif event.keysym == 'Prior':
             if event.state & 0x01 == 0x01:  # shift
                 if self._focused_cell is not None:
@@ -175,7 +261,7 @@ class ViewerTabTable(ViewerTab):
                         self._focused_cell[0] + 1, self._focused_cell[1] + 1]
                 self.yscroll_item = max(self.yscroll_item - self.yscroll_page_size, 0)
                 self._scroll_y()
-            self._draw()
+            self._invalidate()
 
         if self._focused_cell is not None:
             next_cell = self._focused_cell.copy()
@@ -211,7 +297,20 @@ class ViewerTabTable(ViewerTab):
                     elif self._focused_cell[1] < self.yscroll_item:
                         self.yscroll_item = self._focused_cell[1]
                         self._scroll_y()
-                self._draw()
+                self._invalidate()
+
+    def _focus_cell(self, i_column, i_row):
+        """Focuses and selects a cell. If it is not visible, the table is scrolled so that it is in the middle."""
+        self._focused_cell = [i_column, i_row]
+        self.old_mouse_press_start = self._focused_cell
+        self._selection = [i_column, i_row, i_column + 1, i_row + 1]
+        if not (self.xscroll_item <= i_column < self.xscroll_item + max(self.xscroll_page_size, 1)):
+            self.xscroll_item = clip(i_column - max(self.xscroll_page_size, 0) // 2, 0, self.xscroll_max)
+            self._scroll_x()
+        if not (self.yscroll_item <= i_row < self.yscroll_item + max(self.yscroll_page_size, 1)):
+            self.yscroll_item = clip(i_row - max(self.yscroll_page_size, 0) // 2, 0, self.yscroll_max)
+            self._scroll_y()
+        self._invalidate()
 
     def _calc_hit_cell(self, mouse_x, mouse_y):
         # Returns None, None if nothing was hit.
@@ -219,8 +318,8 @@ class ViewerTabTable(ViewerTab):
         # Returns column_index, -1 if a column was clicked.
         # Returns column_index, row_index if an ordinary cell was clicked.
 
-        hit_x = (mouse_x - self.row_heading_width) // self.cell_width + self.xscroll_item
-        hit_y = (mouse_y - self.cell_height) // self.cell_height + self.yscroll_item
+        hit_x = self._hit_column(mouse_x)
+        hit_y = int((mouse_y - self.cell_height) // self.cell_height) + self.yscroll_item
 
         if mouse_x < self.row_heading_width:
             if mouse_y < self.cell_height:
@@ -254,18 +353,81 @@ class ViewerTabTable(ViewerTab):
         else:
             self.yscroll_item = clip(self.yscroll_item + delta * 3, 0, self.yscroll_max)
             self._scroll_y()
-        self._draw()
+        self._invalidate()
 
     def on_destroy(self):
         """
         This method is called by Viewer when the tab is closed by the user.
         """
+        if self._draw_id is not None:
+            manager.get_or_create_root().after_cancel(self._draw_id)
+            self._draw_id = None
         self.viewer.unregister(self)
 
+    def _on_mouse_press(self, event):
+        if (self._selection is not None) and (event.state & 0x01 == 0x01):  # shift pressed
+            self.mouse_press_start = self.old_mouse_press_start  # if we start selecting a rectangle by moving the holded mouse to the right, then release the mouse button, and then press shift on a point left to the rectangle, the start point is needed because we do correct the actual selection rectangle so that end > start
+            if self.mouse_press_start is not None:
+                self._adjust_selection(event)
+        else:
+            self.mouse_press_start = None
+            hit_x, hit_y = self._calc_hit_cell(event.x, event.y)
+
+            if hit_x is None:
+                self._selection = None
+                self._focused_cell = None
+            elif (hit_x == -1) and (hit_y == -1):
+                self._selection = [0, 0, self.xscroll_items, self.yscroll_items]
+            elif hit_x == -1:
+                self._selection = [0, hit_y, self.xscroll_items, hit_y + 1]
+                self._focused_cell = [0, hit_y]
+                self.mouse_press_start = [-1, hit_y]
+            elif hit_y == -1:
+                self._selection = [hit_x, 0, hit_x + 1, self.yscroll_items]
+                self._focused_cell = [hit_x, 0]
+                self.mouse_press_start = [hit_x, -1]
+            else:
+                self._selection = [hit_x, hit_y, hit_x + 1, hit_y + 1]
+                self._focused_cell = [hit_x, hit_y]
+                self.mouse_press_start = [hit_x, hit_y]
+
+        self._invalidate()
+
+    def _on_mouse_release(self, event):
+        self.old_mouse_press_start = self.mouse_press_start
+        self.mouse_press_start = None
+
+    def _on_mouse_motion(self, event):
+        if self.mouse_press_start is not None:
+            current_time = time.time()
+            if self.last_autoscroll_time < current_time - self.autoscroll_delay:
+                if self.mouse_press_start[0] != -1:
+                    if event.x < self.row_heading_width:
+                        self.xscroll_item = max(self.xscroll_item - 1, 0)
+                        self._scroll_x()
+                        self.last_autoscroll_time = current_time
+                    elif event.x > self._column_x(self.xscroll_item + self.xscroll_page_size):
+                        self.xscroll_item = min(self.xscroll_item + 1, self.xscroll_max)
+                        self._scroll_x()
+                        self.last_autoscroll_time = current_time
+
+                if self.mouse_press_start[1] != -1:
+                    if event.y < self.cell_height:
+                        self.yscroll_item = max(self.yscroll_item - 1, 0)
+                        self._scroll_y()
+                        self.last_autoscroll_time = current_time
+                    elif event.y > self.cell_height + self.yscroll_page_size * self.cell_height:
+                        self.yscroll_item = min(self.yscroll_item + 1, self.yscroll_max)
+                        self._scroll_y()
+                        self.last_autoscroll_time = current_time
+
+            self._adjust_selection(event)
+            self._invalidate()
+
     def _adjust_selection(self, event):
         """Adjusts self._focused_cell and self._selection if the mouse was released after starting to select something."""
-        hit_x = (event.x - self.row_heading_width) // self.cell_width + self.xscroll_item
-        hit_y = (event.y - self.cell_height) // self.cell_height + self.yscroll_item
+        hit_x = self._hit_column(event.x)
+        hit_y = int((event.y - self.cell_height) // self.cell_height) + self.yscroll_item
 
         if self.mouse_press_start[1] == -1:  # full column selected
             self._focused_cell = [clip(hit_x, 0, self.xscroll_items - 1), 0]
@@ -284,71 +446,226 @@ class ViewerTabTable(ViewerTab):
             max(selection_start[1], self._focused_cell[1]) + 1,
         ]
 
-    def _draw(self):
-        self.canvas1.delete('all')
+    def _create_canvas_items(self):
+        """Creates the canvas items that are reused by every _draw call.
+
+        The items are created in drawing order so that the canvas stacking order is correct. Cell texts come from a pool
+        (see _draw_text) that is resized in _resize_text_pool.
+        """
+        self._item_states = {}  # item -> [coords, options] as last sent to Tk, used to skip redundant Tk calls
+        self._column_heading_item = self.canvas1.create_rectangle(0, 0, 0, 0, fill=self.heading_color, width=0)
+        self._row_heading_item = self.canvas1.create_rectangle(0, 0, 0, 0, fill=self.heading_color, width=0)
+        self._row_selection_item = self.canvas1.create_rectangle(0, 0, 0, 0, width=0, fill=self.selection_heading_color, state='hidden')
+        self._selection_item = self.canvas1.create_rectangle(0, 0, 0, 0, width=0, fill=self.selection_color, state='hidden')
+        self._column_selection_item = self.canvas1.create_rectangle(0, 0, 0, 0, width=0, fill=self.selection_heading_color, state='hidden')
+        self._focused_cell_item = self.canvas1.create_rectangle(0, 0, 0, 0, width=0, fill=self.background_color, state='hidden')
+        self._vertical_lines_item = self.canvas1.create_line(0, 0, 0, 0, fill=self.cell_outline_color, state='hidden')
+        self._horizontal_lines_item = self.canvas1.create_line(0, 0, 0, 0, fill=self.cell_outline_color, state='hidden')
+        self._selection_border_items = [
+            self.canvas1.create_line(0, 0, 0, 0, width=self.selection_border_width, fill=self.selection_border_color,
+                state='hidden', tags='selection_border')
+            for _ in range(4)  # left, right, top, bottom
+        ]
+        self._perf_overlay_background_item = self.canvas1.create_rectangle(0, 0, 0, 0, fill='#ffffcc', outline='#888888',
+            state='hidden', tags='perf_overlay')
+        self._perf_overlay_item = self.canvas1.create_text(0, 0, anchor='ne', font='TkFixedFont', state='hidden',
+            tags='perf_overlay')
+        self._count_perf('items_created', len(self.canvas1.find_all()))
+        for item in self.canvas1.find_all():
+            self._item_states[item] = [None, {'state': self.canvas1.itemcget(item, 'state')}]
+
+        self._text_items = []
+        self._num_used_text_items = 0
+
+    def _update_item(self, item, coords=None, **options):
+        """Moves and reconfigures a reused canvas item. Only the coordinates and options that changed since the last
+        call are sent to Tk."""
+        state = self._item_states[item]
+        if (coords is not None) and (coords != state[0]):
+            self.canvas1.coords(item, coords)
+            state[0] = coords
+            self._profiler.count('item_updates')
+        old_options = state[1]
+        changed_options = {key: value for key, value in options.items() if old_options.get(key, None) != value}
+        if len(changed_options) > 0:
+            self.canvas1.itemconfigure(item, **changed_options)
+            old_options.update(changed_options)
+            self._profiler.count('item_updates')
+
+    def _num_text_items_needed(self):
+        """Number of text items needed to draw a frame. Can be overridden by subclasses that draw fewer texts."""
+        return max(self.xscroll_page_size + 2, 0) * max(self.yscroll_page_size + 2, 0)
+
+    def _resize_text_pool(self):
+        """Grows or shrinks the pool of text items so that it covers all cells and headings of the viewport."""
+        num_needed = self._num_text_items_needed()
+        if num_needed > len(self._text_items):
+            for _ in range(num_needed - len(self._text_items)):
+                self._create_text_item()
+            self._raise_top_items()  # new texts were put on top
+        elif num_needed < len(self._text_items):
+            for item in self._text_items[num_needed:]:
+                self.canvas1.delete(item)
+                del self._item_states[item]
+            del self._text_items[num_needed:]
+
+    def _create_text_item(self):
+        item = self.canvas1.create_text(0, 0, text='', state='hidden')
+        self._text_items.append(item)
+        self._item_states[item] = [None, {'state': 'hidden'}]
+        self._count_perf('items_created')
+
+    def _raise_top_items(self):
+        self.canvas1.tag_raise('selection_border')
+        self.canvas1.tag_raise('perf_overlay')
+
+    def _count_perf(self, name, n=1):
+        """Adds n to a counter of perf_stats, e. g. formatted_values."""
+        self._profiler.count(name, n)
+
+    def perf_stats(self, reset=False):
+        """Get statistics about the recent draws of the tab, which help to find out why a tab is slow.
+
+        :param reset: if True, all timings and counters start from zero afterwards.
+        :return: dict with the keys
+                 frames: number of draws,
+                 phases: dict phase -> {'last_ms', 'mean_ms', 'max_ms'} over the last 100 draws, for the phases
+                 background (headings and selection), grid_lines, cells (_draw_cells), selection_border and total,
+                 and counters like items_created (canvas items), item_updates (changes sent to Tk) and formatted_values
+                 since the tab was created or reset. font_measurements is the number of text measurements done by Tk
+                 for all tabs; measurements are cached, see ManagerSingleton.measure_text.
+        """
+        stats = self._profiler.stats()
+        stats['font_measurements'] = manager.num_font_measurements
+        if reset:
+            self._profiler.reset()
+        return stats
+
+    def _draw_text(self, x, y, text, anchor, fill='black', activefill=''):
+        """Shows a text on the canvas by reusing the next item of the text pool. To be used in _draw_cells.
 
+        :return: the canvas item id showing the text.
+        """
+        if self._num_used_text_items == len(self._text_items):  # should not happen if _draw_cells stays in the viewport
+            self._create_text_item()
+            self._raise_top_items()
+        item = self._text_items[self._num_used_text_items]
+        self._num_used_text_items += 1
+        self._update_item(item, [x, y], text=text, anchor=anchor, fill=fill, activefill=activefill, font=self.cell_font,
+            state='normal')
+        return item
+
+    def _draw(self):
+        time_start = time.perf_counter()
         line_end_x = self.size_x - 1
         line_end_y = self.size_y - 1
-        self.canvas1.create_rectangle(0, 0, line_end_x, self.cell_height, fill=self.heading_color, width=0)
-        self.canvas1.create_rectangle(0, 0, self.row_heading_width, line_end_y, fill=self.heading_color, width=0)
+        self._update_item(self._column_heading_item, [0, 0, line_end_x, self.cell_height])
+        self._update_item(self._row_heading_item, [0, 0, self.row_heading_width, line_end_y])
 
         if self._selection is not None:
-            selection_x0 = self.row_heading_width + max(self._selection[0] - self.xscroll_item, 0) * self.cell_width
+            selection_x0 = self._column_x(max(self._selection[0], self.xscroll_item))
             selection_y0 = self.cell_height + max(self._selection[1] - self.yscroll_item, 0) * self.cell_height
-            selection_x1 = self.row_heading_width + max(self._selection[2] - self.xscroll_item, 0) * self.cell_width
+            selection_x1 = self._column_x(max(self._selection[2], self.xscroll_item))
             selection_y1 = self.cell_height + max(self._selection[3] - self.yscroll_item, 0) * self.cell_height
-            self.canvas1.create_rectangle(0, selection_y0, self.row_heading_width, selection_y1, width=0, fill=self.selection_heading_color)  # highlight row headings
-            self.canvas1.create_rectangle(selection_x0, selection_y0, selection_x1, selection_y1, width=0, fill=self.selection_color)  # highlight the selection in blue
+            self._update_item(self._row_selection_item, [0, selection_y0, self.row_heading_width, selection_y1], state='normal')  # highlight row headings
+            self._update_item(self._selection_item, [selection_x0, selection_y0, selection_x1, selection_y1], state='normal')  # highlight the selection in blue
             if self.highlight_selected_columns:
-                self.canvas1.create_rectangle(selection_x0, 0, selection_x1, self.cell_height, width=0, fill=self.selection_heading_color)  # highlight column headings
+                self._update_item(self._column_selection_item, [selection_x0, 0, selection_x1, self.cell_height], state='normal')  # highlight column headings
+            else:
+                self._update_item(self._column_selection_item, state='hidden')
+        else:
+            self._update_item(self._row_selection_item, state='hidden')
+            self._update_item(self._selection_item, state='hidden')
+            self._update_item(self._column_selection_item, state='hidden')
 
         if (self._focused_cell is not None) and (self._focused_cell[0] >= self.xscroll_item) and (self._focused_cell[1] >= self.yscroll_item):
-            focused_x0 = self.row_heading_width + (self._focused_cell[0] - self.xscroll_item) * self.cell_width
+            focused_x0 = self._column_x(self._focused_cell[0])
             focused_y0 = self.cell_height + (self._focused_cell[1] - self.yscroll_item) * self.cell_height
+            focused_x1 = focused_x0 + self._column_width(self._focused_cell[0])
             # re-fill the focused cell with white color so that it is better distinguishable from the selection
-            self.canvas1.create_rectangle(focused_x0, focused_y0, focused_x0 + self.cell_width, focused_y0 + self.cell_height, width=0, fill=self.background_color)
+            self._update_item(self._focused_cell_item, [focused_x0, focused_y0, focused_x1, focused_y0 + self.cell_height], state='normal')
+        else:
+            self._update_item(self._focused_cell_item, state='hidden')
+
+        time_background = time.perf_counter()
 
         # vertical lines
         num_vertical_lines = min(self.xscroll_page_size, self.xscroll_items - self.xscroll_item) + 2
-        table_lines = np.empty(num_vertical_lines * 4)
-        table_lines[::4] = self.row_heading_width
-        table_lines[1::8] = 0
-        table_lines[2::4] = self.row_heading_width
-        table_lines[3::8] = line_end_y
+        if not self.show_grid_lines:
+            num_vertical_lines = 0
+        table_lines = np.empty(max(num_vertical_lines, 0) * 4)
         if len(table_lines) > 4:
-            table_lines[4::4] = self.row_heading_width + np.arange(num_vertical_lines - 1) * self.cell_width
+            if self.column_widths is None:
+                line_xs = self.row_heading_width + np.arange(num_vertical_lines - 1) * self.cell_width
+            else:
+                line_xs = self.column_widths.offsets(self.xscroll_item, self.xscroll_item + num_vertical_lines - 2)
+                line_xs = self.row_heading_width + (line_xs - line_xs[0])
+            table_lines[::4] = self.row_heading_width
+            table_lines[1::8] = 0
+            table_lines[2::4] = self.row_heading_width
+            table_lines[3::8] = line_end_y
+            table_lines[4::4] = line_xs
             table_lines[5::8] = line_end_y
-            table_lines[6::4] = self.row_heading_width + np.arange(num_vertical_lines - 1) * self.cell_width
+            table_lines[6::4] = line_xs
             table_lines[7::8] = 0
-            self.canvas1.create_line(table_lines.tolist(), fill=self.cell_outline_color)
+            self._update_item(self._vertical_lines_item, table_lines.tolist(), state='normal')
+        else:
+            self._update_item(self._vertical_lines_item, state='hidden')
 
         # horizontal lines
         num_horizontal_lines = min(self.yscroll_page_size, self.yscroll_items - self.yscroll_item) + 2
-        table_lines = np.empty(num_horizontal_lines * 4)
-        table_lines[::8] = 0
-        table_lines[1::4] = np.arange(num_horizontal_lines) * self.cell_height
-        table_lines[2::8] = line_end_x
-        table_lines[3::4] = np.arange(num_horizontal_lines) * self.cell_height
+        if not self.show_grid_lines:
+            num_horizontal_lines = 0
+        table_lines = np.empty(max(num_horizontal_lines, 0) * 4)
         if len(table_lines) > 4:
+            table_lines[::8] = 0
+            table_lines[1::4] = np.arange(num_horizontal_lines) * self.cell_height
+            table_lines[2::8] = line_end_x
+            table_lines[3::4] = np.arange(num_horizontal_lines) * self.cell_height
             table_lines[4::8] = line_end_x
             table_lines[6::8] = 0
-            self.canvas1.create_line(table_lines.tolist(), fill=self.cell_outline_color)
+            self._update_item(self._horizontal_lines_item, table_lines.tolist(), state='normal')
+        else:
+            self._update_item(self._horizontal_lines_item, state='hidden')
+
+        time_grid_lines = time.perf_counter()
 
+        self._num_used_text_items = 0
         self._draw_cells()
+        for item in self._text_items[self._num_used_text_items:]:  # hide the texts that are not needed in this frame
+            self._update_item(item, state='hidden')
+        time_cells = time.perf_counter()
 
+        border_lines = [None] * 4
         if self._selection is not None:
             if (selection_x0 != selection_x1) and (selection_y0 != selection_y1):
                 if self._selection[0] >= self.xscroll_item:
-                    self.canvas1.create_line(selection_x0, selection_y0, selection_x0, selection_y1,
-                        width=self.selection_border_width, fill=self.selection_border_color
-                    )  # left border line
-                self.canvas1.create_line(selection_x1, selection_y0, selection_x1, selection_y1,
-                    width=self.selection_border_width, fill=self.selection_border_color
-                )  # right border line
+                    border_lines[0] = [selection_x0, selection_y0, selection_x0, selection_y1]
+                border_lines[1] = [selection_x1, selection_y0, selection_x1, selection_y1]
                 if self._selection[1] >= self.yscroll_item:
-                    self.canvas1.create_line(selection_x0, selection_y0, selection_x1, selection_y0,
-                        width=self.selection_border_width, fill=self.selection_border_color,
-                    )  # top border line
-                self.canvas1.create_line(selection_x0, selection_y1, selection_x1, selection_y1,
-                    width=self.selection_border_width, fill=self.selection_border_color,
-                )  # bottom border line
+                    border_lines[2] = [selection_x0, selection_y0, selection_x1, selection_y0]
+                border_lines[3] = [selection_x0, selection_y1, selection_x1, selection_y1]
+        for item, coords in zip(self._selection_border_items, border_lines):
+            if coords is None:
+                self._update_item(item, state='hidden')
+            else:
+                self._update_item(item, coords, state='normal')
+        time_end = time.perf_counter()
+
+        self._profiler.add_frame({
+            'background': time_background - time_start,
+            'grid_lines': time_grid_lines - time_background,
+            'cells': time_cells - time_grid_lines,
+            'selection_border': time_end - time_cells,
+            'total': time_end - time_start,
+        })
+        self._draw_perf_overlay()
+
+    def _draw_perf_overlay(self):
+        if not self._show_perf_overlay:
+            self._update_item(self._perf_overlay_item, state='hidden')
+            self._update_item(self._perf_overlay_background_item, state='hidden')
+            return
+        self._update_item(self._perf_overlay_item, [self.size_x - 8, 8], text=format_perf_stats(self.perf_stats()), state='normal')
+        x0, y0, x1, y1 = self.canvas1.bbox(self._perf_overlay_item)
+        self._update_item(self._perf_overlay_background_item, [x0 - 4, y0 - 4, x1 + 4, y1 + 4], state='normal')
@@ -1,15 +1,55 @@
 
+import math
+import platform
+import numpy as np
 import tkinter as tk
 
 from ._tab import ViewerTab
+from ._utils import clip
+
+index_chunk_size = 1 << 22  # characters per chunk when building the line index
+max_line_length = 10000  # longer lines are cut, because Tk gets slow with very long lines
+truncated_marker = " [...]"
+
+
+def line_starts(text, chunk_size=index_chunk_size, progress=None):
+    """Returns the offsets of the first characters of all lines of text as an int64 array.
+
+    The text is scanned chunk by chunk, so that the temporary memory does not grow with the size of the text.
+
+    :param progress: optional function that is called with the processed fraction (0..1) after each chunk.
+    """
+    newline_positions = []
+    for chunk_start in range(0, len(text), chunk_size):
+        chunk = text[chunk_start:chunk_start + chunk_size]
+        try:
+            codes = np.frombuffer(chunk.encode('ascii'), dtype=np.uint8)  # one byte per character
+        except UnicodeEncodeError:
+            codes = np.frombuffer(chunk.encode('utf-32-le'), dtype=np.uint32)
+        newline_positions.append(np.flatnonzero(codes == ord('\n')) + (chunk_start + 1))
+        if progress is not None:
+            progress(min(chunk_start + chunk_size, len(text)) / len(text))
+    return np.concatenate([np.zeros(1, dtype=np.int64)] + newline_positions).astype(np.int64)
+
 
 class ViewerTabText(ViewerTab):
     """
     Viewer tab that displays the str(.) representation of an object.
+
+    Only the visible lines and a margin around them are loaded into the text widget, so big strings open quickly.
     """
-    def __init__(self, viewer, object, title=None, font_size=None):
+    def __init__(self, viewer, object, title=None, font_size=None, prepared=None):
+        """Creates a new tab in the specified viewer. Please use viewer.view instead because this selects the appropriate Tab subclass.
+
+        :param prepared: result of prepare(object) if it was already run on a worker thread.
+        """
         self.viewer = viewer
         self.object = object
+        if prepared is None:
+            prepared = self.prepare(object)
+        self.text = prepared['text']
+        self._line_starts = prepared['line_starts']
+        self.num_lines = len(self._line_starts)
 
         ViewerTab.__init__(self)
 
@@ -22,30 +62,125 @@ class ViewerTabText(ViewerTab):
 
         self.xscrollbar = tk.Scrollbar(self.top_frame, orient=tk.HORIZONTAL)
         self.xscrollbar.grid(column=0, rows=1, sticky="ew")
-        self.yscrollbar = tk.Scrollbar(f1a, orient=tk.VERTICAL)
+        self.yscrollbar = tk.Scrollbar(f1a, orient=tk.VERTICAL, command=self._on_y_scroll)
         self.yscrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         self._calc_font(font_size)
-        self.text_display = tk.Text(f1a, width=20, wrap=tk.NONE, xscrollcommand=self.xscrollbar.set, yscrollcommand=self.yscrollbar.set, font=self.cell_font)
+        self.text_display = tk.Text(f1a, width=20, wrap=tk.NONE, xscrollcommand=self.xscrollbar.set, font=self.cell_font)
         self.text_display.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.text_display.insert('1.0', str(self.object))
         self.text_display.configure(state='disabled')  # TODO allow the user to select and copy text
-
         self.xscrollbar.config(command=self.text_display.xview)
-        self.yscrollbar.config(command=self.text_display.yview)
+
+        self.yscroll_item = 0  # first visible line
+        self.yscroll_page_size = 1
+        self.yscroll_max = 0
+        self._loaded_lines = (0, 0)  # range of the lines that are loaded into the text widget
+        self.text_display.bind("<Configure>", self._on_resize)
+        if platform.system() == "Linux":
+            self.text_display.bind("<Button-4>", lambda event: self._on_mouse_wheel(-1))
+            self.text_display.bind("<Button-5>", lambda event: self._on_mouse_wheel(1))
+        elif platform.system() == "Windows":
+            self.text_display.bind("<MouseWheel>", lambda event: self._on_mouse_wheel(-event.delta // 120))
+        else:  # Mac
+            self.text_display.bind("<MouseWheel>", lambda event: self._on_mouse_wheel(event.delta))
+        self._show_lines()
 
         if title is None:
             if isinstance(object, str):
-                num_lines = object.count('\n') + 1
-                if num_lines > 1:
-                    title = f'{num_lines}-line string'
+                if self.num_lines > 1:
+                    title = f'{self.num_lines}-line string'
                 else:
-                    title = f'{len(str)} string'
+                    title = f'{len(object)} string'
             else:
                 title = type(object).__name__
 
         self.viewer.register(self, self.top_frame, title)
 
+    @staticmethod
+    def prepare(object, progress=None):
+        """Converts the object to a string and indexes its lines, which can take long for big objects. This can run on
+        a worker thread.
+
+        :return: a dict that can be passed to __init__ as prepared.
+        """
+        text = str(object)
+        return {'text': text, 'line_starts': line_starts(text, progress=progress)}
+
+    def _line_range(self, i_line):
+        start = int(self._line_starts[i_line])
+        end = int(self._line_starts[i_line + 1]) - 1 if i_line + 1 < self.num_lines else len(self.text)
+        return start, end
+
+    def get_line(self, i_line):
+        """Returns line i_line of the text without the line break."""
+        start, end = self._line_range(i_line)
+        return self.text[start:end]
+
+    def _display_line(self, i_line):
+        start, end = self._line_range(i_line)
+        if end - start > max_line_length:
+            return self.text[start:start + max_line_length] + truncated_marker
+        return self.text[start:end]
+
+    def _show_lines(self):
+        """Scrolls the text widget so that line yscroll_item is at the top. The loaded lines are only replaced if
+        the visible lines are not loaded yet; then the visible lines and a margin of one page above and below are
+        loaded."""
+        visible_end = min(self.yscroll_item + self.yscroll_page_size + 1, self.num_lines)
+        if (self.yscroll_item < self._loaded_lines[0]) or (visible_end > self._loaded_lines[1]):
+            load_start = max(self.yscroll_item - self.yscroll_page_size, 0)
+            load_end = min(visible_end + self.yscroll_page_size, self.num_lines)
+            self.text_display.configure(state='normal')
+            self.text_display.delete('1.0', tk.END)
+            self.text_display.insert('1.0', '\n'.join(self._display_line(i_line) for i_line in range(load_start, load_end)))
+            self.text_display.configure(state='disabled')
+            self._loaded_lines = (load_start, load_end)
+        self.text_display.yview(self.yscroll_item - self._loaded_lines[0])  # an integer scrolls to that line
+        if self.num_lines == 0:
+            self.yscrollbar.set(0, 1)
+        else:
+            self.yscrollbar.set(self.yscroll_item / self.num_lines, min((self.yscroll_item + self.yscroll_page_size) / self.num_lines, 1))
+
+    def _scroll_to(self, line):
+        line = clip(line, 0, self.yscroll_max)
+        if line != self.yscroll_item:
+            self.yscroll_item = line
+            self._show_lines()
+
+    def _on_resize(self, event):
+        self.yscroll_page_size = max(event.height // self.cell_font.metrics('linespace'), 1)
+        self.yscroll_max = max(self.num_lines - self.yscroll_page_size, 0)
+        self.yscroll_item = min(self.yscroll_item, self.yscroll_max)
+        self._show_lines()
+
+    def _on_y_scroll(self, *args):
+        if args[0] == 'scroll':
+            if args[2] == 'units':
+                self._scroll_to(self.yscroll_item + int(args[1]))
+            elif args[2] == 'pages':
+                self._scroll_to(self.yscroll_item + int(args[1]) * self.yscroll_page_size)
+        elif args[0] == 'moveto':
+            desired_fraction = float(args[1])  # desired scroll position from 0 to 1
+            self._scroll_to(math.floor(desired_fraction * self.num_lines + 0.5))
+
+    def _on_mouse_wheel(self, delta):
+        self._scroll_to(self.yscroll_item + delta * 3)
+        return "break"  # the text widget must not scroll by itself
+
+    def _on_key(self, event):
+        if event.keysym == 'Next':
+            self._scroll_to(self.yscroll_item + self.yscroll_page_size)
+        elif event.keysym == 'Prior':
+            self._scroll_to(self.yscroll_item - self.yscroll_page_size)
+        elif event.keysym == 'Down':
+            self._scroll_to(self.yscroll_item + 1)
+        elif event.keysym == 'Up':
+            self._scroll_to(self.yscroll_item - 1)
+        elif event.keysym == 'Home':
+            self._scroll_to(0)
+        elif event.keysym == 'End':
+            self._scroll_to(self.yscroll_max)
+
     def on_destroy(self):
         """Internal method called by the viewer."""
         self.viewer.unregister(self)
@@ -1,13 +1,25 @@
 
+import asyncio
+import functools
+import os
+import _tkinter
 import tkinter as tk
 import numpy as np
 import time
 from ._manager import manager
-from ._tab_numpy import ViewerTabNumpy, matches_tab_numpy
+from ._tab_numpy import ViewerTabNumpy, matches_tab_numpy, is_npy_file
+from ._tab_dataframe import ViewerTabDataFrame, matches_tab_dataframe
+from ._tab_sparse import ViewerTabSparse, matches_tab_sparse
 from ._tab_struct import ViewerTabStruct, matches_tab_struct
 from ._tab_text import ViewerTabText
+from ._tab_loading import ViewerTabLoading, is_heavy
 from ._custom_notebook import CustomNotebook
 
+# how often show_async looks for new events, in seconds. The interval grows from min to max while the windows are idle.
+min_pump_interval = 0.005
+max_pump_interval = 0.05
+pyplot_timer_interval = 10  # milliseconds, see show_with_pyplot
+
 class Viewer():
     """Class representing a matrix viewer window."""
 
@@ -43,6 +55,8 @@ class Viewer():
                 print('Error: double destroyed', self.window)
 
     def _on_q_pressed(self, event):
+        if event.widget.winfo_class() in ['Entry', 'Spinbox', 'TEntry', 'TCombobox']:
+            return  # the user is typing into an input field of a tab
         if event.char == 'q':
             self.window.destroy()  # this will also call self._on_destroy
         else:
@@ -89,20 +103,80 @@ class Viewer():
         if len(self.tabs) == 0:
             self.window.destroy()  # close if all tabs were closed by the user
 
-    def view(self, object, tab_title=None, font_size=None, formatter=None):
+    def _replace_tab(self, old_tab, new_tab):
+        """
+        Moves new_tab to the position of old_tab and removes old_tab. Used for tabs that were loaded in the background.
+        """
+        was_selected = self.paned.select() == str(old_tab.top_frame)
+        self.paned.insert(self.paned.index(old_tab.top_frame), new_tab.top_frame)
+        self.paned.forget(old_tab.top_frame)
+        self.tabs.pop(list(zip(*self.tabs))[0].index(old_tab))
+        old_tab.top_frame.destroy()
+        self.tab_frames = self.paned.tabs()
+        if was_selected:
+            self.paned.select(new_tab.top_frame)
+
+    def view(self, object, tab_title=None, font_size=None, formatter=None, snapshot=None, background=False):
         """Adds a new tab that visualizes the specified object.
 
+        :param object: The object to visualize. The path of a .npy file is opened memory-mapped, so that only the
+                       visible part of the file is read. pandas DataFrames and Series are shown column by column
+                       without converting them to a numpy array, and scipy.sparse matrices without densifying them.
         :param tab_title: The string show in the tab header.
         :param font_size: The font size used in the cells and the row / column headings.
         :param formatter: A function which converts the cells to string. Currently only used for
-                          Matrix / Vector viewer.
+                          Matrix / Vector viewer and sparse matrices.
+        :param snapshot: How numpy arrays and pytorch tensors are protected against later modifications. None means
+                         'view' for memory-mapped arrays (np.memmap and .npy files) and 'copy' otherwise.
+
+                         * 'copy': the array is copied, which needs as much additional memory as the array itself.
+                         * 'view': no additional memory. The caller promises not to modify the array while it is shown,
+                           otherwise the tab shows a mix of old and new values.
+                         * 'lazy': blocks of 256 x 256 cells are copied when they are shown for the first time, so the
+                           additional memory grows with the area that was looked at. Modifications are visible in
+                           blocks that were not shown yet.
+        :param background: If True, the tab is prepared on a worker thread while a placeholder tab with a progress bar
+                           is shown, so that the windows stay responsive. The placeholder (a ViewerTabLoading) is
+                           returned; the real tab is available as its attribute tab after loading. If None, this is
+                           done for big objects only. The snapshot of numpy arrays is always taken before view returns.
         """
+        if is_npy_file(object):
+            if tab_title is None:
+                tab_title = os.path.basename(object)
+            object = np.load(object, mmap_mode='r')
+
+        if background is None:
+            background = is_heavy(object)
+
+        prepare_update = None
         if matches_tab_numpy(object):
-            return ViewerTabNumpy(self, object, tab_title, font_size, formatter)
+            create = functools.partial(ViewerTabNumpy, self, object, tab_title, font_size, formatter, snapshot)
+            prepare = functools.partial(ViewerTabNumpy.prepare, object, formatter, snapshot)
+            if background:
+                # the caller may modify the array as soon as view (or update) returns, so the snapshots cannot wait
+                # for the worker
+                prepared = prepare()
+                prepare = lambda progress: prepared
+                prepare_update = functools.partial(ViewerTabNumpy.prepare_update, num_dims=prepared['num_dims'],
+                    snapshot=prepared['snapshot'])
+        elif matches_tab_dataframe(object):
+            create = functools.partial(ViewerTabDataFrame, self, object, tab_title, font_size)
+            prepare = functools.partial(ViewerTabDataFrame.prepare, object)
+        elif matches_tab_sparse(object):
+            create = functools.partial(ViewerTabSparse, self, object, tab_title, font_size, formatter)
+            prepare = functools.partial(ViewerTabSparse.prepare, object, formatter)
         elif matches_tab_struct(object):
-            return ViewerTabStruct(self, object, tab_title, font_size)
+            create = functools.partial(ViewerTabStruct, self, object, tab_title, font_size)
+            prepare = functools.partial(ViewerTabStruct.prepare, object)
+        else:
+            create = functools.partial(ViewerTabText, self, object, tab_title, font_size)
+            prepare = functools.partial(ViewerTabText.prepare, object)
+
+        if background:
+            return ViewerTabLoading(self, tab_title or type(object).__name__, prepare, lambda prepared: create(prepared=prepared),
+                prepare_update)
         else:
-            return ViewerTabText(self, object, tab_title, font_size)
+            return create()
 
 
 def viewer(title="Matrix Viewer"):
@@ -114,21 +188,23 @@ def viewer(title="Matrix Viewer"):
     return Viewer(title)
 
 
-def view(object, tab_title=None, font_size=None, formatter=None):
+def view(object, tab_title=None, font_size=None, formatter=None, snapshot=None, background=False):
     """Creates a new tab in the current window, which shows the object.
     Creates a new window if there are no opened windows.
 
-    :param object: the object that is to be visualized.
+    :param object: the object that is to be visualized, or the path of a .npy file.
     :param tab_title: The string show in the tab header.
     :param font_size: The font size used in the cells and the row / column headings.
     :param formatter: A function which converts the cells to string. Currently only used for
                         Matrix / Vector viewer.
+    :param snapshot: 'copy', 'view', 'lazy' or None, see Viewer.view.
+    :param background: Whether to prepare the tab on a worker thread, see Viewer.view.
     :return: The newly created viewer tab.
     """
     viewer = manager.last_viewer
     if viewer is None:
         viewer = Viewer()
-    return viewer.view(object, tab_title, font_size, formatter)
+    return viewer.view(object, tab_title, font_size, formatter, snapshot, background)
 
 
 def show(block=True):
@@ -149,13 +225,71 @@ def pause(timeout):
         time.sleep(timeout)
 
 
+async def show_async():
+    """Like show, but for programs that use asyncio: handles the events of the windows until all windows are closed,
+    while other asyncio tasks keep running. To keep the windows responsive in the background, start it as a task::
+
+        asyncio.create_task(matrix_viewer.show_async())
+
+    Pending events are handled without waiting; between two checks, control goes back to the asyncio event loop. The
+    check interval is short after events were handled and grows while the windows are idle, so idle windows need
+    almost no CPU.
+    """
+    interval = min_pump_interval
+    while len(manager.registered_viewers) > 0:
+        if manager.process_events() > 0:
+            interval = min_pump_interval
+        else:
+            interval = min(interval * 2, max_pump_interval)
+        await asyncio.sleep(interval)
+
+
+def _ipython_inputhook(context):
+    """prompt_toolkit input hook: runs the event loop until the user types something or all windows are closed."""
+    if len(manager.registered_viewers) == 0:
+        return  # nothing to do, prompt_toolkit waits for the input itself
+    root = manager.get_or_create_root()
+    try:
+        # Tk waits for the events of the windows and the terminal at the same time
+        root.tk.createfilehandler(context.fileno(), _tkinter.READABLE, lambda *args: manager.stop_event_loop())
+    except (AttributeError, NotImplementedError, tk.TclError):  # not available on windows
+        while (len(manager.registered_viewers) > 0) and not context.input_is_ready():
+            if manager.process_events() == 0:
+                time.sleep(0.01)
+        return
+    try:
+        manager.show()  # returns when the terminal has input or the last window was closed
+    finally:
+        root.tk.deletefilehandler(context.fileno())
+
+
+def enable_ipython(shell=None):
+    """Keeps the windows responsive in IPython while it waits for input, so that neither show nor pause is needed.
+    In the terminal, the event loop of the windows runs until a key is pressed; in a notebook kernel, the Tk event
+    loop integration of the kernel is enabled (like %gui tk).
+
+    :param shell: the IPython shell. By default, the one that is running.
+    """
+    if shell is None:
+        import IPython
+        shell = IPython.get_ipython()
+        if shell is None:
+            raise RuntimeError("enable_ipython can only be called from IPython")
+    if type(shell).__name__ == 'TerminalInteractiveShell':
+        from IPython.terminal import pt_inputhooks
+        pt_inputhooks.register('matrix_viewer', _ipython_inputhook)
+        shell.enable_gui('matrix_viewer')
+    else:
+        shell.enable_gui('tk')
+
+
 def show_with_pyplot():
     """This function should be used instead of show when you are also using matplotlib.pyplot.
     It concurrently runs the event loop for pyplot and matrix_viewer. It will run until all numpy and
     matrix_viewer windows were closed by the user.
 
-    Note that unfortunately, pyplot and matrix_viewer appear to be slightly laggy if you are using a
-    different pyplot backend than tkinter.
+    If pyplot does not use tkinter, the event loop of its GUI toolkit runs and handles the pending events of the
+    matrix_viewer windows from a timer every few milliseconds.
     """
     import matplotlib
     import matplotlib.pyplot
@@ -167,9 +301,16 @@ def show_with_pyplot():
         if len(manager.registered_viewers) > 0:  # pyplot.show() returns if all pyplot figures were closed
             show()  # Therefore, we have to continue running the event loop until all matrix_viewer windows are closed, too
     else:
-        matplotlib.pyplot.show(block=False)
-        # this implementation is a bit laggy, eventually there is a better one
-        while (len(manager.registered_viewers) > 0) or (len(matplotlib.pyplot.get_fignums()) > 0):
-            # run both event loops in sequence, fast enough for acceptable delay
-            pause(0.02)
-            matplotlib.pyplot.pause(0.02)
+        figure_numbers = matplotlib.pyplot.get_fignums()
+        if len(figure_numbers) > 0:
+            def process_events():
+                manager.process_events()  # no return value, pyplot removes timer callbacks that return 0
+
+            timer = matplotlib.pyplot.figure(figure_numbers[0]).canvas.new_timer(interval=pyplot_timer_interval)
+            timer.add_callback(process_events)
+            timer.start()
+            try:
+                matplotlib.pyplot.show()  # returns when all pyplot figures were closed
+            finally:
+                timer.stop()
+        show()  # until all matrix_viewer windows are closed, too
@@ -0,0 +1,243 @@
+# Rendering benchmarks for the tabs. Not collected by pytest because it needs a display; on a headless machine, run it
+# under Xvfb:
+#
+#     xvfb-run -a python tests/benchmark_rendering.py --output benchmark.json
+#
+# The results are written as JSON. To compare two commits, run the benchmark on both and then
+#
+#     python tests/benchmark_rendering.py --compare old.json new.json
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+sys.path.append(os.getcwd())  # to be able to include matrix_viewer
+
+import numpy as np
+import matrix_viewer
+from matrix_viewer._manager import manager
+
+array_shapes = [(100, 100), (2000, 2000), (100000, 20)]
+array_dtypes = ['int64', 'float64', 'complex128', 'bool']
+struct_lengths = [100, 10000]
+text_lines = [1000, 100000]
+font_sizes = [10, 20]
+viewport_sizes = [(500, 500), (1600, 1000)]
+num_frames = 50
+
+quick_array_shapes = [(100, 100), (2000, 2000)]
+quick_array_dtypes = ['int64', 'float64']
+quick_font_sizes = [16]
+quick_viewport_sizes = [(500, 500)]
+quick_num_frames = 10
+
+
+def make_array(shape, dtype):
+    rng = np.random.default_rng(0)
+    if dtype == 'bool':
+        return rng.random(shape) < 0.5
+    elif dtype == 'int64':
+        return rng.integers(-1000000, 1000000, size=shape)
+    elif dtype == 'complex128':
+        return rng.random(shape) + 1j * rng.random(shape)
+    else:
+        return rng.random(shape)
+
+
+def count_canvas_items(canvas, action):
+    """Runs action and returns how many canvas items it created. Tk assigns increasing ids, so a probe item created
+    before and after the action tells the number of new items, even if some were deleted again."""
+    probe = canvas.create_line(0, 0, 0, 0)
+    canvas.delete(probe)
+    action()
+    probe_after = canvas.create_line(0, 0, 0, 0)
+    canvas.delete(probe_after)
+    return probe_after - probe - 1
+
+
+def percentiles(values):
+    values = np.array(values) * 1000  # to milliseconds
+    if len(values) == 0:
+        return None
+    return {
+        'median': float(np.median(values)),
+        'p95': float(np.percentile(values, 95)),
+        'max': float(np.max(values)),
+    }
+
+
+def run_case(create, viewport_size, frames):
+    """Creates a tab in a fresh window with the given viewport size and measures it.
+
+    :param create: function(viewer) creating the tab.
+    """
+    root = manager.get_or_create_root()
+    result = {}
+
+    # time to first paint: creating the tab, laying out the window and the first draw
+    viewer = matrix_viewer.viewer()
+    viewer.window.geometry(f"{viewport_size[0]}x{viewport_size[1]}")
+    root.update()
+    gc.collect()
+    start = time.perf_counter()
+    tab = create(viewer)
+    root.update()
+    result['first_paint_ms'] = (time.perf_counter() - start) * 1000
+
+    if hasattr(tab, '_draw'):
+        for name, scroll_step in [('scroll_row', 1), ('scroll_page', max(tab.yscroll_page_size, 1))]:
+            frame_times = []
+            draw_times = []
+            items_created = []
+            for _ in range(frames):
+                tab.yscroll_item = (tab.yscroll_item + scroll_step) % (tab.yscroll_max + 1)
+                tab._scroll_y()
+                frame_start = time.perf_counter()
+                draw_time = []
+
+                def draw():
+                    draw_start = time.perf_counter()
+                    tab._draw()
+                    draw_time.append(time.perf_counter() - draw_start)
+                items_created.append(count_canvas_items(tab.canvas1, draw))
+                root.update_idletasks()  # let Tk redisplay the canvas
+                frame_times.append(time.perf_counter() - frame_start)
+                draw_times.append(draw_time[0])
+            result[name] = {
+                'draw_ms': percentiles(draw_times),
+                'frame_ms': percentiles(frame_times),
+                'items_created_per_frame': float(np.mean(items_created)),
+            }
+        result['canvas_items'] = len(tab.canvas1.find_all())
+    else:  # the text tab does not draw on a canvas
+        frame_times = []
+        for _ in range(frames):
+            frame_start = time.perf_counter()
+            tab._on_y_scroll('scroll', '1', 'units')
+            root.update_idletasks()
+            frame_times.append(time.perf_counter() - frame_start)
+        result['scroll_row'] = {'frame_ms': percentiles(frame_times)}
+    viewer.window.destroy()
+    root.update()
+
+    # peak memory, measured separately because tracing slows everything down
+    viewer = matrix_viewer.viewer()
+    viewer.window.geometry(f"{viewport_size[0]}x{viewport_size[1]}")
+    root.update()
+    gc.collect()
+    tracemalloc.start()
+    tab = create(viewer)
+    root.update()
+    result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    viewer.window.destroy()
+    root.update()
+    return result
+
+
+def benchmark_cases(quick):
+    """Yields (case description, create function) for all benchmark cases."""
+    shapes = quick_array_shapes if quick else array_shapes
+    dtypes = quick_array_dtypes if quick else array_dtypes
+    fonts = quick_font_sizes if quick else font_sizes
+    for shape in shapes:
+        for dtype in dtypes:
+            matrix = make_array(shape, dtype)
+            for font_size in fonts:
+                yield ({'tab': 'ViewerTabNumpy', 'shape': list(shape), 'dtype': dtype, 'font_size': font_size},
+                    lambda viewer, matrix=matrix, font_size=font_size: matrix_viewer.ViewerTabNumpy(viewer, matrix, font_size=font_size))
+
+    for length in struct_lengths[:1] if quick else struct_lengths:
+        struct = {f'key{i}': (i if i % 3 == 0 else f'value {i}' if i % 3 == 1 else np.zeros(3)) for i in range(length)}
+        for font_size in fonts:
+            yield ({'tab': 'ViewerTabStruct', 'length': length, 'font_size': font_size},
+                lambda viewer, struct=struct, font_size=font_size: matrix_viewer.ViewerTabStruct(viewer, struct, font_size=font_size))
+
+    for num_lines in text_lines[:1] if quick else text_lines:
+        text = '\n'.join(f'line {i}: ' + 'abc ' * (i % 30) for i in range(num_lines))
+        for font_size in fonts:
+            yield ({'tab': 'ViewerTabText', 'lines': num_lines, 'font_size': font_size},
+                lambda viewer, text=text, font_size=font_size: matrix_viewer.ViewerTabText(viewer, text, font_size=font_size))
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'tk': str(manager.get_or_create_root().tk.call('info', 'patchlevel')),
+        'platform': platform.platform(),
+        'dpi': manager.get_or_create_root().winfo_fpixels('1i'),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def run(quick, output):
+    viewports = quick_viewport_sizes if quick else viewport_sizes
+    frames = quick_num_frames if quick else num_frames
+    results = []
+    for case, create in benchmark_cases(quick):
+        for viewport_size in viewports:
+            viewport_case = dict(case, viewport=list(viewport_size))
+            print(json.dumps(viewport_case), file=sys.stderr)
+            results.append(dict(viewport_case, **run_case(create, viewport_size, frames)))
+
+    report = {'environment': environment(), 'results': results}
+    if output is None:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    else:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=1)
+
+
+def case_key(result):
+    return json.dumps({key: value for key, value in result.items() if key in
+        ['tab', 'shape', 'dtype', 'length', 'lines', 'font_size', 'viewport']}, sort_keys=True)
+
+
+def compare(old_path, new_path):
+    """Prints the relative change of the main metrics of all cases that are in both files."""
+    with open(old_path) as f:
+        old_results = {case_key(result): result for result in json.load(f)['results']}
+    with open(new_path) as f:
+        new_results = {case_key(result): result for result in json.load(f)['results']}
+
+    metrics = [
+        ('first_paint_ms', lambda result: result['first_paint_ms']),
+        ('draw_ms', lambda result: result['scroll_row']['draw_ms']['median'] if 'draw_ms' in result['scroll_row'] else None),
+        ('frame_ms', lambda result: result['scroll_row']['frame_ms']['median']),
+        ('peak_memory', lambda result: result['peak_memory_bytes']),
+    ]
+    for key in old_results:
+        if key not in new_results:
+            continue
+        changes = []
+        for name, get in metrics:
+            old_value, new_value = get(old_results[key]), get(new_results[key])
+            if (old_value is not None) and (new_value is not None) and (old_value > 0):
+                changes.append(f'{name} {new_value / old_value - 1:+.0%}')
+        print(key, ', '.join(changes))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rendering benchmarks for the matrix viewer tabs')
+    parser.add_argument('--output', help='JSON file for the results (default: stdout)')
+    parser.add_argument('--quick', action='store_true', help='only run a few small cases')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files instead of running')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare(*args.compare)
+    else:
+        run(args.quick, args.output)
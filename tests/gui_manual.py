@@ -47,6 +47,24 @@ def test_pyplot_interoperability_gtkagg():
     print('TEST: Matrix_viewer still open? Loop stops if matrix_viewer closed?')
     open_with_pyplot('GTK3Agg')
 
+def test_show_async():
+    print('TEST test_show_async')
+    print('TEST: the window reacts to scrolling while the counter is printed. Stops after closing the window.')
+    import asyncio
+
+    async def count():
+        for i in range(1000):
+            print('counter', i)
+            await asyncio.sleep(0.5)
+
+    async def main():
+        matrix_viewer.view(np.random.rand(1000, 100))
+        counter = asyncio.ensure_future(count())
+        await matrix_viewer.show_async()
+        counter.cancel()
+
+    asyncio.run(main())
+
 def test_struct_strings():
     print('TEST test_struct_strings')
     print('TEST: No def or ghi visible?')
@@ -59,17 +77,151 @@ def test_struct_empty():
     matrix_viewer.view([])
     matrix_viewer.show()
 
+def test_struct_big():
+    print('TEST test_struct_big')
+    print('TEST: Opens immediately and scrolling to the end shows keys up to 4999999?')
+    matrix_viewer.view({i: str(i) for i in range(5000000)})
+    matrix_viewer.show()
+
+def test_text_big():
+    print('TEST test_text_big')
+    print('TEST: Opens within a second, scrolling with the mouse wheel, scrollbar and page keys works up to line 4999999?')
+    matrix_viewer.view(''.join(f'line {i}\n' for i in range(5000000)))
+    matrix_viewer.show()
+
 def test_multiple_windows():
     print('TEST test_multiple_windows')
     print('TEST: Window "Matrix Viewer" has 1 tabs and window "Second Window" has 2 tabs?')
     print('TEST: Tab allows horizontal and vertical scrolling by using the mouse wheel?')
     print('TEST: Font size can be changed dynamically with Ctrl-Scroll?')
+    print('TEST: F12 shows and hides draw statistics in the top right corner of a table?')
     matrix_viewer.view(np.random.rand(100, 100))
     v1 = matrix_viewer.viewer('Second Window')
     matrix_viewer.view(v1)
     matrix_viewer.view(np.random.rand(5, 5))
     matrix_viewer.show()
 
+def test_nd_array():
+    print('TEST test_nd_array')
+    print('TEST: Slice can be changed with the index spinners below the table?')
+    print('TEST: Displayed axes can be changed (e. g. rows = axis 3 shows a transposed slice)?')
+    matrix_viewer.view(np.arange(2 * 3 * 40 * 50).reshape(2, 3, 40, 50))
+    matrix_viewer.show()
+
+def test_heatmap():
+    print('TEST test_heatmap')
+    print('TEST: Zooming out with Ctrl-Scroll switches to a heatmap that shows the diagonal band, zooming in switches back?')
+    print('TEST: h toggles the heatmap, selection and scrolling work in the heatmap?')
+    x = np.arange(4096)
+    matrix_viewer.view(np.exp(-np.abs(x[:, np.newaxis] - x[np.newaxis, :]) / 100.0))
+    matrix_viewer.show()
+
+def test_heatmap_zoomed_out():
+    print('TEST test_heatmap_zoomed_out')
+    print('TEST: Ctrl-Scroll zooms out until the whole matrix fits, the single bright outlier stays visible in the max tab?')
+    a = np.random.rand(20000, 10000).astype(np.float32)
+    a[12345, 6789] = 100
+    tab = matrix_viewer.view(a, snapshot='view')
+    tab.heatmap_statistic = 'max'
+    matrix_viewer.show()
+
+def test_find():
+    print('TEST test_find')
+    print('TEST: press Ctrl-F, search "abs(x) > 3" and press enter repeatedly. Are all 4 outliers found (also with Previous)?')
+    print('TEST: the first hit should be shown while "... searched" is still counting up. Does "nan" find the nan?')
+    matrix = np.random.randn(20000, 2000).astype(np.float32).clip(-2.9, 2.9)
+    matrix[[12, 5000, 5000, 19999], [1999, 0, 7, 1000]] = [4, -5, 1e4, -3.5]
+    matrix[10000, 10] = np.nan
+    matrix_viewer.view(matrix, snapshot='view')
+    matrix_viewer.show()
+
+def test_selection_statistics():
+    print('TEST test_selection_statistics')
+    print('TEST: does the status bar follow the selection while dragging? Select everything by clicking the top left corner:')
+    print('TEST: "computing ..." is shown for about a second, then sum about 15e6, mean 0.5 and NaN: 1.')
+    matrix = np.random.rand(10000, 3000)
+    matrix[5, 5] = np.nan
+    matrix_viewer.view(matrix, snapshot='view')
+    matrix_viewer.show()
+
+def test_export():
+    print('TEST test_export')
+    print('TEST: select some cells, press Ctrl-C and paste them into a spreadsheet. Are the values in the right cells?')
+    print('TEST: right-click, export the array to a .csv, .npy and .parquet file. Is the progress shown in the status bar?')
+    matrix_viewer.view(np.random.rand(20000, 500))
+    matrix_viewer.show()
+
+def test_sort_filter():
+    print('TEST test_sort_filter')
+    print('TEST: double-click the heading of column 1. Are the rows sorted (ascending, then descending, then original)?')
+    print('TEST: do the row headings show the original row numbers? Select column 0, press Ctrl-F, enter "> 0.9" and')
+    print('TEST: click "Filter rows". About 10 percent of the rows remain, still sorted by column 1?')
+    matrix = np.random.rand(5000000, 3)
+    matrix[::7, 1] = np.nan
+    matrix_viewer.view(matrix, snapshot='view')
+    matrix_viewer.show()
+
+def test_sparse():
+    print('TEST test_sparse')
+    print('TEST: a 1000000 x 1000000 sparse matrix opens quickly. Are the zeros that are not stored gray?')
+    print('TEST: press n and Shift-n. Does the focus jump to the next and previous stored value?')
+    import scipy.sparse
+    matrix_viewer.view(scipy.sparse.random(1000000, 1000000, density=3e-6, format='csr'))
+    matrix_viewer.show()
+
+def test_live_update():
+    print('TEST test_live_update')
+    print('TEST: Values change about 10 times per second for 10 seconds while scroll position and selection stay?')
+    weights = np.random.rand(200, 30)
+    tab = matrix_viewer.view(weights)
+    for _ in range(100):
+        weights[::2] += np.random.rand(100, 30) * 0.01
+        tab.update(weights)
+        matrix_viewer.pause(0.1)
+
+def test_column_widths():
+    print('TEST test_column_widths')
+    print('TEST: Only column 3 is wide, the integer column 5 is narrow, selecting and scrolling across columns works?')
+    matrix = np.random.rand(1000, 2000)
+    matrix[:, 3] *= 1e12
+    matrix[:, 5] = np.arange(1000)
+    matrix_viewer.view(matrix)
+    matrix_viewer.show()
+
+def test_dataframe():
+    import pandas as pd
+    print('TEST test_dataframe')
+    print('TEST: A 50M-row DataFrame opens instantly, numbers are right-aligned, names left-aligned, the index has the heading id?')
+    n = 50_000_000
+    frame = pd.DataFrame({
+        'count': np.arange(n),
+        'weight': np.random.rand(n),
+        'name': pd.Categorical(np.array(['apple', 'banana', 'cherry'])[np.arange(n) % 3]),
+    }, index=pd.RangeIndex(n, name='id'))
+    matrix_viewer.view(frame)
+    matrix_viewer.view(frame['weight'])
+    matrix_viewer.show()
+
+def _view_from_worker(i_worker):
+    client = matrix_viewer.connect()
+    matrix = client.array((2000, 300))
+    matrix[...] = i_worker
+    client.view(matrix, tab_title=f"worker {i_worker}")
+    client.view(np.random.rand(1000, 1000))  # copied into shared memory
+    client.close()
+
+def test_daemon():
+    print('TEST test_daemon')
+    print('TEST: a viewer window opens with two tabs per worker. It stays open after this script continues.')
+    import multiprocessing
+    with multiprocessing.Pool(3) as pool:
+        pool.map(_view_from_worker, range(3))
+    client = matrix_viewer.connect()
+    tab = client.view(['a', 'b', 3])
+    input('TEST: select a cell in the last tab, then press enter here')
+    print(tab.get_focused_cell())
+    client.shutdown()
+
 def test_pytorch():
     print('TEST test_pytorch')
     print('TEST: click on a few parameters')
@@ -80,7 +232,22 @@ def test_pytorch():
 test_pyplot_interoperability()
 if platform.system() == 'Linux':
     test_pyplot_interoperability_gtkagg()
+test_show_async()
 test_struct_strings()
 test_struct_empty()
+test_struct_big()
+test_text_big()
 test_multiple_windows()
+test_nd_array()
+test_heatmap()
+test_heatmap_zoomed_out()
+test_find()
+test_selection_statistics()
+test_export()
+test_sort_filter()
+test_sparse()
+test_live_update()
+test_column_widths()
+test_dataframe()
+test_daemon()
 test_pytorch()
\ No newline at end of file
@@ -5,9 +5,499 @@ Please use gui_manual.py instead of automated tests.
 (File an issue if you know a better solution)
 """
 
+import functools
+import os
 import pytest
+import numpy as np
 
 import matrix_viewer
+from matrix_viewer._formatting import format_block, TileCache
+from matrix_viewer._snapshot import LazySnapshot, take_snapshot
+from matrix_viewer._statistics import sample_matrix, compute_statistics, choose_formatter
+from matrix_viewer._tab_numpy import ViewerTabNumpy, is_npy_file, changed_cells
+from matrix_viewer._tab_loading import ViewerTabLoading
+from matrix_viewer._tab_struct import StructEntries, summarize_value, key_chunk_size
+from matrix_viewer._tab_text import line_starts
+from matrix_viewer._heatmap import colormap, heatmap_limits, heatmap_rgb, ppm_data
+from matrix_viewer._pyramid import Pyramid, PyramidWindow, reduce_blocks
+from matrix_viewer._column_widths import ColumnWidths
+from matrix_viewer._search import parse_query, Search
+from matrix_viewer import _region_statistics
+from matrix_viewer._region_statistics import RegionStatistics
+from matrix_viewer._row_order import RowOrder, RowView, sort_order
+from matrix_viewer._export import iter_text_chunks, save_text, save_npy, save_parquet, export_format
+from matrix_viewer._tab_sparse import canonical_csr, sparse_block, next_stored, matches_tab_sparse
+from matrix_viewer._tab_dataframe import choose_column_formatter, format_column, matches_tab_dataframe
 
 def test_dummy():
     pass
+
+
+def test_format_block_matches_scalar_formatter():
+    rng = np.random.default_rng(0)
+    arrays = [
+        rng.random((20, 7)) * 10.0 ** rng.integers(-8, 12, (20, 7)),
+        (rng.random((20, 7)) - 0.5).astype(np.float32),
+        rng.integers(-1000, 1000, (20, 7)),
+        rng.random((20, 7)) < 0.5,
+        rng.random((20, 7)) + 1j * rng.random((20, 7)),
+        np.array([[np.nan, np.inf, -np.inf, 0.0, -0.0]]),
+    ]
+    formatters = ["{:.6f}".format, "{:.6e}".format, "{:d}".format, "{}".format, lambda value: f"<{value}>"]
+    for array in arrays:
+        for formatter in formatters:
+            try:
+                expected = [[formatter(value) for value in row] for row in array]
+            except (ValueError, TypeError):
+                continue  # formatter not applicable to this dtype
+            assert format_block(formatter, array) == expected
+    with pytest.raises(ValueError):
+        format_block("{:d}".format, np.array([[1.7]]))  # like the scalar formatter, instead of truncating to 1
+    with pytest.raises(ValueError):
+        format_block("{:.2d}".format, np.array([[3]]))  # like the scalar formatter, instead of padding to '03'
+    assert format_block("{:+08.3f}".format, np.array([[-1.5]])) == [["{:+08.3f}".format(-1.5)]]
+
+
+def test_update_while_loading_takes_the_snapshot_right_away():
+    class LoadedTab:
+        def update(self, matrix, prepared=None):
+            self.prepared = prepared
+
+    a = np.zeros((3, 4))
+    prepared = ViewerTabNumpy.prepare(a)
+    loading = ViewerTabLoading.__new__(ViewerTabLoading)  # only the update logic, without a window
+    loading.tab = None
+    loading._pending_update = None
+    loading._prepare_update = functools.partial(ViewerTabNumpy.prepare_update, num_dims=prepared['num_dims'],
+        snapshot=prepared['snapshot'])
+    loading.update(a)
+    a[...] = 7  # after update returned, while the tab is still loading
+    with pytest.raises(ValueError):
+        loading.update(np.zeros(3))  # raised to the caller, not later in the Tk callback
+    loading.tab = LoadedTab()
+    loading._apply_pending_update()
+    assert np.array_equal(loading.tab.prepared, np.zeros((3, 4)))
+
+
+def test_changed_cells_ignore_nan():
+    old = np.array([[1.0, np.nan, 3.0], [np.nan, 5.0, 6.0]])
+    new = np.array([[1.0, np.nan, 4.0], [7.0, 5.0, np.nan]])
+    rows, columns = changed_cells(old, new)
+    assert list(zip(rows.tolist(), columns.tolist())) == [(0, 2), (1, 0), (1, 2)]
+    assert changed_cells(old, old.copy())[0].size == 0  # the nan cells are not redrawn
+    assert changed_cells(old, new[:, :2]) is None  # other shape, everything is redrawn
+    assert changed_cells(old, new.astype(np.float32)) is None
+
+
+def test_tile_cache_evicts_least_recently_used():
+    cache = TileCache(max_tiles=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert len(cache) == 2
+
+
+def test_snapshot_copy_and_view_memory():
+    matrix = np.arange(20.0).reshape(4, 5)
+    copied = take_snapshot(matrix, 'copy')
+    assert not np.shares_memory(copied, matrix)
+    assert copied.nbytes == matrix.nbytes
+    viewed = take_snapshot(matrix, 'view')
+    assert viewed is matrix
+    with pytest.raises(ValueError):
+        take_snapshot(matrix, 'deep')
+
+
+def test_snapshot_lazy_copies_only_read_blocks():
+    matrix = np.arange(1000 * 600, dtype=np.float64).reshape(1000, 600)
+    lazy = take_snapshot(matrix, 'lazy')
+    assert isinstance(lazy, LazySnapshot)
+    assert lazy.nbytes_copied == 0
+
+    np.testing.assert_array_equal(lazy[10:20, 250:270], matrix[10:20, 250:270])  # spans two blocks
+    assert lazy.nbytes_copied == 2 * 256 * 256 * 8
+
+    matrix[:] = -1  # shown blocks keep their values, the others are not copied yet
+    assert lazy[15, 255] == 15 * 600 + 255
+    assert lazy[900, 500] == -1
+    assert lazy.nbytes_copied == (2 * 256 + 232) * 256 * 8  # the last block row has only 1000 - 768 rows
+
+    np.testing.assert_array_equal(lazy[998:, ::100], matrix[998:, ::100])
+    assert np.asarray(lazy).shape == matrix.shape
+
+
+def test_sample_matrix_is_bounded(tmp_path):
+    matrix = np.arange(3000 * 2000).reshape(3000, 2000)
+    sample = sample_matrix(matrix, 10000)
+    assert 0 < sample.size <= 10000
+    assert np.all(np.isin(sample, matrix))
+    small_matrix = matrix[:10]
+    assert sample_matrix(small_matrix, 100000) is small_matrix
+
+    path = tmp_path / 'matrix.npy'
+    np.save(path, matrix)
+    assert is_npy_file(path) and is_npy_file(str(path))
+    assert not is_npy_file(str(tmp_path / 'missing.npy'))
+    mapped = np.load(path, mmap_mode='r')
+    assert sample_matrix(mapped, 10000).size <= 10000
+
+    tensor = np.arange(40 * 50 * 60).reshape(40, 50, 60)
+    assert 0 < sample_matrix(tensor, 5000).size <= 5000
+    assert compute_statistics(tensor, chunk_size=700).max_value == tensor.max()
+
+
+def test_chunked_statistics_match_full_pass():
+    rng = np.random.default_rng(0)
+    matrix = rng.random((300, 500))
+    matrix[rng.random(matrix.shape) < 0.12] = 1e-6
+    for statistics in [compute_statistics(matrix), compute_statistics(matrix, chunk_size=1000, num_threads=3)]:
+        assert statistics.max_value == np.max(matrix)
+        assert statistics.num_small == np.sum(np.logical_and(matrix != 0, np.abs(matrix) < 1e-4))
+        assert choose_formatter(matrix.dtype, statistics)(0.5) == '5.000000e-01'
+
+    complex_matrix = (rng.random((50, 70)) + 1j * rng.random((50, 70))) * 1e9
+    statistics = compute_statistics(complex_matrix, chunk_size=100)
+    assert statistics.max_value == np.max(complex_matrix.real) + 1j * np.max(complex_matrix.imag)
+    assert choose_formatter(complex_matrix.dtype, statistics)(1.0) == '1.000000e+00'
+
+    assert compute_statistics(matrix, sample_budget=matrix.size) == compute_statistics(matrix)
+    assert compute_statistics(matrix, sample_budget=1000).num_values <= 1000
+    assert compute_statistics(np.zeros((0, 3))).num_values == 0
+
+
+def test_struct_entries_are_fetched_lazily():
+    class Expensive:
+        def __init__(self):
+            self.number = 3
+            self.queried = []
+
+        @property
+        def expensive(self):
+            self.queried.append('expensive')
+            return 'result'
+
+        def method(self):
+            pass
+
+    object = Expensive()
+    entries = StructEntries(object)
+    assert object.queried == []
+    names = [entries.name(i) for i in range(len(entries))]
+    assert ('expensive' in names) and ('number' in names) and ('method' not in names)
+    assert entries.value(names.index('expensive')) == 'result'
+    entries.value(names.index('expensive'))
+    assert object.queried == ['expensive']  # cached
+
+    entries = StructEntries({i: str(i) for i in range(100000)})
+    assert (len(entries) == 100000) and (entries.name(5) == '5') and (entries.value(5) == '5')
+    assert len(entries._keys) == 6
+
+    big = {i: str(i) for i in range(5 * key_chunk_size + 3)}
+    entries = StructEntries(big)
+    num_calls = 1
+    while not entries.fetch_keys(len(entries), time_end=0):  # jump to the last row with the budget used up
+        assert len(entries._keys) == num_calls * key_chunk_size  # one chunk per call, the GUI stays responsive
+        num_calls += 1
+    assert (num_calls == 6) and (entries.name(len(big) - 1) == str(len(big) - 1))
+    entries = StructEntries(big)
+    entries.fetch_keys(key_chunk_size + 1)
+    big[-1] = 'new'  # modified while shown
+    for i in range(2 * key_chunk_size):
+        del big[i]
+    assert entries.fetch_keys(len(entries)) and (len(entries) == len(big))
+    assert entries.is_fetched(len(big) + 5)  # beyond the end of the shrunk dict
+
+    assert summarize_value('x' * 10000)[0].endswith('...') and len(summarize_value('x' * 10000)[0]) <= 200
+    assert summarize_value('a\nb') == ('multiline string with 3 characters', False)
+    assert summarize_value(np.zeros((2, 3)))[1]
+
+
+def test_line_starts():
+    for text in ['', '\n', 'abc', 'a\nbc\n\nd', 'ä\nöü\n' * 5 + 'x']:
+        expected = [0] + [i + 1 for i, character in enumerate(text) if character == '\n']
+        assert list(line_starts(text)) == expected
+        assert list(line_starts(text, chunk_size=2)) == expected
+
+
+def test_heatmap_rgb():
+    block = np.array([[0.0, 1.0, np.nan], [0.5, 2.0, -1.0]])
+    assert heatmap_limits(block) == (-1.0, 2.0)
+    rgb = heatmap_rgb(block, (0.0, 1.0))
+    assert rgb.shape == (2, 3, 3) and rgb.dtype == np.uint8
+    assert (rgb[0, 0] == colormap[0]).all() and (rgb[0, 1] == colormap[255]).all() and (rgb[0, 2] == colormap[256]).all()
+    assert (rgb[1, 1] == colormap[255]).all() and (rgb[1, 2] == colormap[0]).all()  # clipped to the limits
+
+    rgb = heatmap_rgb(block, (0.0, 1.0), cell_size=4, max_shape=(5, 9))
+    assert rgb.shape == (5, 9, 3)
+    assert (rgb[3, 8] == colormap[256]).all() and (rgb[4, 8] == colormap[0]).all()
+    assert heatmap_rgb(np.array([[1 + 1j, 0]]), (0.0, 2 ** 0.5)).shape == (1, 2, 3)
+    assert ppm_data(rgb).startswith(b"P6 9 5 255\n") and len(ppm_data(rgb)) == len(b"P6 9 5 255\n") + 5 * 9 * 3
+
+
+def test_pyramid_levels_match_block_reductions():
+    a = np.arange(37 * 21, dtype=np.float64).reshape(37, 21)
+    a[0, 0] = np.nan
+    assert np.array_equal(reduce_blocks(a, 4, 'max')[-1], [a[36, 3], a[36, 7], a[36, 11], a[36, 15], a[36, 19], a[36, 20]])
+    assert reduce_blocks(a, 2, 'min')[0, 0] == 1  # nan is ignored
+
+    pyramid = Pyramid(a, memory_budget=100)  # the first levels are too big for the budget
+    assert (pyramid.first_level, pyramid.num_levels) == (4, 6)
+    pyramid.build(chunk_size=50, num_threads=3)  # several stripes
+    assert pyramid.get(3) is None
+    for level in range(4, 7):
+        for statistic in ['min', 'max', 'mean']:
+            expected = reduce_blocks(a, 2 ** level, statistic)
+            assert np.allclose(pyramid.get(level, statistic), expected, equal_nan=True)
+    assert pyramid.get(6).shape == (1, 1)
+
+    window = PyramidWindow(a, 2, 1, 7, 2, 5)  # level 2 is not stored
+    assert window.get('max', 1, 7, 2, 5) is None
+    window.build(chunk_size=50, num_threads=3)
+    assert window.contains(2, 3, 7, 2, 4) and not window.contains(2, 0, 7, 2, 5) and not window.contains(3, 1, 2, 2, 3)
+    for statistic in ['min', 'max', 'mean']:
+        expected = reduce_blocks(a, 4, statistic)[1:7, 2:5]
+        assert np.allclose(window.get(statistic, 1, 7, 2, 5), expected, equal_nan=True)
+    assert pyramid.coarser_level(2) == 4 and pyramid.coarser_level(6) is None
+
+
+def test_dataframe_columns_are_formatted_by_dtype():
+    pd = pytest.importorskip("pandas")
+    frame = pd.DataFrame({
+        'int': np.arange(5),
+        'float': np.linspace(0, 1, 5),
+        'text': ['a', 'bb', 'c' * 100, 'line\nbreak', None],
+        'nullable': pd.array([1, None, 3, 4, 5], dtype="Int64"),
+    })
+    assert matches_tab_dataframe(frame) and matches_tab_dataframe(frame['int']) and not matches_tab_dataframe(frame.values)
+
+    formatter, longest = choose_column_formatter(frame['int'])
+    assert format_column(frame['int'], formatter, 1, 3) == ['1', '2']
+    formatter, longest = choose_column_formatter(frame['float'])
+    assert format_column(frame['float'], formatter, 4, 5) == ['1.000000']
+    formatter, longest = choose_column_formatter(frame['text'])
+    assert formatter is None and len(longest) == 60 and longest.endswith('...')
+    assert format_column(frame['text'], formatter, 3, 4) == ['line break']
+    formatter, longest = choose_column_formatter(frame['nullable'])
+    assert format_column(frame['nullable'], formatter, 0, 2) == ['1', '<NA>']
+
+
+def test_column_widths_are_measured_lazily():
+    measured = []
+
+    def measure(column_start, column_end):
+        measured.extend(range(column_start, column_end))
+        return [10 + i % 3 for i in range(column_start, column_end)]
+
+    widths = ColumnWidths(1000000, measure, 10)
+    widths.measure_visible(500, 50)
+    assert measured == list(range(500, 506))  # the columns that are visible with the default width
+    assert [widths.offset(i) - widths.offset(500) for i in range(500, 505)] == [0, 12, 22, 33, 45]
+    assert widths.index_at(widths.offset(500) + 21) == 501 and widths.index_at(widths.offset(500) + 22) == 502
+    assert (widths.index_at(-1), widths.index_at(0), widths.index_at(widths.offset(1000000))) == (-1, 0, 1000000)
+    assert widths.offset(1000000) == 1000000 * 10 + 6
+    widths.measure_visible(500, 50)
+    assert len(measured) == 6
+
+    assert widths.widen(501, 20) and not widths.widen(501, 15)
+    assert widths.offset(502) - widths.offset(501) == 20
+    widths.measure_visible(500, 50)
+    assert widths.width(501) == 20  # widened columns keep their width
+    assert widths.last_start(25) == 999998
+
+
+def test_search_finds_hits_chunk_by_chunk():
+    block = np.array([[0.1, -2000.0, np.nan], [3.0, 0.5, 7.0]], dtype=np.float32)
+    assert parse_query('0.1')(block).tolist() == [[True, False, False], [False, False, False]]
+    assert parse_query('nan')(block).tolist() == [[False, False, True], [False, False, False]]
+    assert parse_query('0..3')(block).tolist() == [[True, False, False], [True, True, False]]
+    assert parse_query('5..')(block).tolist() == [[False, False, False], [False, False, True]]
+    assert parse_query('abs(x) > 1e3')(block).tolist() == [[False, True, False], [False, False, False]]
+    assert parse_query('> 6')(block).tolist() == [[False, False, False], [False, False, True]]
+    with pytest.raises(ValueError):
+        parse_query('x >')
+
+    matrix = np.zeros((100, 7), dtype=np.int64)
+    hits = [(3, 2), (3, 5), (50, 0), (98, 6)]
+    for row, column in hits:
+        matrix[row, column] = 1
+    search = Search(matrix, '1', start_row=40, chunk_size=70)  # 10 rows per chunk
+    assert search.next_hit(40, 0) is None and not search.finished
+    search._order = search._order[:2]  # scan only rows 40..59
+    search.run()
+    assert search.next_hit(40, 0) == (50, 0)
+    assert search.next_hit(50, 0) is None  # rows 60.. were not scanned yet
+    assert search.next_hit(50, 0, forward=False) is None
+
+    search = Search(matrix, '1', chunk_size=70)
+    search.run()
+    assert search.finished and search.num_hits == 4
+    assert search.next_hit(0, -1) == (3, 2)
+    assert search.next_hit(3, 2) == (3, 5)
+    assert search.next_hit(98, 6) == (3, 2)  # wraps around
+    assert search.next_hit(3, 2, forward=False) == (98, 6)
+    assert search.next_hit(50, 0, forward=False) == (3, 5)
+    search = Search(matrix, '2')
+    search.run()
+    assert search.finished and (search.next_hit(0, 0) is None)
+
+
+def test_region_statistics_match_direct_reductions(monkeypatch):
+    monkeypatch.setattr(_region_statistics, 'direct_budget', 0)  # no direct reductions before build
+    rng = np.random.default_rng(1)
+    for matrix in [rng.standard_normal((1000, 300)), rng.integers(-100, 100, (300, 1000)), rng.standard_normal((5000, 1))]:
+        matrix = matrix.copy()
+        if matrix.dtype.kind == 'f':
+            matrix[[5, 400], [0, 0]] = np.nan
+        statistics = RegionStatistics(matrix)
+        assert statistics.region(0, matrix.shape[0], 0, matrix.shape[1]) is None  # not built yet
+        statistics.build()
+        num_rows, num_columns = matrix.shape
+        for row_start, row_end, column_start, column_end in [(0, num_rows, 0, num_columns), (1, 129, 0, 1),
+                (3, num_rows - 10, num_columns // 5, num_columns - num_columns // 3), (0, num_rows, 0, 1),
+                (1, num_rows - 1, max(num_columns - 2, 0), num_columns), (num_rows - 3, num_rows, num_columns // 4, num_columns)]:
+            region = statistics.region(row_start, row_end, column_start, column_end)
+            block = matrix[row_start:row_end, column_start:column_end]
+            assert region['shape'] == block.shape
+            assert region['nan_count'] == np.count_nonzero(np.isnan(block))
+            assert np.isclose(region['sum'], np.nansum(block))
+            assert np.isclose(region['mean'], np.nanmean(block))
+            assert (region['min'], region['max']) == (np.nanmin(block), np.nanmax(block))
+
+
+def test_region_statistics_read_at_most_the_corners():
+    class CountingArray:
+        def __init__(self, array):
+            self.array = array
+            self.shape = array.shape
+            self.dtype = array.dtype
+            self.values_read = 0
+
+        def __getitem__(self, key):
+            values = self.array[key]
+            self.values_read += values.size
+            return values
+
+    matrix = CountingArray(np.random.default_rng(2).standard_normal((20000, 400)).astype(np.float32))
+    statistics = RegionStatistics(matrix)
+    statistics.build()
+    block_values = statistics.block_rows * statistics.block_columns
+    for region in [(0, 20000, 101, 103), (7, 19993, 0, 400), (3, 19990, 55, 345)]:
+        matrix.values_read = 0
+        result = statistics.region(*region)
+        assert matrix.values_read <= 4 * block_values  # independent of the height and width of the region
+        block = matrix.array[region[0]:region[1], region[2]:region[3]]
+        assert np.isclose(result['sum'], np.sum(block, dtype=np.float64))
+        assert (result['min'], result['max']) == (np.min(block), np.max(block))
+
+
+def test_row_order_sorts_stably_and_filters():
+    values = np.array([2.0, np.nan, 1.0, 2.0, 0.0])
+    assert sort_order(values).tolist() == [4, 2, 0, 3, 1]
+    assert sort_order(values, descending=True).tolist() == [0, 3, 2, 4, 1]
+
+    matrix = np.column_stack([values, np.arange(5)])
+    row_order = RowOrder(matrix, sort_column=0, descending=True, query='x >= 1', filter_column=1, chunk_size=2)
+    row_order.run()
+    assert row_order.finished and (row_order.error is None)
+    assert row_order.rows.tolist() == [3, 2, 4, 1]
+    cached = RowOrder(matrix, sort_column=0, descending=True, sorted_rows=row_order.sorted_rows)
+    cached.run()
+    assert cached.rows is row_order.sorted_rows  # not sorted again
+    any_column = RowOrder(matrix, query='2')
+    any_column.run()
+    assert any_column.rows.tolist() == [0, 2, 3]
+
+    view = RowView(matrix, row_order.rows)
+    assert view.shape == (4, 2)
+    np.testing.assert_array_equal(view[1:3], matrix[[2, 4]])
+    np.testing.assert_array_equal(view[:, 1], [3, 2, 4, 1])
+    lazy = RowView(LazySnapshot(matrix, block_shape=(2, 2)), row_order.rows)
+    np.testing.assert_array_equal(np.asarray(lazy), matrix[row_order.rows])
+
+
+def test_sparse_blocks_and_stored_entries():
+    sparse = pytest.importorskip("scipy.sparse")
+    dense = np.array([[0, 2, 0, 0], [0, 0, 0, 0], [1, 0, 3, 0], [0, 0, 0, 4]], dtype=np.float32)
+    coo = sparse.coo_matrix(dense)
+    coo = sparse.coo_matrix((np.append(coo.data, 0.5), (np.append(coo.row, 2), np.append(coo.col, 2))), shape=coo.shape)
+    assert matches_tab_sparse(coo) and not matches_tab_dataframe(coo) and not matches_tab_sparse(dense)
+    csr = canonical_csr(coo)
+    assert csr.has_canonical_format and (csr.nnz == 4)  # the duplicate was summed
+
+    values, stored = sparse_block(csr, 1, 4, 1, 3)
+    np.testing.assert_array_equal(values, dense[1:4, 1:3] + [[0, 0], [0, 0.5], [0, 0]])
+    np.testing.assert_array_equal(stored, [[False, False], [False, True], [False, False]])
+
+    hits = [next_stored(csr, 0, -1)]
+    for _ in range(4):
+        hits.append(next_stored(csr, *hits[-1]))
+    assert hits == [(0, 1), (2, 0), (2, 2), (3, 3), (0, 1)]
+    assert next_stored(csr, 2, 0, forward=False) == (0, 1)  # skips the empty row
+    assert next_stored(csr, 0, 1, forward=False) == (3, 3)  # wraps around
+    assert next_stored(canonical_csr(sparse.csc_matrix((3, 3))), 0, -1) is None
+
+
+def test_export_streams_chunks(tmp_path):
+    matrix = np.random.default_rng(2).standard_normal((1000, 7)).astype(np.float32)
+    chunks = list(iter_text_chunks(matrix, ["{:.2f}".format] * 7, chunk_values=700))
+    assert len(chunks) == 10
+    assert chunks[0].split('\n')[0] == '\t'.join("{:.2f}".format(value) for value in matrix[0])
+
+    # files keep all digits
+    save_text(matrix, tmp_path / 'a.csv')
+    np.testing.assert_array_equal(np.loadtxt(tmp_path / 'a.csv', delimiter=',', dtype=np.float32), matrix)
+    progress = []
+    save_npy(matrix.reshape(10, 100, 7), tmp_path / 'a.npy', progress.append)
+    np.testing.assert_array_equal(np.load(tmp_path / 'a.npy'), matrix.reshape(10, 100, 7))
+    assert progress[-1] == 1.0
+    assert export_format('A.Parquet') == 'parquet'
+    with pytest.raises(ValueError):
+        export_format('a.xlsx')
+
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    save_parquet(matrix, tmp_path / 'a.parquet')
+    table = pyarrow_parquet.read_table(tmp_path / 'a.parquet')
+    np.testing.assert_array_equal(np.column_stack([column.to_numpy() for column in table.columns]), matrix)
+
+
+def test_shared_array_roundtrip():
+    shared_memory = pytest.importorskip('multiprocessing.shared_memory')
+    from multiprocessing import resource_tracker
+    from matrix_viewer._daemon import share_array, attach_array, _untrack
+
+    # arrays inside a segment of the sender are described, not copied
+    memory = shared_memory.SharedMemory(create=True, size=8 * 6 * 5)
+    try:
+        base = np.ndarray((6, 5), np.float64, buffer=memory.buf)
+        base[...] = np.arange(30).reshape(6, 5)
+        descriptor, used_memory = share_array(base[1:5:2, 1:], [memory])
+        assert used_memory is memory and descriptor[-1] is False
+        array, attached, owned = attach_array(descriptor)
+        assert not owned
+        # attach_array is meant to run in another process, where it stops tracking the segment of the sender
+        if os.name == 'posix':
+            resource_tracker.register(memory._name, 'shared_memory')
+        np.testing.assert_array_equal(array, base[1:5:2, 1:])
+        base[3, 4] = -1
+        assert array[1, 3] == -1  # both processes see modifications
+        del array
+        attached.close()
+        del base
+    finally:
+        memory.close()
+        memory.unlink()
+
+    # other arrays are copied into a segment that the receiver owns
+    values = np.arange(12, dtype=np.int32).reshape(3, 4)[:, ::2]
+    descriptor, copied = share_array(values)
+    _untrack(copied)
+    copied.close()
+    array, attached, owned = attach_array(descriptor)
+    assert owned
+    np.testing.assert_array_equal(array, values)
+    del array
+    attached.close()
+    attached.unlink()